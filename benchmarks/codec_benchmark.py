@@ -0,0 +1,102 @@
+"""
+Compares the encode and decode time and the size of the value codecs on
+step configs, pipeline answers and arrays. Run with
+
+    python -m benchmarks.codec_benchmark [--entries 2000] [--repeat 20]
+
+from the root of the repository. The typed codec is measured with the C
+implementation of msgpack if it is installed and with the python
+implementation.
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from expectmine.storage.serialization import VALUE_CODECS
+from expectmine.storage.value_codecs import typed_codec
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+
+def config() -> dict[str, object]:
+    """
+    Returns the config of a step as stored in its volatile store.
+    """
+    return {
+        "batchfile": Path("/data/batch.xml"),
+        "cores": 8,
+        "memory": "16G",
+        "input_files": [Path(f"/data/sample_{i}.mzML") for i in range(24)],
+        "compounds_per_file": 50,
+        "profile": "orbitrap",
+    }
+
+
+def answers(entries: int) -> dict[str, object]:
+    """
+    Returns answers of a pipeline step, a dict of formulas, scores and paths.
+    """
+    generator = random.Random(42)
+
+    return {
+        f"feature_{i}": {
+            "formula": f"C{generator.randint(5, 40)}H{generator.randint(5, 80)}O{generator.randint(0, 10)}",
+            "score": generator.random(),
+            "fingerprint": [generator.random() > 0.9 for _ in range(64)],
+            "path": Path(f"/scratch/sirius/feature_{i}/fingerprint.csv"),
+        }
+        for i in range(entries)
+    }
+
+
+def measure(name: str, value: object, codec: str, label: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        data = VALUE_CODECS[codec].encode(value)
+    encode_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        VALUE_CODECS[codec].decode(data)
+    decode_time = (time.perf_counter() - start) / repeat
+
+    print(
+        f"{name:<10} {label:<14} {len(data) / 1024:>10.1f} KiB"
+        f" {encode_time * 1000:>10.3f} ms {decode_time * 1000:>10.3f} ms"
+    )
+
+
+def run(entries: int, repeat: int):
+    values: dict[str, object] = {"config": config(), "answers": answers(entries)}
+
+    if np is not None:
+        values["array"] = np.random.default_rng(42).random((entries, 64))
+
+    implementations = [("typed-python", None)]
+
+    if typed_codec.msgpack is not None:
+        implementations.insert(0, ("typed-msgpack", typed_codec.msgpack))
+
+    print(f"{'value':<10} {'codec':<14} {'size':>14} {'encode':>13} {'decode':>13}")
+    for name, value in values.items():
+        measure(name, value, "pickle", "pickle", repeat)
+
+        for label, module in implementations:
+            typed_codec.msgpack = module  # type: ignore
+            measure(name, value, "typed", label, repeat)
+
+        typed_codec.msgpack = implementations[0][1]  # type: ignore
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    arguments = parser.parse_args()
+
+    run(arguments.entries, arguments.repeat)
@@ -0,0 +1,167 @@
+"""
+Measures the size and CPU trade-off of the store compression codecs on
+MGF spectra, MZmine batch XML and pickled answers. Run with
+
+    python -m benchmarks.compression_benchmark [--spectra 2000]
+
+from the root of the repository.
+"""
+
+import argparse
+import pickle
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from expectmine.storage.compression import CODECS, compress, decompress
+from expectmine.storage.stores.sqlite3_store import Sqlite3Store
+from expectmine.storage.value_codecs.pickle_codec import PICKLE_PROTOCOL
+
+# Codecs and levels compared, None stores the values raw.
+SETTINGS = [
+    (None, None),
+    ("zlib", 1),
+    ("zlib", 6),
+    ("zlib", 9),
+    ("lzma", 1),
+    ("lzma", 6),
+]
+MZMINE_DIRECTORY = Path(__file__).parent.parent / "expectmine/steps/steps/mzmine3"
+
+
+def mgf(spectra: int) -> bytes:
+    """
+    Returns an MGF file like the ones exported by MZmine for SIRIUS.
+    """
+    generator = random.Random(42)
+    lines = []
+
+    for i in range(spectra):
+        precursor = generator.uniform(100, 1000)
+        lines += [
+            "BEGIN IONS",
+            f"FEATURE_ID={i}",
+            f"PEPMASS={precursor:.4f}",
+            "CHARGE=1+",
+            f"RTINSECONDS={generator.uniform(30, 900):.2f}",
+            "MSLEVEL=2",
+        ]
+        lines += [
+            f"{generator.uniform(50, precursor):.4f} {generator.uniform(1e3, 1e6):.1f}"
+            for _ in range(generator.randint(10, 80))
+        ]
+        lines.append("END IONS")
+
+    return "\n".join(lines).encode()
+
+
+def batch_xml() -> bytes:
+    """
+    Returns an MZmine batch file assembled from the steps shipped with the
+    mzmine3 step.
+    """
+    steps = b"".join(
+        path.read_bytes() for path in sorted(MZMINE_DIRECTORY.glob("*.xml"))
+    )
+
+    return b'<?xml version="1.0" encoding="UTF-8"?><batch>' + steps + b"</batch>"
+
+
+def answers(spectra: int) -> bytes:
+    """
+    Returns pickled answers of a pipeline step, a dict of paths and scores.
+    """
+    generator = random.Random(42)
+    value = {
+        f"feature_{i}": {
+            "formula": f"C{generator.randint(5, 40)}H{generator.randint(5, 80)}O{generator.randint(0, 10)}",
+            "score": generator.random(),
+            "fingerprint": [generator.random() > 0.9 for _ in range(64)],
+            "path": f"/scratch/sirius/feature_{i}/fingerprint.csv",
+        }
+        for i in range(spectra)
+    }
+
+    return pickle.dumps(value, protocol=PICKLE_PROTOCOL)
+
+
+def measure_codec(name: str, data: bytes, codec: str | None, level: int | None):
+    start = time.process_time()
+    compressed, used_codec = compress(data, codec, threshold=0, level=level)
+    compress_time = time.process_time() - start
+
+    start = time.process_time()
+    for _ in range(5):
+        decompress(compressed, used_codec)
+    decompress_time = (time.process_time() - start) / 5
+
+    setting = f"{codec or 'raw'}" + (f"-{level}" if level is not None else "")
+    print(
+        f"{name:<12} {setting:<8} {len(data) / 1024:>10.0f} KiB {len(compressed) / 1024:>10.0f} KiB"
+        f" {len(data) / max(len(compressed), 1):>7.2f}x"
+        f" {compress_time * 1000:>10.1f} ms {decompress_time * 1000:>10.1f} ms"
+    )
+
+
+def measure_store(payloads: dict[str, bytes], codec: str | None):
+    """
+    Stores every payload as file in a fresh database and reports its size
+    and the time to put and get the files.
+    """
+    directory = Path(tempfile.mkdtemp(prefix="expectmine_benchmark_"))
+
+    try:
+        store = Sqlite3Store(
+            "Benchmark", directory, directory / "temp", compression=codec
+        )
+
+        for name, data in payloads.items():
+            (directory / name).write_bytes(data)
+
+        start = time.perf_counter()
+        for name in payloads:
+            store.put(name, directory / name)
+        put_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name in payloads:
+            store.get(name, Path)
+        get_time = time.perf_counter() - start
+
+        size = sum(path.stat().st_size for path in directory.glob("sqlite.db*"))
+        print(
+            f"{codec or 'raw':<8} {size / 1024:>10.0f} KiB"
+            f" {put_time * 1000:>10.1f} ms {get_time * 1000:>10.1f} ms"
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(spectra: int):
+    payloads = {
+        "spectra.mgf": mgf(spectra),
+        "batch.xml": batch_xml(),
+        "answers": answers(spectra),
+    }
+
+    print(
+        f"{'payload':<12} {'codec':<8} {'raw':>14} {'stored':>14} {'ratio':>8} {'compress':>13} {'decompress':>13}"
+    )
+    for name, data in payloads.items():
+        for codec, level in SETTINGS:
+            measure_codec(name, data, codec, level)
+
+    print()
+    print(f"{'codec':<8} {'database':>14} {'put':>13} {'get':>13}")
+    for codec in [None, *CODECS]:
+        measure_store(payloads, codec)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spectra", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    run(arguments.spectra)
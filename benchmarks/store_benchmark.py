@@ -0,0 +1,99 @@
+"""
+Measures the throughput of the store implementations. Run with
+
+    python -m benchmarks.store_benchmark [--store sqlite3|in_memory|cached_sqlite3] [-n 2000]
+
+from the root of the repository.
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from expectmine.storage.adapters.caching_adapter import CachingStoreAdapter
+from expectmine.storage.adapters.in_memory_adapter import InMemoryStoreAdapter
+from expectmine.storage.adapters.sqlite3_adapter import Sqlite3StoreAdapter
+
+ADAPTERS = {
+    "sqlite3": Sqlite3StoreAdapter,
+    "in_memory": InMemoryStoreAdapter,
+    "cached_sqlite3": lambda path, temp_path: CachingStoreAdapter(
+        Sqlite3StoreAdapter(path, temp_path)
+    ),
+}
+
+
+def measure(name: str, count: int, func) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {count / elapsed:>12.0f} ops/s")
+    return count / elapsed
+
+
+def run(store_name: str, count: int) -> dict[str, float]:
+    directory = Path(tempfile.mkdtemp(prefix="expectmine_benchmark_"))
+    results = {}
+
+    try:
+        adapter = ADAPTERS[store_name](directory, directory / "temp")
+        (directory / "temp").mkdir()
+        store = adapter.get_instance("Benchmark")
+        value = {"batchfile": "batch.xml", "cores": 8, "advanced_settings": True}
+
+        print(f"{store_name} store, {count} operations")
+
+        results["get_instance"] = measure(
+            "get_instance",
+            count // 10,
+            lambda: [adapter.get_instance(f"Step{i}") for i in range(count // 10)],
+        )
+        results["put int"] = measure(
+            "put int", count, lambda: [store.put(f"int{i}", i) for i in range(count)]
+        )
+        results["put object"] = measure(
+            "put object",
+            count,
+            lambda: [store.put(f"object{i}", value) for i in range(count)],
+        )
+        results["get int"] = measure(
+            "get int", count, lambda: [store.get(f"int{i}", int) for i in range(count)]
+        )
+        results["get int again"] = measure(
+            "get int again",
+            count,
+            lambda: [store.get(f"int{i}", int) for i in range(count)],
+        )
+        results["get object"] = measure(
+            "get object",
+            count,
+            lambda: [store.get(f"object{i}", dict) for i in range(count)],
+        )
+        results["put_many int"] = measure(
+            "put_many int",
+            count,
+            lambda: store.put_many({f"many{i}": i for i in range(count)}),
+        )
+        results["get_many int"] = measure(
+            "get_many int",
+            count,
+            lambda: store.get_many([f"many{i}" for i in range(count)], int),
+        )
+        results["exists"] = measure(
+            "exists", count, lambda: [store.exists(f"int{i}") for i in range(count)]
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", choices=list(ADAPTERS), default="sqlite3")
+    parser.add_argument("-n", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    run(arguments.store, arguments.n)
@@ -22,6 +22,7 @@ io = DictIo(
         ),
         "set_max_mz": False,
         "instrument": "orbitrap",
+        "advanced_settings": False,
     }
 )
 
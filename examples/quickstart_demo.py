@@ -17,6 +17,7 @@ pipeline.add_step(
             "/Applications/MZmine.app/Contents/MacOS/MZmine", absolute=True
         ),
         "batchfile": Path("testdata/2.xml"),
+        "advanced_settings": False,
     },
 )
 
@@ -30,6 +31,7 @@ pipeline.add_step(
         ),
         "set_max_mz": False,
         "instrument": "orbitrap",
+        "advanced_settings": False,
     },
 )
 
@@ -0,0 +1,47 @@
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from expectmine.storage.base_blob_store import BaseBlobStore
+from expectmine.storage.blob_stores.filesystem_blob_store import FilesystemBlobStore
+from expectmine.storage.blob_stores.sqlite3_blob_store import Sqlite3BlobStore
+from expectmine.storage.sqlite3_compaction import compact
+
+
+def find_blob_store(persistent_path: Path) -> Optional[BaseBlobStore]:
+    """
+    Returns the blob store the stores of a persistent path use, if any.
+    """
+    if (persistent_path / "blobs" / "index.db").is_file():
+        return FilesystemBlobStore(persistent_path)
+
+    conn = sqlite3.connect(persistent_path / "sqlite.db")
+
+    try:
+        res = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blob_table';"
+        ).fetchone()
+    finally:
+        conn.close()
+
+    return Sqlite3BlobStore(persistent_path) if res else None
+
+
+def compact_cli(persistent_path: Path, max_size: Optional[int], full: bool):
+    """
+    Compacts the database of a persistent path and prints what was removed.
+    Max size is given in MiB.
+    """
+    if not (persistent_path / "sqlite.db").is_file():
+        print(f"No database found in {persistent_path}.")
+        return
+
+    report = compact(
+        persistent_path,
+        max_size=max_size * 1024**2 if max_size is not None else None,
+        blob_store=find_blob_store(persistent_path),
+        full=full,
+    )
+
+    for name, value in report.items():
+        print(f"{name}: {value}")
@@ -1,7 +1,9 @@
 import argparse
+from pathlib import Path
 
 from .run_cli import run_cli
 from .create import create
+from .compact import compact_cli
 
 parser = argparse.ArgumentParser(
     prog="ProgramName",
@@ -12,6 +14,23 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
     "--create", "-c", action="store_true", help="Call the create step flow."
 )
+parser.add_argument(
+    "--compact",
+    type=Path,
+    metavar="PATH",
+    help="Compact the sqlite3 database in PATH, pipelines can keep running.",
+)
+parser.add_argument(
+    "--max-size",
+    type=int,
+    metavar="MIB",
+    help="With --compact, remove the least recently stored values beyond MIB.",
+)
+parser.add_argument(
+    "--full",
+    action="store_true",
+    help="With --compact, rewrite databases created without incremental vacuum.",
+)
 
 
 def main():
@@ -20,5 +39,8 @@ def main():
     if args.create:
         create()
 
+    elif args.compact:
+        compact_cli(args.compact, args.max_size, args.full)
+
     else:
         run_cli()
@@ -89,7 +89,7 @@ class BaseIo(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def boolean(self, key: str, message: str) -> bool:
+    def boolean(self, key: str, message: str, default: bool | None = None) -> bool:
         """
         Presents the user with a message and returns the inputted boolean. Can
         also validate the user input. For each key/step combination, the first
@@ -99,6 +99,9 @@ class BaseIo(ABC):
         :type key: str
         :param message: Message displayed to the user when asked the question.
         :type message: str
+        :param default: Answer used if the question is not answered, e.g. by
+            configurations written before the question existed.
+        :type default: bool | None
 
         :return: The value entered by the user.
         :rtype: bool
@@ -108,6 +111,9 @@ class BaseIo(ABC):
         >>> boolean("hello", "world")
         True
 
+        >>> boolean("hello", "world", default=False)
+        False
+
         >>> boolean()
         TypeError("Key and message should be of type string.")
 
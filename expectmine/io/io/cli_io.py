@@ -50,14 +50,16 @@ class CliIo(BaseIo):
         self.answers[key] = response
         return response
 
-    def boolean(self, key: str, message: str) -> bool:
+    def boolean(self, key: str, message: str, default: bool | None = None) -> bool:
         if key in self.answers:
             temp_result = self.answers.get(key)
 
             if isinstance(temp_result, bool):
                 return temp_result
 
-        response = inquirer.confirm(message).execute()  # type: ignore
+        response = inquirer.confirm(  # type: ignore
+            message, default=bool(default)
+        ).execute()
 
         self.answers[key] = response
         return response
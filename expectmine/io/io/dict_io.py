@@ -57,7 +57,10 @@ class DictIo(BaseIo):
 
         return temp_result
 
-    def boolean(self, key: str, message: str) -> bool:
+    def boolean(self, key: str, message: str, default: bool | None = None) -> bool:
+        if key not in self.answers and default is not None:
+            return default
+
         if key not in self.answers:
             raise ValueError("Key not found.")
 
@@ -105,7 +108,7 @@ class DictIo(BaseIo):
         if not list_validate(temp_result):
             raise ValueError("Returned list not valid.")
 
-        if all(isinstance(file, Path) and file_validate(file) for file in temp_result):
+        if not all(file_validate(file) for file in temp_result):
             raise ValueError("Returned list elements are not valid.")
 
         return temp_result
@@ -1,8 +1,9 @@
 import json
 import os
 import shutil
+import time
 from pathlib import Path
-from typing import Any, Dict, Type
+from typing import Any, Dict, Optional, Type
 
 from dotenv import load_dotenv
 
@@ -20,6 +21,8 @@ from expectmine.pipeline.utils import (
 from expectmine.steps.base_step import BaseStep
 from expectmine.steps.small_base_step import SmallBaseStep
 from expectmine.steps.utils import get_registered_steps
+from expectmine.storage.adapters.instrumented_adapter import InstrumentedStoreAdapter
+from expectmine.storage.base_pipeline_storage import BasePipelineStore
 from expectmine.storage.base_storage import BaseStore
 from expectmine.storage.base_storage_adapter import BaseStoreAdapter
 
@@ -30,6 +33,8 @@ class Pipeline:
     _registered_steps: list[Type[BaseStep | SmallBaseStep]] = [
         step[1] for step in get_registered_steps()
     ]
+    # Registered steps by step name, filled when a stored pipeline is loaded.
+    _step_classes: dict[str, Type[BaseStep | SmallBaseStep]] = dict()
 
     def __init__(
         self,
@@ -77,6 +82,118 @@ class Pipeline:
         self._input_files: list[Path] = list()
         self._current_input_filetypes: list[str] | None = None
         self._current_output_filetypes: list[str] | None = None
+        self._step_seconds: list[tuple[str, float]] = list()
+
+    @classmethod
+    def from_store(
+        cls,
+        key: str,
+        pipeline_store: BasePipelineStore,
+        persistent_adapter: BaseStoreAdapter,
+        volatile_adapter: BaseStoreAdapter,
+        logger_adapter: BaseLoggerAdapter,
+        output_directory: Path,
+        input_files: Optional[list[Path]] = None,
+        **kwargs: Dict[Any, Any],
+    ) -> "Pipeline":
+        """
+        Rebuilds a pipeline stored with save. The steps are configured with
+        the stored answers, install is skipped for steps the persistent store
+        already satisfies.
+
+        :param key: Key the pipeline was stored with.
+        :type key: str
+        :param pipeline_store: Store holding the pipeline.
+        :type pipeline_store: BasePipelineStore
+        :param persistent_adapter: Persistent storage adapter to the pipeline
+        :type persistent_adapter: BaseStoreAdapter
+        :param volatile_adapter: Volatile storage adapter to the pipeline
+        :type volatile_adapter: BaseStoreAdapter
+        :param logger_adapter: Logging adapter to the pipeline
+        :type logger_adapter: BaseLoggerAdapter
+        :param output_directory: Path to where the pipeline should output to.
+        :type output_directory: Path
+        :param input_files: Input files of this run, they need to have the
+            filetypes of the stored input files. Can be set later by
+            set_input.
+        :type input_files: list[Path] | None
+
+        :return: The pipeline ready to run.
+        :rtype: Pipeline
+
+        :Example:
+
+        >>> Pipeline.from_store("Sirius", Sqlite3PipelineStore(...), *adapters, Path(), [Path("spectra.mgf")])
+        Pipeline
+
+        :raises TypeError: If the arguments have the wrong type.
+        :raises ValueError: If no pipeline is stored under key or it contains
+            a step that is not registered.
+        :raises RuntimeError: If the stored pipeline can not be loaded.
+        """
+        if not isinstance(pipeline_store, BasePipelineStore):
+            raise TypeError("Pipeline store needs to be of type BasePipelineStore.")
+
+        loaded = pipeline_store.load_pipeline(key)
+
+        if loaded is None:
+            raise ValueError(f"No pipeline is stored under {key}.")
+
+        steps, input_filetypes = loaded
+        pipeline = cls(
+            persistent_adapter,
+            volatile_adapter,
+            logger_adapter,
+            output_directory,
+            **kwargs,
+        )
+
+        # The steps are validated against the stored input filetypes, the
+        # input files of the run are checked against them by set_input.
+        pipeline._current_input_filetypes = input_filetypes
+        pipeline._current_output_filetypes = input_filetypes
+
+        for step_name, io in steps:
+            pipeline.add_step(cls._resolve_step(step_name), io)
+
+        if input_files is not None:
+            pipeline.set_input(input_files)
+
+        return pipeline
+
+    def save(self, key: str, pipeline_store: BasePipelineStore):
+        """
+        Stores the steps of the pipeline, the answers they were configured
+        with and the filetypes of the input files, so the pipeline can be
+        rebuilt by from_store.
+
+        :param key: The key to store the pipeline with.
+        :type key: str
+        :param pipeline_store: Store to save the pipeline to.
+        :type pipeline_store: BasePipelineStore
+
+        :Example:
+
+        >>> save("Sirius", Sqlite3PipelineStore(...))
+
+        :raises TypeError: If the arguments have the wrong type or the
+            pipeline contains a SmallBaseStep, which can not be stored.
+        :raises ValueError: If the key is invalid or no input is set.
+        """
+        if not isinstance(pipeline_store, BasePipelineStore):
+            raise TypeError("Pipeline store needs to be of type BasePipelineStore.")
+
+        # The filetypes of the input files are stored to validate the steps
+        # and the input of the rebuilt pipeline.
+        if not self._input_files:
+            raise ValueError("Pipeline needs input files to be saved.")
+
+        pipeline_store.store_pipeline(
+            key,
+            [step[0] for step in self._steps],  # type: ignore
+            [step[4] for step in self._steps],
+            self._input_files,
+        )
 
     def set_input(self, input_files: list[Path]) -> "Pipeline":
         """
@@ -193,7 +310,9 @@ class Pipeline:
             self._output_directory / f"{len(self._steps)}_{temp_step.step_name()}"
         )
 
-        temp_step.install(temp_persistent_store, io, temp_logger)
+        if not temp_step.is_installed(temp_persistent_store):
+            temp_step.install(temp_persistent_store, io, temp_logger)
+
         temp_step.setup(temp_volatile_store, io, temp_logger)
 
         self._current_output_filetypes = temp_step.output_filetypes(
@@ -222,12 +341,14 @@ class Pipeline:
 
         """
         current_files = self._input_files
+        self._step_seconds = list()
 
         for i, step in enumerate(self._steps):
             temp_step = step[0]
             temp_persistent_store = step[1]
             temp_volatile_store = step[2]
             temp_logger = step[3]
+            start = time.perf_counter()
 
             if isinstance(temp_step, SmallBaseStep):
                 current_files = temp_step.run(
@@ -256,8 +377,41 @@ class Pipeline:
                     )
                     metadata.write(json_object)
 
+            self._step_seconds.append(
+                (f"{i}_{temp_step.step_name()}", time.perf_counter() - start)
+            )
+
         return current_files
 
+    def profile(self) -> dict[str, object]:
+        """
+        Returns the run time of every step of the last run and the metrics of
+        the store adapters. Store metrics are only collected by adapters
+        wrapped in an InstrumentedStoreAdapter, the others are None.
+
+        :return: Step run times in seconds and store metrics by adapter.
+        :rtype: dict[str, object]
+
+        :Example:
+
+        >>> profile()
+        {"steps": {"0_ShrinkMgf": 0.42}, "persistent": None,
+            "volatile": {"ShrinkMgf": {"operations": {...}, ...}}}
+        """
+        return {
+            "steps": dict(self._step_seconds),
+            "persistent": (
+                self.persistent_adapter.metrics()
+                if isinstance(self.persistent_adapter, InstrumentedStoreAdapter)
+                else None
+            ),
+            "volatile": (
+                self.volatile_adapter.metrics()
+                if isinstance(self.volatile_adapter, InstrumentedStoreAdapter)
+                else None
+            ),
+        }
+
     def get_possible_steps(self) -> list[Type[BaseStep | SmallBaseStep]]:
         """
         Returns a list of all possible steps that can run on the current
@@ -318,6 +472,29 @@ class Pipeline:
             raise TypeError("Step is not valid subclass of BaseStep")
 
         self._registered_steps.append(step)
+        self._step_classes.clear()
+
+    @classmethod
+    def _resolve_step(cls, step_name: str) -> Type[BaseStep | SmallBaseStep]:
+        """
+        Returns the registered step with the given name. The steps are
+        indexed by name once and again after a step is registered.
+
+        :raises ValueError: If no step with the name is registered.
+        """
+        step = cls._step_classes.get(step_name)
+
+        if step is None:
+            cls._step_classes.update(
+                (registered.step_name(), registered)
+                for registered in cls._registered_steps
+            )
+            step = cls._step_classes.get(step_name)
+
+        if step is None:
+            raise ValueError(f"Step {step_name} is not registered.")
+
+        return step
 
     def clear(self):
         """
@@ -96,6 +96,25 @@ class BaseStep(ABC):
         """
         raise NotImplementedError
 
+    def is_installed(self, persistent_store: BaseStore) -> bool:
+        """
+        Indicates whether the persistent store already holds everything
+        install would set up. The pipeline skips install for installed steps.
+        Steps not overriding the method are always installed again.
+
+        :param persistent_store: Persistent store of the step.
+        :type persistent_store: BaseStore
+
+        :return: True if install has nothing left to do.
+        :rtype: bool
+
+        :Example:
+
+        >>> is_installed(Store(...))
+        True
+        """
+        return False
+
     @abstractmethod
     def setup(self, volatile_store: BaseStore, io: BaseIo, logger: BaseLogger) -> None:
         """
@@ -2,3 +2,4 @@ from .mzmine3.mzmine3 import MZmine3
 from .shrink_mgf import ShrinkMgf
 from .sirius_fingerprint import SiriusFingerprint
 from .filter_mgf import FilterMgf
+from .sirius_results.sirius_results import SiriusResults
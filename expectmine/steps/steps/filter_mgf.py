@@ -42,6 +42,9 @@ class FilterMgf(BaseStep):
     def install(self, persistent_store: BaseStore, io: BaseIo, logger: BaseLogger):
         pass
 
+    def is_installed(self, persistent_store: BaseStore) -> bool:
+        return True
+
     def setup(self, volatile_store: BaseStore, io: BaseIo, logger: BaseLogger):
         should_discard_by_pepmass = io.boolean(
             "discard_pepmass", "Sould any pepmass be discarded?"
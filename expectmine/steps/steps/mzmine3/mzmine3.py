@@ -1,15 +1,26 @@
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from xml.etree import ElementTree
 
 from expectmine.io.base_io import BaseIo
 from expectmine.logger.base_logger import BaseLogger
 from expectmine.steps.base_step import BaseStep
 from expectmine.storage.base_storage import BaseStore
 from expectmine.utils.cmd import run_cmd
+from expectmine.utils.monitor import JVM_RSS_FACTOR, ProcessMonitor
+from expectmine.utils.resources import jvm_environment, resolve_resources
+from expectmine.utils.scheduler import default_scheduler
+from expectmine.utils.scratch import ScratchDirectory, scratch_root
+from expectmine.utils.version import probe_version
 
-from .utils import EXPORT_STEPS, IMPORT_STEPS, batchfile_has_spectral_library_files
+from .mzml import check_mzml_summary, inspect_mzml_files
+from .utils import BatchfileTemplate
+
+# MZmine3 keeps the spectra of all imported files in its temp directory, about
+# twice the size of the mzML files.
+SCRATCH_SPACE_FACTOR = 2
 
 
 class MZmine3(BaseStep):
@@ -54,6 +65,9 @@ class MZmine3(BaseStep):
                 persistent_store.put("mzmine3_path", str(temp_path.absolute()))
         logger.info("Install step finished.")
 
+    def is_installed(self, persistent_store: BaseStore) -> bool:
+        return persistent_store.exists("mzmine3_path")
+
     def setup(self, volatile_store: BaseStore, io: BaseIo, logger: BaseLogger):
         logger.info("Running setup step of MZmine3.")
 
@@ -64,7 +78,9 @@ class MZmine3(BaseStep):
             "batchfile", "Please select the MZmine3 batchfile:", validate_batchfile
         )
 
-        if batchfile_has_spectral_library_files(batchfile):
+        template = BatchfileTemplate(batchfile)
+
+        if template.has_spectral_library_files:
             spectral_library_files = io.filepaths(
                 "spectral_library_files",
                 "You included spectral library files, please specify the paths to the files you want to include.",
@@ -73,6 +89,68 @@ class MZmine3(BaseStep):
             volatile_store.put("spectral_library_files", spectral_library_files)
 
         volatile_store.put("batchfile", batchfile)
+        volatile_store.put("batchfile_template", template)
+
+        if io.boolean(
+            "advanced_settings",
+            "Do you want to configure advanced execution settings (cores, memory, timeout)?",
+            default=False,
+        ):
+
+            def validate_positive(num: int | float):
+                return num > 0
+
+            cores = int(
+                io.number("cores", "Number of cores for MZmine3:", validate_positive)
+            )
+            memory = int(
+                io.number(
+                    "memory", "Maximal JVM heap for MZmine3 in MiB:", validate_positive
+                )
+            )
+            logger.info(f"Using {cores} cores and {memory} MiB of memory.")
+            volatile_store.put_many({"cores": cores, "memory": memory})
+
+            def validate_timeout(num: int | float):
+                return num >= 0
+
+            timeout = io.number(
+                "timeout",
+                "Timeout of MZmine3 in minutes (0 for no timeout):",
+                validate_timeout,
+            )
+            if timeout:
+                logger.info(f"Terminating MZmine3 after {timeout} minutes.")
+                volatile_store.put("timeout", float(timeout))
+
+            if io.boolean(
+                "split_mode",
+                "Do you want to process groups of samples in parallel before a joint alignment run?",
+            ):
+                split_templates = template.split()
+
+                if not split_templates:
+                    raise ValueError(
+                        "Split mode requires an alignment step in the batchfile."
+                    )
+
+                samples_per_group = io.number(
+                    "samples_per_group",
+                    "How many samples should be processed per group?",
+                    validate_positive,
+                )
+                parallel_groups = io.number(
+                    "parallel_groups",
+                    "How many groups should be processed at the same time?",
+                    validate_positive,
+                )
+                logger.info(
+                    f"Split mode: {int(samples_per_group)} samples per group, "
+                    f"{int(parallel_groups)} groups in parallel."
+                )
+                volatile_store.put("split_templates", split_templates)
+                volatile_store.put("samples_per_group", int(samples_per_group))
+                volatile_store.put("parallel_groups", int(parallel_groups))
 
         logger.info("Setup step finished.")
 
@@ -87,110 +165,265 @@ class MZmine3(BaseStep):
         """
         INFO: The following step should work as following:
 
-        1. Check if it has no import if no, monkeypatch import.
-        2. Check if ms2 import is used, if yes, update files.
-        3. Update files in import step.
-        4. Update files in export step -> change current_file
+        1. Load the batchfile template parsed in setup (missing import and
+           sirius export steps have already been added).
+        2. Update files in import step and spectral library files if provided.
+        3. Update files in export step -> change current_file
 
-        6. Run step with batchfile
+        4. Run step with batchfile
         """
 
-        tree = ElementTree.parse(volatile_store.get("batchfile", Path))
-        root = tree.getroot()
+        self._preflight(input_files, persistent_store, volatile_store, logger)
 
-        input_steps = []
+        template = volatile_store.get("batchfile_template", BatchfileTemplate)
 
-        for element in IMPORT_STEPS:
-            for child in root.findall(f".//batchstep[@method='{element}']"):
-                input_steps.append(child)
+        if not template:
+            template = BatchfileTemplate(volatile_store.get("batchfile", Path))
 
-        if len(input_steps) > 1:
+        if template.input_step_count > 1:
             logger.warn("More than one input step detected.")
             logger.warn("The same input will be provided to each input step.")
 
-        if not input_steps:
+        if not template.input_step_count:
             logger.warn("No input step detected, adding default input step.")
-            input_tree = ElementTree.parse(
-                Path(os.path.dirname(__file__)) / "default_input_step.xml"
-            )
-            input_root = input_tree.getroot()
-            root.insert(0, input_root)
-            input_steps.append(input_root)
-
-        for input_step in input_steps:
-            for parameter in input_step.findall(".//parameter[@name='File names']"):
-                for files in parameter.findall(".//file"):
-                    parameter.remove(files)
-                for input_file in input_files:
-                    file = ElementTree.SubElement(parameter, "file")
-                    file.text = str(input_file.absolute())
-
-        if volatile_store.exists("spectral_library_files"):
-            logger.info("Changing spectral library files to provided path.")
-            for child in root.findall(
-                ".//batchstep[@method='io.github.mzmine.modules.io.import_rawdata_all.AllSpectralDataImportModule']"
-            ):
-                for parameter in child.findall(
-                    ".//parameter[@name='Spectral library files']"
-                ):
-                    for files in parameter.findall(".//file"):
-                        parameter.remove(files)
-                    for input_file in volatile_store.get(
-                        "spectral_library_files", list
-                    ):
-                        file = ElementTree.SubElement(parameter, "file")
-                        file.text = str(input_file.absolute())
-
-        has_output = False
-
-        for output_step in EXPORT_STEPS:
-            if root.findall(f".//batchstep[@method='{output_step}']"):
-                if has_output:
-                    logger.warn(
-                        "Multiple output steps detected, only rewriting SiriusExportModule. If you have any other "
-                        "steps, make sure they export to valid paths."
-                    )
-                has_output = True
 
-        sirius_steps = root.findall(
-            ".//batchstep[@method='io.github.mzmine.modules.io.export_features_sirius.SiriusExportModule']"
-        )
-
-        if not sirius_steps:
-            logger.info("Appending sirius output step")
-            output_tree = ElementTree.parse(
-                Path(os.path.dirname(__file__)) / "sirius_export_step.xml"
+        if template.export_step_count > 1:
+            logger.warn(
+                "Multiple output steps detected, only rewriting SiriusExportModule. If you have any other "
+                "steps, make sure they export to valid paths."
             )
-            output_root = output_tree.getroot()
-            root.append(output_root)
-            sirius_steps.append(output_root)
 
-        multithreaded_gapfill = root.find(
-            ".//batchstep[@method='io.github.mzmine.modules.dataprocessing.gapfill_peakfinder.multithreaded.MultiThreadPeakFinderModule']"
-        )
+        if template.added_output_step:
+            logger.info("Appending sirius output step")
 
         # FIXME: Find a long term solution for this case.
-        if multithreaded_gapfill and len(input_files) > 1:
+        if template.has_multithreaded_gapfill and len(input_files) > 1:
             logger.warn(
                 "Multi-threaded gapfill is used. It is known to cause issues when exporting data as there is "
                 "some unvolentary data duplication. Please consider using the non-multi-threaded one"
             )
 
-        for step in sirius_steps:
-            for parameter in step.findall(".//parameter[@name='Filename']"):
-                for file in parameter.findall(".//current_file"):
-                    parameter.remove(file)
-                file = ElementTree.SubElement(parameter, "current_file")
-                file.text = str((output_path / "sirius_output.mgf").absolute())
-
-        tree.write(
-            output_path / "modified_batchfile.xml",
-            encoding="utf-8",
-            xml_declaration=True,
-            short_empty_elements=True,
-            method="xml",
+        spectral_library_files = volatile_store.get("spectral_library_files", list)
+
+        if spectral_library_files:
+            logger.info("Changing spectral library files to provided path.")
+
+        cores, memory = resolve_resources(volatile_store)
+        timeout = volatile_store.get("timeout", float)
+        timeout = timeout * 60 if timeout else None
+        split_templates = volatile_store.get("split_templates", tuple)
+        usage: dict[str, list[dict[str, object]]] = {
+            "scratch_usage": [],
+            "resource_usage": [],
+        }
+
+        if split_templates:
+            output_file = self._run_split(
+                split_templates,
+                input_files,
+                output_path,
+                spectral_library_files,
+                cores,
+                memory,
+                usage,
+                volatile_store,
+                persistent_store,
+                logger,
+                timeout,
+            )
+        else:
+            output_file = output_path / "sirius_output.mgf"
+            self._run_batch(
+                template.render(input_files, output_file, spectral_library_files),
+                input_files,
+                output_path,
+                cores,
+                memory,
+                usage,
+                persistent_store,
+                logger,
+                timeout,
+            )
+
+        volatile_store.put_many(usage)
+
+        logger.info(f"For citation:\n {self.citation_and_disclaimer()}")
+
+        logger.info(f"Returning path {str(output_file.absolute())} for next step.")
+
+        return [output_file]
+
+    def _preflight(
+        self,
+        input_files: list[Path],
+        persistent_store: BaseStore,
+        volatile_store: BaseStore,
+        logger: BaseLogger,
+    ):
+        """
+        Inspects all input files before MZmine3 is started, so truncated or
+        unusable files fail the step in seconds instead of after the JVM ran
+        for a long time.
+
+        :raises ValueError: If any input file can not be processed.
+        """
+        logger.info(f"Inspecting {len(input_files)} input files.")
+        summaries = inspect_mzml_files(input_files, persistent_store)
+        volatile_store.put(
+            "mzml_inspections",
+            {str(path): summary for path, summary in summaries.items()},
+        )
+
+        failed = []
+        for path, summary in summaries.items():
+            errors, warnings = check_mzml_summary(summary)
+
+            for warning in warnings:
+                logger.warn(f"{path.name}: {warning}")
+
+            for error in errors:
+                logger.error(f"{path.name}: {error}")
+
+            if errors:
+                failed.append(path.name)
+
+        if failed:
+            raise ValueError(f"Input files can not be processed by MZmine3: {failed}")
+
+    def _run_split(
+        self,
+        split_templates: tuple[BatchfileTemplate, BatchfileTemplate],
+        input_files: list[Path],
+        output_path: Path,
+        spectral_library_files: list[Path] | None,
+        cores: int,
+        memory: int,
+        usage: dict[str, list[dict[str, object]]],
+        volatile_store: BaseStore,
+        persistent_store: BaseStore,
+        logger: BaseLogger,
+        timeout: float | None = None,
+    ) -> Path:
+        """
+        Runs the per-sample stage for groups of samples concurrently, each group
+        in its own MZmine3 process and temp directory, and afterward the joint
+        stage once over the intermediate feature lists. If one of the groups
+        fails, the remaining groups are cancelled.
+
+        :raises RuntimeError: If a group or the joint stage fails.
+        """
+        sample_template, joint_template = split_templates
+        samples_per_group = volatile_store.get("samples_per_group", int) or 1
+        parallel_groups = volatile_store.get("parallel_groups", int) or 1
+
+        groups = [
+            input_files[i : i + samples_per_group]
+            for i in range(0, len(input_files), samples_per_group)
+        ]
+        parallel_groups = min(parallel_groups, len(groups))
+        group_cores = max(1, cores // parallel_groups)
+        group_memory = max(256, memory // parallel_groups)
+
+        logger.info(
+            f"Running {len(groups)} sample groups, {parallel_groups} at a time with "
+            f"{group_cores} cores and {group_memory} MiB of memory each."
+        )
+
+        jobs: list[tuple[bytes, list[Path], Path]] = []
+        intermediate_files: list[Path] = []
+
+        # The template is mutated while rendering, so all batchfiles are
+        # rendered before any of the groups are started.
+        for index, group in enumerate(groups):
+            group_path = output_path / "samples" / str(index)
+            os.makedirs(group_path, exist_ok=True)
+            intermediate_file = group_path / "features.mzTab"
+            batchfile = sample_template.render(
+                group, intermediate_file, spectral_library_files
+            )
+            jobs.append((batchfile, group, group_path))
+            intermediate_files.append(intermediate_file)
+
+        cancel_event = threading.Event()
+        statuses: list[int | None] = [None] * len(jobs)
+
+        # Results are checked as the groups finish, the first failing group
+        # cancels the others.
+        with ThreadPoolExecutor(max_workers=parallel_groups) as executor:
+            futures = {
+                executor.submit(
+                    self._run_batch,
+                    *job,
+                    group_cores,
+                    group_memory,
+                    usage,
+                    persistent_store,
+                    logger,
+                    timeout,
+                    cancel_event,
+                ): index
+                for index, job in enumerate(jobs)
+            }
+
+            try:
+                for future in as_completed(futures):
+                    statuses[futures[future]] = future.result()
+
+                    if statuses[futures[future]] != 0:
+                        cancel_event.set()
+            except BaseException:
+                cancel_event.set()
+                raise
+
+        if any(status != 0 for status in statuses):
+            raise RuntimeError(
+                f"Per-sample stage failed for groups "
+                f"{[i for i, status in enumerate(statuses) if status != 0]}."
+            )
+
+        output_file = output_path / "sirius_output.mgf"
+        status = self._run_batch(
+            joint_template.render(
+                intermediate_files, output_file, spectral_library_files
+            ),
+            intermediate_files,
+            output_path,
+            cores,
+            memory,
+            usage,
+            persistent_store,
+            logger,
+            timeout,
         )
 
+        if status != 0:
+            raise RuntimeError(f"Joint stage failed with status code {status}.")
+
+        return output_file
+
+    def _run_batch(
+        self,
+        batchfile: bytes,
+        input_files: list[Path],
+        output_path: Path,
+        cores: int,
+        memory: int,
+        usage: dict[str, list[dict[str, object]]],
+        persistent_store: BaseStore,
+        logger: BaseLogger,
+        timeout: float | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> int:
+        """
+        Writes the batchfile and input list to output_path and runs MZmine3 on
+        them with its own scratch directory as temp directory. The usage of the
+        scratch directory and the resources used by the process tree are
+        appended to usage. MZmine3 is terminated after timeout seconds or once
+        cancel_event is set.
+        """
+        with open(output_path / "modified_batchfile.xml", "wb") as batchfile_handle:
+            batchfile_handle.write(batchfile)
+
         with open(output_path / "input.txt", "w") as input_textfile:
             for input_file in input_files:
                 input_textfile.write(f"{str(input_file.absolute())}\n")
@@ -199,35 +432,71 @@ class MZmine3(BaseStep):
             f"Running {persistent_store.get('mzmine3_path', str)} with batchfile "
             f"{str((output_path / 'modified_batchfile.xml').absolute())}"
         )
+        logger.info(f"Running with {cores} cores and {memory} MiB of memory.")
 
-        status, out, err = run_cmd(
-            persistent_store.get("mzmine3_path", str),
-            [
-                ("-b", str((output_path / "modified_batchfile.xml").absolute())),
-                ("-i", str((output_path / "input.txt").absolute())),
-                ("-temp", str((output_path / "temp").absolute())),
-            ],
+        required_space = SCRATCH_SPACE_FACTOR * sum(
+            os.path.getsize(file) for file in input_files if file.is_file()
         )
+
+        monitor = ProcessMonitor(
+            rss_limit=int(JVM_RSS_FACTOR * memory * 1024**2),
+            on_rss_limit=lambda rss: logger.warn(
+                f"MZmine3 uses {rss // 1024**2} MiB, more than expected for a "
+                f"heap of {memory} MiB."
+            ),
+        )
+
+        with default_scheduler().slots(
+            {"cpu": cores, "memory": memory},
+            cancel_event=cancel_event,
+            logger=logger,
+        ), ScratchDirectory(
+            scratch_root(output_path), "mzmine3", required_space
+        ) as scratch:
+            logger.info(f"Using scratch directory {str(scratch.path)}.")
+
+            status, out, err = run_cmd(
+                persistent_store.get("mzmine3_path", str),
+                [
+                    ("-b", str((output_path / "modified_batchfile.xml").absolute())),
+                    ("-i", str((output_path / "input.txt").absolute())),
+                    ("-temp", str(scratch.path)),
+                    ("-threads", str(cores)),
+                ],
+                env=jvm_environment(memory),
+                monitor=monitor,
+                timeout=timeout,
+                cancel_event=cancel_event,
+                logger=logger,
+            )
+            scratch.failed = status != 0
+
         logger.info(out)
         logger.error(err)
         logger.info(f"Finished running cmd with status code {status}.")
 
-        logger.info(f"For citation:\n {self.citation_and_disclaimer()}")
-
+        scratch_usage = scratch.usage()
+        usage["scratch_usage"].append(scratch_usage)
+        usage["resource_usage"].append(monitor.report())
         logger.info(
-            f"Returning path {str((output_path / 'sirius_output.mgf').absolute())} for next step."
+            f"Scratch directory used {int(scratch_usage['size']) // 1024**2} MiB."
         )
+        logger.info(f"Resource usage: {monitor.summary()}")
 
-        return [(output_path / "sirius_output.mgf")]
+        if scratch_usage["kept"]:
+            logger.warn(
+                f"Keeping scratch directory {scratch_usage['path']} for debugging."
+            )
+
+        return status
 
     def metadata(
         self, persistent_store: BaseStore, volatile_store: BaseStore
     ) -> dict[str, object]:
         metadata = {}
 
-        status, out, err = run_cmd(
-            persistent_store.get("mzmine3_path", str),
-            ["--version"],
+        status, out, err = probe_version(
+            persistent_store, persistent_store.get("mzmine3_path", str)
         )
 
         for line in err.splitlines():
@@ -242,6 +511,24 @@ class MZmine3(BaseStep):
 
         metadata["python_version"] = sys.version
 
+        for key in ["scratch_usage", "resource_usage"]:
+            usage = volatile_store.get(key, list)
+
+            if usage:
+                metadata[key] = usage
+
+        inspections = volatile_store.get("mzml_inspections", dict)
+
+        if inspections:
+            metadata["input_files"] = {
+                Path(path).name: {
+                    "scan_count": summary["scan_count"],
+                    "ms_levels": summary["ms_levels"],
+                    "rt_range": summary["rt_range"],
+                }
+                for path, summary in inspections.items()
+            }
+
         return metadata
 
     @classmethod
@@ -0,0 +1,231 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from xml.etree import ElementTree
+
+from expectmine.storage.base_storage import BaseStore
+from expectmine.storage.utils import value_hash
+from expectmine.utils.resources import available_cores
+
+MS_LEVEL = "MS:1000511"
+SCAN_START_TIME = "MS:1000016"
+MINUTE = "UO:0000031"
+# Summaries are cached under this prefix followed by the hash of the file.
+INSPECTION_KEY_PREFIX = "mzml_inspection_"
+INDEX_OFFSET_PATTERN = re.compile(rb"<indexListOffset>\s*(\d+)\s*</indexListOffset>")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _index_offset(path: Path) -> int | None:
+    # The offset of the index is written at the very end of indexed mzML files.
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        match = INDEX_OFFSET_PATTERN.search(f.read())
+
+        if not match:
+            return None
+
+        f.seek(int(match.group(1)))
+        return int(match.group(1)) if f.read(10) == b"<indexList" else -1
+
+
+def inspect_mzml(path: Path) -> dict[str, object]:
+    """
+    Streams through a mzML file and summarizes it without loading the spectra
+    into memory. Parsing stops once the run is closed, so the index of indexed
+    mzML files is never parsed. The summary contains the following keys:
+
+    - ``scan_count``: Number of spectra found.
+    - ``declared_scan_count``: Count attribute of the spectrumList or None.
+    - ``ms_levels``: Number of spectra per MS level (keys are strings).
+    - ``rt_range``: First and last scan start time in seconds or None.
+    - ``indexed``: Whether the file has a valid index.
+    - ``complete``: Whether the document was read until the end of the run.
+    - ``error``: Description of the first problem found or None.
+
+    :param path: Path to the mzML file.
+    :type path: Path
+
+    :return: Summary of the file.
+    :rtype: dict[str, object]
+
+    :Example:
+
+    >>> inspect_mzml(Path("1.mzML"))
+    {"scan_count": 2, "declared_scan_count": 2, "ms_levels": {"1": 1, "2": 1},
+    "rt_range": [0.0, 1.2], "indexed": True, "complete": True, "error": None}
+    """
+    summary: dict[str, object] = {
+        "scan_count": 0,
+        "declared_scan_count": None,
+        "ms_levels": {},
+        "rt_range": None,
+        "indexed": False,
+        "complete": False,
+        "error": None,
+    }
+    ms_levels: dict[str, int] = {}
+    scan_count = 0
+    rt_min, rt_max = None, None
+    in_spectrum = False
+
+    try:
+        index_offset = _index_offset(path)
+        summary["indexed"] = bool(index_offset and index_offset > 0)
+        if index_offset == -1:
+            summary["error"] = "Index offset does not point to the index."
+
+        with open(path, "rb") as f:
+            for event, element in ElementTree.iterparse(f, events=("start", "end")):
+                tag = _local_name(element.tag)
+
+                if event == "start":
+                    if tag == "spectrum":
+                        in_spectrum = True
+                    elif tag == "spectrumList" and element.get("count", "").isdigit():
+                        summary["declared_scan_count"] = int(element.get("count", ""))
+                    elif tag == "indexList":
+                        break
+                    continue
+
+                if tag == "cvParam" and in_spectrum:
+                    accession = element.get("accession")
+                    if accession == MS_LEVEL:
+                        level = element.get("value", "")
+                        ms_levels[level] = ms_levels.get(level, 0) + 1
+                    elif accession == SCAN_START_TIME:
+                        rt = float(element.get("value", "nan"))
+                        if element.get("unitAccession") == MINUTE:
+                            rt *= 60
+                        rt_min = rt if rt_min is None else min(rt_min, rt)
+                        rt_max = rt if rt_max is None else max(rt_max, rt)
+                elif tag == "spectrum":
+                    in_spectrum = False
+                    scan_count += 1
+                    element.clear()
+                elif tag == "binaryDataArray":
+                    # The encoded peaks are by far the largest part of the file.
+                    element.clear()
+                elif tag == "mzML":
+                    summary["complete"] = True
+                    break
+    except ElementTree.ParseError as e:
+        summary["error"] = f"File is truncated or malformed ({e})."
+    except (OSError, ValueError) as e:
+        summary["error"] = f"File could not be read ({e})."
+
+    summary["scan_count"] = scan_count
+    summary["ms_levels"] = ms_levels
+    summary["rt_range"] = [rt_min, rt_max] if rt_min is not None else None
+
+    if not summary["complete"] and not summary["error"]:
+        summary["error"] = "File ends before the run is closed."
+
+    return summary
+
+
+def inspect_mzml_files(
+    paths: list[Path],
+    persistent_store: BaseStore | None = None,
+    max_workers: int | None = None,
+) -> dict[Path, dict[str, object]]:
+    """
+    Inspects multiple mzML files in parallel processes. If a persistent store
+    is provided, the summary of every file is cached under a key of the sha256
+    hash of its content, so unchanged files are only inspected once.
+
+    :param paths: Paths to the mzML files.
+    :type paths: list[Path]
+    :param persistent_store: Store used to cache the summaries.
+    :type persistent_store: BaseStore | None
+    :param max_workers: Maximal number of processes, defaults to the
+        available cores.
+    :type max_workers: int | None
+
+    :return: Summary of inspect_mzml for every path.
+    :rtype: dict[Path, dict[str, object]]
+
+    :Example:
+
+    >>> inspect_mzml_files([Path("1.mzML"), Path("2.mzML")], Store(...))
+    {Path("1.mzML"): {...}, Path("2.mzML"): {...}}
+    """
+    keys = {path: INSPECTION_KEY_PREFIX + value_hash(path) for path in paths}
+    cache = (
+        persistent_store.get_many(list(set(keys.values())), dict)
+        if persistent_store
+        else {}
+    )
+
+    missing = list({path for path in paths if not cache.get(keys[path])})
+
+    if missing:
+        workers = min(len(missing), max_workers or available_cores())
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                summaries = list(executor.map(inspect_mzml, missing))
+        else:
+            summaries = [inspect_mzml(path) for path in missing]
+
+        inspected = {keys[path]: summary for path, summary in zip(missing, summaries)}
+        cache.update(inspected)
+
+        if persistent_store:
+            persistent_store.put_many(inspected)
+
+    return {path: cache[keys[path]] for path in paths}
+
+
+def check_mzml_summary(summary: dict[str, object]) -> tuple[list[str], list[str]]:
+    """
+    Checks a summary of inspect_mzml for problems. Errors are problems MZmine3
+    can not recover from or which leave the sirius export empty, warnings are
+    problems worth reporting.
+
+    :param summary: Summary returned by inspect_mzml.
+    :type summary: dict[str, object]
+
+    :return: Tuple of error and warning messages.
+    :rtype: tuple[list[str], list[str]]
+
+    :Example:
+
+    >>> check_mzml_summary(inspect_mzml(Path("ms1_only.mzML")))
+    ["No MS2 spectra found."], []
+    """
+    errors: list[str] = []
+    warnings: list[str] = []
+    ms_levels = summary["ms_levels"]
+    declared_scan_count = summary["declared_scan_count"]
+
+    if summary["error"]:
+        errors.append(str(summary["error"]))
+
+    if not summary["scan_count"]:
+        errors.append("No spectra found.")
+    elif not any(level != "1" for level in ms_levels):  # type: ignore
+        errors.append("No MS2 spectra found.")
+
+    if (
+        declared_scan_count is not None
+        and summary["complete"]
+        and declared_scan_count != summary["scan_count"]
+    ):
+        errors.append(
+            f"Found {summary['scan_count']} spectra, but {declared_scan_count} "
+            f"are declared."
+        )
+
+    if not summary["indexed"]:
+        warnings.append("File is not indexed.")
+
+    if summary["scan_count"] and summary["rt_range"] is None:
+        warnings.append("No retention times found.")
+
+    return errors, warnings
@@ -1,20 +1,9 @@
+import copy
+import os
+from functools import lru_cache
 from pathlib import Path
 from xml.etree import ElementTree
 
-
-def batchfile_has_spectral_library_files(batchfile: Path) -> bool:
-    tree = ElementTree.parse(batchfile)
-    root = tree.getroot()
-
-    for child in root.findall(
-        ".//batchstep[@method='io.github.mzmine.modules.io.import_rawdata_all.AllSpectralDataImportModule']"
-    ):
-        for parameter in child.findall(".//parameter[@name='Spectral library files']"):
-            for files in parameter.findall(".//file"):
-                return True
-    return False
-
-
 IMPORT_STEPS = [
     "io.github.mzmine.modules.io.import_rawdata_all.AllSpectralDataImportModule",
     "io.github.mzmine.modules.io.import_rawdata_mzml.MSDKmzMLImportModule",
@@ -27,3 +16,244 @@ EXPORT_STEPS = [
     "io.github.mzmine.modules.io.export_features_featureML.FeatureMLExportModularModule",
     "io.github.mzmine.modules.io.export_features_all_speclib_matches.ExportAllIdsGraphicalModule",
 ]
+SPECTRAL_IMPORT_STEP = (
+    "io.github.mzmine.modules.io.import_rawdata_all.AllSpectralDataImportModule"
+)
+SIRIUS_EXPORT_STEP = (
+    "io.github.mzmine.modules.io.export_features_sirius.SiriusExportModule"
+)
+SPLIT_EXPORT_STEP = (
+    "io.github.mzmine.modules.io.export_features_mztabm.MZTabmExportModule"
+)
+SPLIT_IMPORT_STEP = (
+    "io.github.mzmine.modules.io.import_features_mztabmf.MZTabmImportModule"
+)
+# Steps which need the features of all samples at once. Everything before the
+# first of these steps is done per sample and can be split off.
+ALIGNMENT_STEPS = [
+    "io.github.mzmine.modules.dataprocessing.align_join.JoinAlignerModule",
+    "io.github.mzmine.modules.dataprocessing.align_ransac.RansacAlignerModule",
+    "io.github.mzmine.modules.dataprocessing.align_gc.GCAlignerModule",
+    "io.github.mzmine.modules.dataprocessing.align_hierarchical.HierarAlignerGcModule",
+    "io.github.mzmine.modules.dataprocessing.align_adap3.ADAP3AlignerModule",
+]
+MULTITHREADED_GAPFILL_STEP = (
+    "io.github.mzmine.modules.dataprocessing.gapfill_peakfinder.multithreaded."
+    "MultiThreadPeakFinderModule"
+)
+
+
+@lru_cache(maxsize=None)
+def _step_template(filename: str) -> ElementTree.Element:
+    return ElementTree.parse(Path(os.path.dirname(__file__)) / filename).getroot()
+
+
+def _parameters(
+    steps: list[ElementTree.Element], name: str
+) -> list[ElementTree.Element]:
+    return [
+        parameter
+        for step in steps
+        for parameter in step.iter("parameter")
+        if parameter.get("name") == name
+    ]
+
+
+def _replace_children(parameter: ElementTree.Element, tag: str, values: list[str]):
+    for child in parameter.findall(tag):
+        parameter.remove(child)
+
+    for value in values:
+        ElementTree.SubElement(parameter, tag).text = value
+
+
+class BatchfileTemplate:
+    """
+    Batchfile parsed once into a template which can be rendered for any set of
+    input files. All batchsteps are indexed by method in a single pass over the
+    document. The parameters which are rewritten on every run (input files,
+    spectral library files and the sirius output file) are resolved once, so
+    rendering does not need any further XPath queries or parsing. Missing
+    input or sirius export steps are added from the default templates.
+    """
+
+    def __init__(
+        self,
+        batchfile: Path | ElementTree.Element,
+        input_methods: list[str] | None = None,
+        output_method: str = SIRIUS_EXPORT_STEP,
+        input_template: str = "default_input_step.xml",
+        output_template: str = "sirius_export_step.xml",
+    ):
+        """
+        Parses the batchfile and prepares the template.
+
+        :param batchfile: Path to the MZmine3 batchfile or an already parsed
+            batch element.
+        :type batchfile: Path | ElementTree.Element
+        :param input_methods: Methods of the steps which receive the input
+            files, defaults to IMPORT_STEPS.
+        :type input_methods: list[str] | None
+        :param output_method: Method of the step which receives the output file.
+        :type output_method: str
+        :param input_template: Step template added if there is no input step.
+        :type input_template: str
+        :param output_template: Step template added if there is no output step.
+        :type output_template: str
+
+        :Example:
+
+        >>> BatchfileTemplate(Path("batch.xml"))
+        BatchfileTemplate
+
+        :raises ParseError: If the batchfile is not valid XML.
+        """
+        if isinstance(batchfile, ElementTree.Element):
+            self.root = batchfile
+        else:
+            self.root = ElementTree.parse(batchfile).getroot()
+
+        input_methods = input_methods if input_methods else IMPORT_STEPS
+
+        steps: dict[str, list[ElementTree.Element]] = {}
+        for step in self.root.iter("batchstep"):
+            steps.setdefault(step.get("method", ""), []).append(step)
+
+        input_steps = [
+            step for method in input_methods for step in steps.get(method, [])
+        ]
+        self.input_step_count = len(input_steps)
+
+        if not input_steps:
+            input_step = copy.deepcopy(_step_template(input_template))
+            self.root.insert(0, input_step)
+            input_steps.append(input_step)
+
+        self.export_step_count = len(
+            [method for method in EXPORT_STEPS if steps.get(method)]
+        )
+
+        output_steps = list(steps.get(output_method, []))
+        self.added_output_step = not output_steps
+
+        if not output_steps:
+            output_step = copy.deepcopy(_step_template(output_template))
+            self.root.append(output_step)
+            output_steps.append(output_step)
+
+        self.has_multithreaded_gapfill = bool(steps.get(MULTITHREADED_GAPFILL_STEP))
+
+        self._input_parameters = _parameters(input_steps, "File names")
+        self._library_parameters = _parameters(
+            steps.get(SPECTRAL_IMPORT_STEP, []), "Spectral library files"
+        )
+        self._output_parameters = _parameters(output_steps, "Filename")
+
+        self.has_spectral_library_files = any(
+            parameter.find(".//file") is not None
+            for parameter in self._library_parameters
+        )
+
+    def render(
+        self,
+        input_files: list[Path],
+        output_file: Path,
+        spectral_library_files: list[Path] | None = None,
+    ) -> bytes:
+        """
+        Rewrites the input files, spectral library files and output file of the
+        template and returns the serialized batchfile.
+
+        :param input_files: Input files of the import steps.
+        :type input_files: list[Path]
+        :param output_file: File the output step (sirius export) writes to.
+        :type output_file: Path
+        :param spectral_library_files: Spectral library files, if None the files
+            of the batchfile are kept.
+        :type spectral_library_files: list[Path] | None
+
+        :return: The batchfile as utf-8 encoded XML.
+        :rtype: bytes
+
+        :Example:
+
+        >>> render([Path("1.mzML")], Path("sirius_output.mgf"))
+        b"<?xml version='1.0' encoding='utf-8'?>..."
+        """
+        files = [str(file.absolute()) for file in input_files]
+        for parameter in self._input_parameters:
+            _replace_children(parameter, "file", files)
+
+        if spectral_library_files is not None:
+            libraries = [str(file.absolute()) for file in spectral_library_files]
+            for parameter in self._library_parameters:
+                _replace_children(parameter, "file", libraries)
+
+        for parameter in self._output_parameters:
+            _replace_children(parameter, "current_file", [str(output_file.absolute())])
+
+        return ElementTree.tostring(
+            self.root,
+            encoding="utf-8",
+            xml_declaration=True,
+            short_empty_elements=True,
+            method="xml",
+        )
+
+    def split(self) -> tuple["BatchfileTemplate", "BatchfileTemplate"] | None:
+        """
+        Splits the batchfile at the first alignment step into a per-sample
+        stage and a joint stage. The per-sample stage exports its feature lists
+        as mzTab-M, which the joint stage imports again before aligning. The
+        sirius export stays in the joint stage.
+
+        :return: Tuple of the per-sample and the joint template, or None if the
+            batchfile has no alignment step or starts with it.
+        :rtype: tuple[BatchfileTemplate, BatchfileTemplate] | None
+
+        :Example:
+
+        >>> split()
+        (BatchfileTemplate, BatchfileTemplate)
+        """
+        steps = [step for step in self.root if step.tag == "batchstep"]
+        split_index = next(
+            (
+                index
+                for index, step in enumerate(steps)
+                if step.get("method") in ALIGNMENT_STEPS
+            ),
+            None,
+        )
+
+        # An alignment as first step leaves no per-sample stage to run in
+        # parallel, the batchfile runs as a whole.
+        if split_index is None or split_index == 0:
+            return None
+
+        sample_root = ElementTree.Element(self.root.tag, self.root.attrib)
+        sample_root.extend(copy.deepcopy(step) for step in steps[:split_index])
+
+        joint_root = ElementTree.Element(self.root.tag, self.root.attrib)
+        joint_root.extend(
+            copy.deepcopy(step)
+            for step in steps[split_index:]
+            if step.get("method") not in IMPORT_STEPS
+        )
+
+        return (
+            BatchfileTemplate(
+                sample_root,
+                output_method=SPLIT_EXPORT_STEP,
+                output_template="split_export_step.xml",
+            ),
+            BatchfileTemplate(
+                joint_root,
+                input_methods=[SPLIT_IMPORT_STEP],
+                input_template="split_import_step.xml",
+            ),
+        )
+
+
+def batchfile_has_spectral_library_files(batchfile: Path) -> bool:
+    return BatchfileTemplate(batchfile).has_spectral_library_files
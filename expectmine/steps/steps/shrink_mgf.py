@@ -29,6 +29,9 @@ class ShrinkMgf(BaseStep):
     def install(self, persistent_store: BaseStore, io: BaseIo, logger: BaseLogger):
         pass
 
+    def is_installed(self, persistent_store: BaseStore) -> bool:
+        return True
+
     def setup(self, volatile_store: BaseStore, io: BaseIo, logger: BaseLogger):
         number_of_compounds = io.number(
             "compounds_per_file",
@@ -4,7 +4,11 @@ from expectmine.io.base_io import BaseIo
 from expectmine.logger.base_logger import BaseLogger
 from expectmine.steps.base_step import BaseStep
 from expectmine.storage.base_storage import BaseStore
-from expectmine.utils.cmd import run_cmd
+from expectmine.utils.cmd import run_cmds
+from expectmine.utils.monitor import JVM_RSS_FACTOR, ProcessMonitor
+from expectmine.utils.resources import jvm_environment, resolve_resources
+from expectmine.utils.scheduler import default_scheduler
+from expectmine.utils.version import probe_version
 
 
 class SiriusFingerprint(BaseStep):
@@ -46,6 +50,9 @@ class SiriusFingerprint(BaseStep):
 
         logger.info("Install step finished.")
 
+    def is_installed(self, persistent_store: BaseStore) -> bool:
+        return persistent_store.exists("sirius_path")
+
     def setup(self, volatile_store: BaseStore, io: BaseIo, logger: BaseLogger):
         logger.info("Running setup step of SiriusFingerprint.")
         set_max_mz = io.boolean(
@@ -70,6 +77,38 @@ class SiriusFingerprint(BaseStep):
 
         volatile_store.put("instrument", instrument)
 
+        if io.boolean(
+            "advanced_settings",
+            "Do you want to configure advanced execution settings (cores, memory, timeout)?",
+            default=False,
+        ):
+
+            def validate_positive(num: int | float):
+                return num > 0
+
+            cores = int(
+                io.number("cores", "Number of cores for Sirius:", validate_positive)
+            )
+            memory = int(
+                io.number(
+                    "memory", "Maximal JVM heap for Sirius in MiB:", validate_positive
+                )
+            )
+            logger.info(f"Using {cores} cores and {memory} MiB of memory.")
+            volatile_store.put_many({"cores": cores, "memory": memory})
+
+            def validate_timeout(num: int | float):
+                return num >= 0
+
+            timeout = io.number(
+                "timeout",
+                "Timeout of Sirius in minutes (0 for no timeout):",
+                validate_timeout,
+            )
+            if timeout:
+                logger.info(f"Terminating Sirius after {timeout} minutes.")
+                volatile_store.put("timeout", float(timeout))
+
         logger.info("Setup step finished.")
 
     def run(
@@ -80,34 +119,66 @@ class SiriusFingerprint(BaseStep):
         volatile_store: BaseStore,
         logger: BaseLogger,
     ) -> list[Path]:
-        logger.info(f"Running {persistent_store.get('sirius_path', str)}")
+        sirius_path = persistent_store.get("sirius_path", str)
+        logger.info(f"Running {sirius_path}")
 
         max_mz = volatile_store.get("max_mz", int)
 
-        input_files_string = [f"-i {str(file.absolute())}" for file in input_files]
-
-        login = (
-            f"{persistent_store.get('sirius_path', str)} login --user-env=SIRIUS_USERNAME "
-            "--password-env=SIRIUS_PASSWORD"
-        )
-        run_file = (
-            f"{persistent_store.get('sirius_path', str)} {str(max_mz) if max_mz else ''} "
-            f"{' '.join(input_files_string)} "
-            f"-o {str((output_path / 'output').absolute())}"
-        )
-
-        sirius_command_pipeline = (
-            f"sirius -p {volatile_store.get('instrument', str)} "
-            "fingerprint "
-            "structure -d ALL "
-            "write-summaries"
+        login: list[tuple[str, str] | str] = [
+            "login",
+            "--user-env=SIRIUS_USERNAME",
+            "--password-env=SIRIUS_PASSWORD",
+        ]
+        cores, memory = resolve_resources(volatile_store)
+        timeout = volatile_store.get("timeout", float)
+        logger.info(f"Running with {cores} cores and {memory} MiB of memory.")
+
+        run_file: list[tuple[str, str] | str] = [("--cores", str(cores))]
+
+        if max_mz:
+            run_file.append(("--maxmz", str(max_mz)))
+
+        run_file.extend(("-i", str(file.absolute())) for file in input_files)
+        run_file.append(("-o", str((output_path / "output").absolute())))
+
+        sirius_command_pipeline: list[tuple[str, str] | str] = [
+            "sirius",
+            ("-p", volatile_store.get("instrument", str)),
+            "fingerprint",
+            "structure",
+            ("-d", "ALL"),
+            "write-summaries",
+        ]
+
+        monitor = ProcessMonitor(
+            rss_limit=int(JVM_RSS_FACTOR * memory * 1024**2),
+            on_rss_limit=lambda rss: logger.warn(
+                f"Sirius uses {rss // 1024**2} MiB, more than expected for a "
+                f"heap of {memory} MiB."
+            ),
         )
 
-        status, out, err = run_cmd(f"{login} && {run_file} {sirius_command_pipeline}")
+        # Sirius needs a license seat while it is running, the number of seats
+        # can be limited with EXPECTMINE_SLOTS="sirius-license=<seats>".
+        with default_scheduler().slots(
+            {"cpu": cores, "memory": memory, "sirius-license": 1}, logger=logger
+        ):
+            status, out, err = run_cmds(
+                [
+                    (sirius_path, login),
+                    (sirius_path, run_file + sirius_command_pipeline),
+                ],
+                env=jvm_environment(memory),
+                monitor=monitor,
+                timeout=timeout * 60 if timeout else None,
+                logger=logger,
+            )
 
         logger.info(out)
         logger.error(err)
         logger.info(f"Finished running cmd with status code {status}.")
+        logger.info(f"Resource usage: {monitor.summary()}")
+        volatile_store.put("resource_usage", [monitor.report()])
         logger.info(
             f"Returning path {str((output_path / 'output').absolute())} "
             "for next step."
@@ -120,9 +191,8 @@ class SiriusFingerprint(BaseStep):
     ) -> dict[str, object]:
         metadata: dict[str, object] = {}
 
-        status, out, err = run_cmd(
-            persistent_store.get("sirius_path", str),
-            ["--version"],
+        status, out, err = probe_version(
+            persistent_store, persistent_store.get("sirius_path", str)
         )
 
         for line in out.split("\n"):
@@ -133,6 +203,11 @@ class SiriusFingerprint(BaseStep):
             elif "SIRIUS" in line:
                 metadata["sirius_version"] = line.split(" ")[-1]
 
+        resource_usage = volatile_store.get("resource_usage", list)
+
+        if resource_usage:
+            metadata["resource_usage"] = resource_usage
+
         return metadata
 
     @classmethod
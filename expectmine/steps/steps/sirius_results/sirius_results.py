@@ -0,0 +1,93 @@
+from pathlib import Path
+
+from expectmine.io.base_io import BaseIo
+from expectmine.logger.base_logger import BaseLogger
+from expectmine.steps.base_step import BaseStep
+from expectmine.storage.base_storage import BaseStore
+
+from .utils import export_top_candidates, ingest_sirius_output
+
+
+class SiriusResults(BaseStep):
+    """
+    Ingests the candidate summaries of a Sirius project (output of
+    SiriusFingerprint) into an indexed sqlite3 database keyed by compound id
+    and exports the best candidates of each compound as a compact .tsv file.
+    The database can be queried with the helpers in
+    expectmine.steps.steps.sirius_results.utils.
+    """
+
+    @classmethod
+    def step_name(cls) -> str:
+        return "SiriusResults"
+
+    @classmethod
+    def can_run(cls, input_files: list[str]) -> bool:
+        return all([file == "*/*.tsv" for file in input_files]) and len(input_files) > 0
+
+    @classmethod
+    def output_filetypes(cls, input_files: list[str]) -> list[str]:
+        return [".db", ".tsv"]
+
+    def install(self, persistent_store: BaseStore, io: BaseIo, logger: BaseLogger):
+        pass
+
+    def is_installed(self, persistent_store: BaseStore) -> bool:
+        return True
+
+    def setup(self, volatile_store: BaseStore, io: BaseIo, logger: BaseLogger):
+        logger.info("Running setup step of SiriusResults.")
+
+        def validate_top_k(num: int | float):
+            return num >= 1
+
+        top_k = io.number(
+            "top_k",
+            "How many candidates per compound should be exported?",
+            validate_top_k,
+        )
+
+        logger.info(f"Exporting the {int(top_k)} best candidates per compound.")
+        volatile_store.put("top_k", int(top_k))
+
+        logger.info("Setup step finished.")
+
+    def run(
+        self,
+        input_files: list[Path],
+        output_path: Path,
+        persistent_store: BaseStore,
+        volatile_store: BaseStore,
+        logger: BaseLogger,
+    ) -> list[Path]:
+        top_k = volatile_store.get("top_k", int)
+
+        if not top_k:
+            raise ValueError("The top_k variable is not set in the volatile store.")
+
+        database = output_path / "sirius_results.db"
+
+        logger.info(f"Ingesting Sirius summaries into {str(database.absolute())}")
+        counts = ingest_sirius_output(input_files, database)
+        volatile_store.put("candidate_counts", counts)
+        logger.info(f"Ingested candidates: {counts}")
+
+        export = output_path / "top_candidates.tsv"
+        written = export_top_candidates(database, export, top_k)
+        logger.info(f"Exported {written} candidates to {str(export.absolute())}")
+
+        return [database, export]
+
+    def metadata(
+        self, persistent_store: BaseStore, volatile_store: BaseStore
+    ) -> dict[str, object]:
+        counts = volatile_store.get("candidate_counts", dict)
+
+        return {"candidate_counts": counts if counts else {}}
+
+    @classmethod
+    def citation_and_disclaimer(cls) -> str:
+        return """
+            This step only restructures the output of Sirius, please cite the
+            publications listed by the SiriusFingerprint step.
+        """
@@ -0,0 +1,309 @@
+import csv
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Iterator
+
+CANDIDATE_FILES = {
+    "structure": "structure_candidates.tsv",
+    "formula": "formula_candidates.tsv",
+}
+SCORE_COLUMNS = {
+    "structure": ["CSI:FingerIDScore", "ConfidenceScore"],
+    "formula": ["ZodiacScore", "SiriusScore", "TreeScore"],
+}
+
+
+def _parse_float(value: str | None) -> float | None:
+    if value is None or value in ("", "N/A", "NaN", "-Infinity", "Infinity"):
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _candidate_rows(
+    sirius_outputs: list[Path], kind: str
+) -> Iterator[tuple[str, int | None, float | None, str, str, str, str, str, str]]:
+    """
+    Streams the rows of all candidate summaries of the given kind. Only the
+    top level of each project directory is scanned, the summary file of each
+    compound is opened directly instead of walking the compound directory.
+    """
+    filename = CANDIDATE_FILES[kind]
+
+    for sirius_output in sirius_outputs:
+        with os.scandir(sirius_output) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+
+                try:
+                    handle = open(Path(entry.path) / filename, "r", newline="")
+                except FileNotFoundError:
+                    continue
+
+                with handle:
+                    for row in csv.DictReader(handle, delimiter="\t"):
+                        score = None
+                        for column in SCORE_COLUMNS[kind]:
+                            score = _parse_float(row.get(column))
+                            if score is not None:
+                                break
+
+                        yield (
+                            entry.name,
+                            _parse_int(row.get("rank")),
+                            score,
+                            row.get("molecularFormula") or "",
+                            row.get("adduct") or "",
+                            row.get("InChIkey2D") or "",
+                            row.get("name") or "",
+                            row.get("smiles") or "",
+                            json.dumps(row, separators=(",", ":")),
+                        )
+
+
+def ingest_sirius_output(sirius_outputs: list[Path], database: Path) -> dict[str, int]:
+    """
+    Streams the structure and formula candidate summaries of one or more Sirius
+    project directories into an indexed sqlite3 database keyed by compound id.
+    An existing database at the given path is replaced.
+
+    :param sirius_outputs: Sirius project directories (output of SiriusFingerprint).
+    :type sirius_outputs: list[Path]
+    :param database: Path of the database to create.
+    :type database: Path
+
+    :return: Number of ingested rows per candidate kind.
+    :rtype: dict[str, int]
+
+    :Example:
+
+    >>> ingest_sirius_output([Path("output")], Path("sirius_results.db"))
+    {"structure": 1200, "formula": 5300}
+
+    :raises ValueError: If any of the sirius outputs is not a directory.
+    """
+    if not all(sirius_output.is_dir() for sirius_output in sirius_outputs):
+        raise ValueError("Sirius outputs need to be directories.")
+
+    database.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(database, isolation_level=None)
+    counts: dict[str, int] = {}
+
+    try:
+        cur = conn.cursor()
+        # The database is derived data and can always be rebuilt from the
+        # project directory, durability is traded for load speed.
+        cur.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            """)
+        cur.execute("BEGIN;")
+
+        for kind in CANDIDATE_FILES:
+            cur.execute(f"""
+                CREATE TABLE {kind}_candidates (
+                    compound_id TEXT NOT NULL,
+                    rank INTEGER,
+                    score REAL,
+                    molecular_formula TEXT,
+                    adduct TEXT,
+                    inchikey2d TEXT,
+                    name TEXT,
+                    smiles TEXT,
+                    summary TEXT NOT NULL
+                );
+                """)
+            cur.executemany(
+                f"""
+                INSERT INTO {kind}_candidates
+                (compound_id, rank, score, molecular_formula, adduct, inchikey2d, name, smiles, summary)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                _candidate_rows(sirius_outputs, kind),
+            )
+            counts[kind] = cur.execute(
+                f"SELECT COUNT(*) FROM {kind}_candidates;"
+            ).fetchone()[0]
+
+            # Indexes are built after the bulk insert, which is considerably
+            # faster than maintaining them row by row.
+            cur.execute(f"""
+                CREATE INDEX {kind}_compound_index
+                ON {kind}_candidates (compound_id, score DESC);
+                """)
+            cur.execute(
+                f"CREATE INDEX {kind}_score_index ON {kind}_candidates (score DESC);"
+            )
+
+        cur.execute("COMMIT;")
+    finally:
+        conn.close()
+
+    return counts
+
+
+def validate_kind(kind: str):
+    """
+    Validates that the given candidate kind is known. Throws an error
+    if not.
+
+    :param kind: Candidate kind, either "structure" or "formula".
+    :type kind: str
+
+    :raises ValueError: If the kind is unknown.
+    """
+    if kind not in CANDIDATE_FILES:
+        raise ValueError(f"Kind needs to be one of {', '.join(CANDIDATE_FILES)}.")
+
+
+def top_candidates(
+    database: Path, k: int, kind: str = "structure", compound_id: str | None = None
+) -> list[dict[str, object]]:
+    """
+    Returns the k best candidates by score, either over all compounds or for a
+    single compound. The original summary row is returned under the key
+    "summary".
+
+    :param database: Database created by ingest_sirius_output.
+    :type database: Path
+    :param k: Number of candidates to return.
+    :type k: int
+    :param kind: Candidate kind, either "structure" or "formula".
+    :type kind: str
+    :param compound_id: Optional compound to restrict the query to.
+    :type compound_id: str | None
+
+    :return: List of candidates ordered by descending score.
+    :rtype: list[dict[str, object]]
+
+    :Example:
+
+    >>> top_candidates(Path("sirius_results.db"), 1, compound_id="1_output_12")
+    [{"compound_id": "1_output_12", "rank": 1, "score": -12.4, ...}]
+
+    :raises ValueError: If the kind is unknown or k is smaller than one.
+    """
+    validate_kind(kind)
+
+    if k < 1:
+        raise ValueError("k needs to be at least one.")
+
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+
+    try:
+        if compound_id is None:
+            res = conn.execute(
+                f"""
+                SELECT * FROM {kind}_candidates
+                WHERE score IS NOT NULL
+                ORDER BY score DESC
+                LIMIT ?;
+                """,
+                (k,),
+            )
+        else:
+            res = conn.execute(
+                f"""
+                SELECT * FROM {kind}_candidates
+                WHERE compound_id = ?
+                ORDER BY score DESC
+                LIMIT ?;
+                """,
+                (compound_id, k),
+            )
+
+        candidates = [dict(row) for row in res]
+    finally:
+        conn.close()
+
+    for candidate in candidates:
+        candidate["summary"] = json.loads(str(candidate["summary"]))
+
+    return candidates
+
+
+def export_top_candidates(
+    database: Path, path: Path, k: int = 1, kind: str = "structure"
+) -> int:
+    """
+    Writes the k best candidates of every compound into a single compact TSV
+    file containing only the most relevant columns.
+
+    :param database: Database created by ingest_sirius_output.
+    :type database: Path
+    :param path: Path of the TSV file to write.
+    :type path: Path
+    :param k: Number of candidates per compound.
+    :type k: int
+    :param kind: Candidate kind, either "structure" or "formula".
+    :type kind: str
+
+    :return: Number of rows written.
+    :rtype: int
+
+    :Example:
+
+    >>> export_top_candidates(Path("sirius_results.db"), Path("top.tsv"), 3)
+    3000
+
+    :raises ValueError: If the kind is unknown or k is smaller than one.
+    """
+    validate_kind(kind)
+
+    if k < 1:
+        raise ValueError("k needs to be at least one.")
+
+    columns = [
+        "compound_id",
+        "rank",
+        "score",
+        "molecular_formula",
+        "adduct",
+        "inchikey2d",
+        "name",
+        "smiles",
+    ]
+
+    conn = sqlite3.connect(database)
+    written = 0
+
+    try:
+        res = conn.execute(
+            f"""
+            SELECT {', '.join(columns)} FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY compound_id ORDER BY score DESC
+                ) AS position
+                FROM {kind}_candidates
+            )
+            WHERE position <= ?
+            ORDER BY compound_id, position;
+            """,
+            (k,),
+        )
+
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle, delimiter="\t")
+            writer.writerow(columns)
+            for row in res:
+                writer.writerow(row)
+                written += 1
+    finally:
+        conn.close()
+
+    return written
@@ -0,0 +1,71 @@
+from typing import Any, Dict, List
+
+from expectmine.storage.base_storage import BaseStore
+from expectmine.storage.base_storage_adapter import BaseStoreAdapter
+from expectmine.storage.stores.caching_store import CachingStore, LruCache
+from expectmine.storage.utils import validate_step_name
+
+# Default bound of the decoded values kept in memory.
+CACHE_SIZE = 64 * 1024**2
+
+
+class CachingStoreAdapter(BaseStoreAdapter):
+    """
+    Pipeline storage adapter wrapping the stores of another adapter in a
+    read-through cache. All stores of the adapter share one LRU cache.
+
+    :Example:
+
+    >>> adapter = CachingStoreAdapter(Sqlite3StoreAdapter(path, temp_path))
+    >>> adapter.get_instance("Sirius").get("sirius_path", str)
+    "/opt/sirius/bin/sirius"
+    >>> adapter.stats()
+    {"hits": 0, "misses": 1, "evictions": 0, "entries": 1, "size": 71}
+    """
+
+    def __init__(
+        self,
+        adapter: BaseStoreAdapter,
+        max_size: int = CACHE_SIZE,
+        **kwargs: Dict[Any, Any],
+    ):
+        """
+        Creates the adapter.
+
+        :param adapter: The adapter producing the wrapped stores.
+        :type adapter: BaseStoreAdapter
+        :param max_size: Maximal size of the cached values in bytes.
+        :type max_size: int
+
+        :raises TypeError: If adapter is not a BaseStoreAdapter.
+        """
+        if not isinstance(adapter, BaseStoreAdapter):
+            raise TypeError("adapter needs to be of type BaseStoreAdapter.")
+
+        self.adapter = adapter
+        self.persistent_path = getattr(adapter, "persistent_path", None)
+        self.working_directory = getattr(adapter, "working_directory", None)
+        self.kwargs = kwargs
+        self.cache = LruCache(max_size)
+
+    def get_instance(
+        self, step_name: str, *args: List[Any], **kwargs: Dict[Any, Any]
+    ) -> BaseStore:
+        validate_step_name(step_name)
+        return CachingStore(
+            step_name,
+            self.persistent_path,  # type: ignore
+            self.working_directory,  # type: ignore
+            store=self.adapter.get_instance(step_name, *args, **kwargs),
+            cache=self.cache,
+        )
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit, miss and eviction counters and the size of the
+        cache.
+
+        :return: Counters and size of the shared cache.
+        :rtype: dict[str, int]
+        """
+        return self.cache.stats()
@@ -0,0 +1,29 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+from expectmine.storage.base_storage import BaseStore
+from expectmine.storage.base_storage_adapter import BaseStoreAdapter
+from expectmine.storage.stores.file_store import FileStore
+from expectmine.storage.utils import validate_adapter_init, validate_step_name
+
+
+class FileStoreAdapter(BaseStoreAdapter):
+    """
+    Pipeline storage adapter for FileStore.
+    """
+
+    def __init__(
+        self, persistent_path: Path, working_directory: Path, **kwargs: Dict[Any, Any]
+    ):
+        validate_adapter_init(persistent_path, working_directory)
+        self.persistent_path = persistent_path
+        self.working_directory = working_directory
+        self.kwargs = kwargs
+
+    def get_instance(
+        self, step_name: str, *args: List[Any], **kwargs: Dict[Any, Any]
+    ) -> BaseStore:
+        validate_step_name(step_name)
+        return FileStore(
+            step_name, self.persistent_path, self.working_directory, **self.kwargs
+        )
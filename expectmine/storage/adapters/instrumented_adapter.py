@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from expectmine.storage.adapters.caching_adapter import CachingStoreAdapter
+from expectmine.storage.base_storage import BaseStore
+from expectmine.storage.base_storage_adapter import BaseStoreAdapter
+from expectmine.storage.stores.instrumented_store import InstrumentedStore, StoreMetrics
+from expectmine.storage.utils import validate_step_name
+
+
+class InstrumentedStoreAdapter(BaseStoreAdapter):
+    """
+    Pipeline storage adapter measuring the stores of another adapter. All
+    stores of the adapter record into one StoreMetrics object, which is read
+    through metrics and written to a file by export. If the wrapped adapter
+    is a CachingStoreAdapter, the cache hits of every step are included.
+
+    :Example:
+
+    >>> adapter = InstrumentedStoreAdapter(Sqlite3StoreAdapter(path, temp_path))
+    >>> adapter.get_instance("Sirius").get("sirius_path", str)
+    "/opt/sirius/bin/sirius"
+    >>> adapter.metrics()["Sirius"]["operations"]["get"]["count"]
+    1
+    """
+
+    def __init__(self, adapter: BaseStoreAdapter, **kwargs: Dict[Any, Any]):
+        """
+        Creates the adapter.
+
+        :param adapter: The adapter producing the measured stores.
+        :type adapter: BaseStoreAdapter
+
+        :raises TypeError: If adapter is not a BaseStoreAdapter.
+        """
+        if not isinstance(adapter, BaseStoreAdapter):
+            raise TypeError("adapter needs to be of type BaseStoreAdapter.")
+
+        self.adapter = adapter
+        self.persistent_path = getattr(adapter, "persistent_path", None)
+        self.working_directory = getattr(adapter, "working_directory", None)
+        self.kwargs = kwargs
+        self.store_metrics = StoreMetrics()
+
+    def get_instance(
+        self, step_name: str, *args: List[Any], **kwargs: Dict[Any, Any]
+    ) -> BaseStore:
+        validate_step_name(step_name)
+        return InstrumentedStore(
+            step_name,
+            self.persistent_path,  # type: ignore
+            self.working_directory,  # type: ignore
+            store=self.adapter.get_instance(step_name, *args, **kwargs),
+            metrics=self.store_metrics,
+        )
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the operation counters, latency histograms and the bytes read
+        and written of every step, and the cache hits if the wrapped adapter
+        caches.
+
+        :return: Metrics by step name.
+        :rtype: dict[str, dict[str, Any]]
+
+        :Example:
+
+        >>> metrics()
+        {"Sirius": {"operations": {"get": {"count": 1, "errors": 0,
+            "seconds": 0.0002, "histogram": {...}}}, "bytes_in": 0,
+            "bytes_out": 71, "cache": {"hits": 0, "misses": 1,
+            "hit_rate": 0.0}}}
+        """
+        metrics = self.store_metrics.snapshot()
+
+        if isinstance(self.adapter, CachingStoreAdapter):
+            for step_name, step in metrics.items():
+                cache = self.adapter.cache.namespace_stats(step_name)
+                lookups = cache["hits"] + cache["misses"]
+                step["cache"] = {
+                    **cache,
+                    "hit_rate": cache["hits"] / lookups if lookups else None,
+                }
+
+        return metrics
+
+    def export(self, path: Path):
+        """
+        Writes the metrics as JSON file. The file is replaced atomically, so
+        it can be read by a monitoring agent while the pipeline runs.
+
+        :param path: Path of the metrics file.
+        :type path: Path
+
+        :Example:
+
+        >>> export(Path("output/store_metrics.json"))
+        """
+        fd, temp_path = tempfile.mkstemp(
+            prefix=f".{path.name}.", suffix=".tmp", dir=path.parent
+        )
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.metrics(), f, indent=4)
+
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
@@ -0,0 +1,61 @@
+from multiprocessing.managers import SyncManager
+from pathlib import Path
+from typing import Any, Dict, List
+
+from expectmine.storage.base_storage import BaseStore
+from expectmine.storage.base_storage_adapter import BaseStoreAdapter
+from expectmine.storage.stores.shared_in_memory_store import SharedInMemoryStore
+from expectmine.storage.utils import validate_adapter_init, validate_step_name
+
+
+class SharedInMemoryStoreAdapter(BaseStoreAdapter):
+    """
+    Pipeline storage adapter for SharedInMemoryStore. Starts a server process
+    holding the values of all stores, which runs until the adapter is shut
+    down or the process which created it exits. The adapter and its stores
+    can be passed to worker processes.
+
+    :Example:
+
+    >>> adapter = SharedInMemoryStoreAdapter(path, temp_path)
+    >>> with multiprocessing.Pool(4) as pool:
+    ...     pool.map(run_step, [adapter] * 4)
+    >>> adapter.shutdown()
+    """
+
+    def __init__(
+        self, persistent_path: Path, working_directory: Path, **kwargs: Dict[Any, Any]
+    ):
+        validate_adapter_init(persistent_path, working_directory)
+        self.persistent_path = persistent_path
+        self.working_directory = working_directory
+        self.kwargs = kwargs
+
+        self._manager = SyncManager()
+        self._manager.start()
+        self.storage = self._manager.dict()
+
+    def get_instance(
+        self, step_name: str, *args: List[Any], **kwargs: Dict[Any, Any]
+    ) -> BaseStore:
+        validate_step_name(step_name)
+        return SharedInMemoryStore(
+            step_name,
+            self.persistent_path,
+            self.working_directory,
+            storage=self.storage,
+            **self.kwargs,
+        )
+
+    def shutdown(self):
+        """
+        Stops the server process, the values of all stores are lost. Only
+        the process which created the adapter can shut it down.
+        """
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Worker processes only get the proxy of the values, the server
+        # process is owned by the creating process.
+        return {**self.__dict__, "_manager": None}
@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class BaseBlobStore(ABC):
+    """
+    Content addressed store for large values. Every blob is stored once under
+    the sha256 hash of its content, no matter how many keys reference it. The
+    store counts the references of every blob, a blob is removed once its
+    last reference is released.
+    """
+
+    @abstractmethod
+    def __init__(self, persistent_path: Path, **kwargs: Dict[Any, Any]):
+        """
+        Creates the blob store.
+
+        :param persistent_path: The path which the blob store can use to
+            persist data.
+        :type persistent_path: Path
+
+        :Example:
+
+        >>> BaseBlobStore(Path("output"))
+        BaseBlobStore
+
+        :raises TypeError: If the path is not of type Path.
+        :raises ValueError: If the path is empty.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, value: bytes | Path) -> str:
+        """
+        Stores the content of a value and adds a reference to it. Content
+        which is already stored is not written again.
+
+        :param value: The bytes or the file to store.
+        :type value: bytes | Path
+
+        :return: The sha256 hash of the content.
+        :rtype: str
+
+        :Example:
+
+        >>> put(b"hello")
+        "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+
+        >>> put(Path("batch.xml"))
+        "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """
+        Returns the content of a blob.
+
+        :param content_hash: The hash returned by put.
+        :type content_hash: str
+
+        :return: The content, None if the blob does not exist.
+        :rtype: bytes | None
+
+        :Example:
+
+        >>> get("2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+        b"hello"
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def copy_to(self, content_hash: str, path: Path) -> bool:
+        """
+        Writes the content of a blob to a file, without loading it into
+        memory.
+
+        :param content_hash: The hash returned by put.
+        :type content_hash: str
+        :param path: The file to write.
+        :type path: Path
+
+        :return: False if the blob does not exist.
+        :rtype: bool
+
+        :Example:
+
+        >>> copy_to("9f86...", Path("output/temp/batch.xml"))
+        True
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, content_hash: str) -> None:
+        """
+        Removes a reference to a blob. The blob is removed with its last
+        reference.
+
+        :param content_hash: The hash returned by put.
+        :type content_hash: str
+
+        :Example:
+
+        >>> release("2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def references(self, content_hash: str) -> int:
+        """
+        Returns the number of references to a blob.
+
+        :param content_hash: The hash returned by put.
+        :type content_hash: str
+
+        :return: Number of references, 0 if the blob does not exist.
+        :rtype: int
+
+        :Example:
+
+        >>> references("2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+        2
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def collect_garbage(self) -> int:
+        """
+        Removes blobs without references and content left behind by
+        interrupted writes.
+
+        :return: Number of bytes freed.
+        :rtype: int
+
+        :Example:
+
+        >>> collect_garbage()
+        1048576
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def usage(self) -> dict[str, int]:
+        """
+        Returns the number of blobs, their total size and the number of
+        references to them.
+
+        :return: Dict with the keys blobs, size and references.
+        :rtype: dict[str, int]
+
+        :Example:
+
+        >>> usage()
+        {"blobs": 2, "size": 2097152, "references": 5}
+        """
+        raise NotImplementedError
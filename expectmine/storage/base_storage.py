@@ -52,9 +52,10 @@ class BaseStore(ABC):
         :param key: The key to associate with the value. A key cannot be
             empty. Keys have a maximum length of 255 characters.
         :type key: str
-        :param value: The value (object or file) to store. The maximum size
-            of an object is 25 MiB. The object needs to be Pickled. In case
-            of a filepath the maximum size of the file is 100MiB.
+        :param value: The value (object or file) to store. Objects are
+            encoded with the first value codec supporting them, the maximum
+            size of an object is 25 MiB once encoded. In case of a filepath
+            the maximum size of the file is 100MiB.
         :type value: object | Path
 
         :Example:
@@ -69,10 +70,34 @@ class BaseStore(ABC):
 
         :raises TypeError: If the arguments have the wrong type.
         :raises ValueError: If either the key is empty or too long, the
-            value is not pickleable or too big.
+            value is not supported by any value codec or too big.
         """
         raise NotImplementedError
 
+    def put_many(self, values: dict[str, object | Path]) -> None:
+        """
+        Inserts all key value pairs into the store, see put. Stores
+        implementing this natively insert all pairs at once, either all
+        pairs are stored or none.
+
+        :param values: The key value pairs to store.
+        :type values: dict[str, object | Path]
+
+        :Example:
+
+        >>> put_many({"hello": "World", "file": Path("hello.txt")})
+
+        >>> put_many({"": "World"})
+        ValueError("Key can not be empty")
+
+
+        :raises TypeError: If the arguments have the wrong type.
+        :raises ValueError: If any key is empty or too long, or any value is
+            not supported by any value codec or too big.
+        """
+        for key, value in values.items():
+            self.put(key, value)
+
     @abstractmethod
     def get(self, key: str, returning: Type[T]) -> Optional[T]:
         """
@@ -109,6 +134,31 @@ class BaseStore(ABC):
         """
         raise NotImplementedError
 
+    def get_many(
+        self, keys: list[str], returning: Type[T] = object
+    ) -> dict[str, Optional[T]]:
+        """
+        Returns the values of the given keys, see get.
+
+        :param keys: The keys to return the values of.
+        :type keys: list[str]
+        :param returning: The type of all returned objects.
+        :type returning: T
+
+        :return: The object of every key, None if the key does not exist.
+        :rtype: dict[str, T | None]
+
+        :Example:
+
+        >>> get_many(["hello", "unknown_key"], str)
+        {"hello": "World", "unknown_key": None}
+
+        :raises TypeError: If the arguments have the wrong type.
+        :raises ValueError: If there is a type mismatch between returning
+            and any returned value, or if any key is empty or too long.
+        """
+        return {key: self.get(key, returning) for key in keys}
+
     @abstractmethod
     def delete(self, key: str) -> None:
         """
@@ -128,6 +178,23 @@ class BaseStore(ABC):
         """
         raise NotImplementedError
 
+    def delete_many(self, keys: list[str]) -> None:
+        """
+        Deletes the values associated to the given keys, see delete.
+
+        :param keys: The keys to delete.
+        :type keys: list[str]
+
+        :Example:
+
+        >>> delete_many(["hello", "file"])
+
+        :raises TypeError: If the arguments have the wrong type.
+        :raises ValueError: If any key is empty or too long.
+        """
+        for key in keys:
+            self.delete(key)
+
     @abstractmethod
     def list(self) -> list[str]:
         """
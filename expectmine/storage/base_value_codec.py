@@ -0,0 +1,53 @@
+from abc import ABC, abstractmethod
+
+
+class BaseValueCodec(ABC):
+    """
+    Serializes the objects stores can not keep natively. The name of the
+    codec is stored next to every encoded value, so stores can decode values
+    written with other codecs.
+    """
+
+    # Tag stored with the encoded values.
+    name: str
+
+    @abstractmethod
+    def encode(self, value: object) -> bytes:
+        """
+        Encodes an object.
+
+        :param value: The object to encode.
+        :type value: object
+
+        :return: The encoded object.
+        :rtype: bytes
+
+        :Example:
+
+        >>> encode({"cores": 8})
+        b"\\x81\\xa5cores\\x08"
+
+        :raises TypeError: If the codec can not encode the object, the next
+            codec is tried then.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, data: bytes) -> object:
+        """
+        Decodes an object encoded by encode.
+
+        :param data: The encoded object.
+        :type data: bytes
+
+        :return: The decoded object.
+        :rtype: object
+
+        :Example:
+
+        >>> decode(b"\\x81\\xa5cores\\x08")
+        {"cores": 8}
+
+        :raises ValueError: If the data is not valid.
+        """
+        raise NotImplementedError
@@ -0,0 +1,163 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from expectmine.storage.base_blob_store import BaseBlobStore
+from expectmine.storage.sqlite3_connection import (
+    ensure_schema,
+    get_connection,
+    retry_busy,
+    transaction,
+)
+from expectmine.storage.utils import validate_pipeline_store_init, value_hash
+
+SCHEMA = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS blob_table (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+);
+COMMIT;
+"""
+
+ADD_REFERENCE = """
+INSERT INTO blob_table (hash, size, refs) VALUES (?, ?, 1)
+ON CONFLICT (hash) DO UPDATE SET refs = refs + 1
+RETURNING refs;
+"""
+REMOVE_REFERENCE = (
+    "UPDATE blob_table SET refs = refs - 1 WHERE hash = ? RETURNING refs;"
+)
+DELETE_HASH = "DELETE FROM blob_table WHERE hash = ?;"
+DELETE_UNREFERENCED = "DELETE FROM blob_table WHERE refs <= 0 RETURNING hash;"
+LIST_HASHES = "SELECT hash FROM blob_table;"
+REFERENCES = "SELECT refs FROM blob_table WHERE hash = ?;"
+USAGE = (
+    "SELECT count(*), coalesce(sum(size), 0), coalesce(sum(refs), 0) FROM blob_table;"
+)
+
+
+class FilesystemBlobStore(BaseBlobStore):
+    """
+    Blob store keeping every blob as a file in the directory blobs of the
+    persistent path, named by its hash. The references are counted in an
+    index database in the same directory. Files are written and removed while
+    holding the write lock of the index, so processes sharing the directory
+    never remove a blob another one just referenced.
+    """
+
+    def __init__(self, persistent_path: Path, **kwargs: Dict[Any, Any]):
+        validate_pipeline_store_init(persistent_path)
+
+        self.directory = persistent_path / "blobs"
+        self.database = self.directory / "index.db"
+        self.kwargs = kwargs
+
+        os.makedirs(self.directory, exist_ok=True)
+        ensure_schema(self.database, "FilesystemBlobStore", SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return get_connection(self.database)
+
+    def path(self, content_hash: str) -> Path:
+        """
+        Returns the path of the file of a blob, which is shared by all
+        references and must not be modified.
+
+        :param content_hash: The hash returned by put.
+        :type content_hash: str
+
+        :return: Path of the blob, the file only exists if the blob does.
+        :rtype: Path
+
+        :Example:
+
+        >>> path("2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+        Path("output/blobs/2c/f24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+        """
+        return self.directory / content_hash[:2] / content_hash[2:]
+
+    @retry_busy
+    def put(self, value: bytes | Path) -> str:
+        content_hash = value_hash(value)
+        size = value.stat().st_size if isinstance(value, Path) else len(value)
+        path = self.path(content_hash)
+
+        with transaction(self.conn, immediate=True) as cur:
+            cur.execute(ADD_REFERENCE, (content_hash, size)).fetchall()
+
+            # Content is only written once, or again if the file was lost.
+            if not path.is_file():
+                os.makedirs(path.parent, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix=".", dir=path.parent)
+
+                with os.fdopen(fd, "wb") as f:
+                    if isinstance(value, Path):
+                        with open(value, "rb") as source:
+                            shutil.copyfileobj(source, f)
+                    else:
+                        f.write(value)
+
+                os.replace(temp_path, path)
+
+        return content_hash
+
+    def get(self, content_hash: str) -> Optional[bytes]:
+        try:
+            return self.path(content_hash).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def copy_to(self, content_hash: str, path: Path) -> bool:
+        try:
+            shutil.copyfile(self.path(content_hash), path)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    @retry_busy
+    def release(self, content_hash: str):
+        with transaction(self.conn, immediate=True) as cur:
+            res = cur.execute(REMOVE_REFERENCE, (content_hash,)).fetchall()
+
+            if res and res[0][0] <= 0:
+                cur.execute(DELETE_HASH, (content_hash,))
+                self.path(content_hash).unlink(missing_ok=True)
+
+    def references(self, content_hash: str) -> int:
+        res = self.conn.execute(REFERENCES, (content_hash,)).fetchone()
+
+        return res[0] if res else 0
+
+    @retry_busy
+    def collect_garbage(self) -> int:
+        freed = 0
+
+        with transaction(self.conn, immediate=True) as cur:
+            cur.execute(DELETE_UNREFERENCED).fetchall()
+            hashes = {row[0] for row in cur.execute(LIST_HASHES)}
+
+            # Files without references and temp files of interrupted writes.
+            for directory, _, files in os.walk(self.directory):
+                if Path(directory) == self.directory:
+                    continue
+
+                for file in files:
+                    path = Path(directory) / file
+
+                    if Path(directory).name + file not in hashes:
+                        freed += path.stat().st_size
+                        path.unlink()
+
+        return freed
+
+    def usage(self) -> dict[str, int]:
+        blobs, size, references = self.conn.execute(USAGE).fetchone()
+
+        return {"blobs": blobs, "size": size, "references": references}
@@ -0,0 +1,182 @@
+import io
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+from expectmine.storage.base_blob_store import BaseBlobStore
+from expectmine.storage.compression import (
+    COMPRESSION_THRESHOLD,
+    DecompressingWriter,
+    compress,
+    compress_file,
+    decompress,
+    validate_codec,
+)
+from expectmine.storage.sqlite3_connection import (
+    ensure_schema,
+    get_connection,
+    read_blob,
+    retry_busy,
+    transaction,
+    write_blob,
+)
+from expectmine.storage.utils import validate_pipeline_store_init, value_hash
+
+SCHEMA = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS blob_table (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL,
+    content BLOB,
+    codec TEXT
+);
+COMMIT;
+"""
+
+ADD_REFERENCE = """
+INSERT INTO blob_table (hash, size, refs, content) VALUES (?, ?, 1, zeroblob(?))
+ON CONFLICT (hash) DO UPDATE SET refs = refs + 1
+RETURNING rowid, refs;
+"""
+# Compressed blobs replace the zeroblob of the raw size.
+SET_CONTENT = "UPDATE blob_table SET codec = ?, content = zeroblob(?) WHERE rowid = ?;"
+REMOVE_REFERENCE = "UPDATE blob_table SET refs = refs - 1 WHERE hash = ?;"
+DELETE_UNREFERENCED = "DELETE FROM blob_table WHERE refs <= 0 RETURNING size;"
+DELETE_UNREFERENCED_HASH = "DELETE FROM blob_table WHERE hash = ? AND refs <= 0;"
+GET = "SELECT content, codec FROM blob_table WHERE hash = ?;"
+GET_ROWID = "SELECT rowid, codec FROM blob_table WHERE hash = ?;"
+REFERENCES = "SELECT refs FROM blob_table WHERE hash = ?;"
+USAGE = (
+    "SELECT count(*), coalesce(sum(size), 0), coalesce(sum(refs), 0) FROM blob_table;"
+)
+
+
+def _migrate(conn: sqlite3.Connection):
+    # Databases created before blobs were compressed, their blobs are raw.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(blob_table);")]
+
+    if "codec" not in columns:
+        conn.execute("ALTER TABLE blob_table ADD COLUMN codec TEXT;")
+
+
+class Sqlite3BlobStore(BaseBlobStore):
+    """
+    Blob store keeping the blobs in the sqlite3 database of the persistent
+    path. Used together with a Sqlite3Store on the same database, references
+    are added and released in the transactions of the store.
+
+    Blobs can be compressed, the hash and the size always refer to the raw
+    content.
+    """
+
+    def __init__(self, persistent_path: Path, **kwargs: Dict[Any, Any]):
+        """
+        :param compression: Codec blobs are compressed with, passed as keyword
+            argument. Blobs are stored raw by default.
+        :type compression: str | None
+        :param compression_threshold: Smallest size in bytes which is
+            compressed, passed as keyword argument.
+        :type compression_threshold: int
+        """
+        validate_pipeline_store_init(persistent_path)
+
+        os.makedirs(persistent_path, exist_ok=True)
+        self.database = persistent_path / "sqlite.db"
+        self.kwargs = kwargs
+        self.compression: Optional[str] = kwargs.get("compression")  # type: ignore
+        self.compression_threshold: int = kwargs.get(  # type: ignore
+            "compression_threshold", COMPRESSION_THRESHOLD
+        )
+
+        validate_codec(self.compression)
+        ensure_schema(self.database, "Sqlite3BlobStore", SCHEMA, _migrate)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return get_connection(self.database)
+
+    @retry_busy
+    def put(self, value: bytes | Path) -> str:
+        content_hash = value_hash(value)
+        size = value.stat().st_size if isinstance(value, Path) else len(value)
+
+        with transaction(self.conn) as cur:
+            rowid, refs = cur.execute(
+                ADD_REFERENCE, (content_hash, size, size)
+            ).fetchall()[0]
+
+            if refs == 1:
+                with self._content(value, size) as (f, codec, stored_size):
+                    if codec:
+                        cur.execute(SET_CONTENT, (codec, stored_size, rowid))
+                    write_blob(self.conn, "blob_table", "content", rowid, f)
+
+        return content_hash
+
+    def get(self, content_hash: str) -> Optional[bytes]:
+        res = self.conn.execute(GET, (content_hash,)).fetchone()
+
+        return decompress(bytes(res[0]), res[1]) if res else None
+
+    def copy_to(self, content_hash: str, path: Path) -> bool:
+        res = self.conn.execute(GET_ROWID, (content_hash,)).fetchone()
+
+        if res is None:
+            return False
+
+        with open(path, "wb") as f:
+            if res[1]:
+                with DecompressingWriter(f, res[1]) as writer:
+                    read_blob(self.conn, "blob_table", "content", res[0], writer)  # type: ignore
+            else:
+                read_blob(self.conn, "blob_table", "content", res[0], f)
+
+        return True
+
+    @retry_busy
+    def release(self, content_hash: str):
+        with transaction(self.conn) as cur:
+            cur.execute(REMOVE_REFERENCE, (content_hash,))
+            cur.execute(DELETE_UNREFERENCED_HASH, (content_hash,))
+
+    def references(self, content_hash: str) -> int:
+        res = self.conn.execute(REFERENCES, (content_hash,)).fetchone()
+
+        return res[0] if res else 0
+
+    @retry_busy
+    def collect_garbage(self) -> int:
+        with transaction(self.conn) as cur:
+            return sum(row[0] for row in cur.execute(DELETE_UNREFERENCED).fetchall())
+
+    def usage(self) -> dict[str, int]:
+        blobs, size, references = self.conn.execute(USAGE).fetchone()
+
+        return {"blobs": blobs, "size": size, "references": references}
+
+    @contextmanager
+    def _content(
+        self, value: bytes | Path, size: int
+    ) -> Iterator[tuple[BinaryIO, Optional[str], int]]:
+        """
+        Opens the content of a new blob, compressed if the codec saves enough
+        space. Yields the content, the tag of the codec and the stored size.
+        """
+        codec = None
+
+        if self.compression is None or size < self.compression_threshold:
+            source = open(value, "rb") if isinstance(value, Path) else io.BytesIO(value)
+        elif isinstance(value, Path):
+            source, codec, _ = compress_file(value, self.compression)
+        else:
+            content, codec = compress(value, self.compression)
+            source = io.BytesIO(content)
+
+        with source:
+            stored_size = source.seek(0, os.SEEK_END)
+            source.seek(0)
+
+            yield source, codec, stored_size
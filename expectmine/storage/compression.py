@@ -0,0 +1,222 @@
+import hashlib
+import lzma
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional
+
+# Compressors and decompressors by codec tag. The tag is stored next to every
+# compressed value, so values stay readable when the configured codec
+# changes. Values without a tag are stored raw. The default levels are the
+# fastest ones, higher levels barely shrink spectra further (see
+# benchmarks/compression_benchmark.py).
+CODECS: dict[str, tuple[Callable[[Optional[int]], Any], Callable[[], Any]]] = {
+    "zlib": (
+        lambda level: zlib.compressobj(1 if level is None else level),
+        zlib.decompressobj,
+    ),
+    "lzma": (
+        lambda level: lzma.LZMACompressor(preset=1 if level is None else level),
+        lzma.LZMADecompressor,
+    ),
+}
+# Values below this size are not compressed.
+COMPRESSION_THRESHOLD = 4096
+# Compressed values are only kept if they save at least a tenth of the size,
+# otherwise decompressing them is not worth it.
+MIN_SAVING = 0.1
+# Size of the chunks files are compressed in.
+CHUNK_SIZE = 1024**2
+
+
+def validate_codec(codec: Optional[str]):
+    """
+    Validates that a codec is known. Throws an error if not.
+
+    :param codec: Tag of the codec, None for raw values.
+    :type codec: str | None
+
+    :Example:
+
+    >>> validate_codec("zlib")
+
+
+    >>> validate_codec("zstd")
+    ValueError("Unknown codec zstd.")
+
+
+    :raises ValueError: If the codec is unknown.
+    """
+    if codec is not None and codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec}.")
+
+
+def compress(
+    data: bytes,
+    codec: Optional[str],
+    threshold: int = COMPRESSION_THRESHOLD,
+    level: Optional[int] = None,
+) -> tuple[bytes, Optional[str]]:
+    """
+    Compresses a value from the threshold on, if the codec saves enough
+    space.
+
+    :param data: The value to compress.
+    :type data: bytes
+    :param codec: Tag of the codec, None to store the value raw.
+    :type codec: str | None
+    :param threshold: Smallest size in bytes which is compressed.
+    :type threshold: int
+    :param level: Compression level of the codec, defaults to a fast level.
+    :type level: int | None
+
+    :return: The stored bytes and the tag of the codec, None if they are raw.
+    :rtype: tuple[bytes, str | None]
+
+    :Example:
+
+    >>> compress(b"a" * 8192, "zlib")
+    (b"x\\x9cKL...", "zlib")
+
+    >>> compress(b"a", "zlib")
+    (b"a", None)
+
+    :raises ValueError: If the codec is unknown.
+    """
+    validate_codec(codec)
+
+    if codec is None or len(data) < threshold:
+        return data, None
+
+    compressor = CODECS[codec][0](level)
+    compressed = compressor.compress(data) + compressor.flush()
+
+    if len(compressed) > len(data) * (1 - MIN_SAVING):
+        return data, None
+
+    return compressed, codec
+
+
+def decompress(data: bytes, codec: Optional[str]) -> bytes:
+    """
+    Returns the raw content of a stored value.
+
+    :param data: The stored bytes.
+    :type data: bytes
+    :param codec: Tag of the codec the bytes are compressed with, None if
+        they are raw.
+    :type codec: str | None
+
+    :return: The raw content.
+    :rtype: bytes
+
+    :Example:
+
+    >>> decompress(compress(b"a" * 8192, "zlib")[0], "zlib")
+    b"aaaa..."
+
+    :raises ValueError: If the codec is unknown.
+    """
+    if codec is None:
+        return data
+
+    validate_codec(codec)
+    decompressor = CODECS[codec][1]()
+
+    return decompressor.decompress(data) + _flush(decompressor)
+
+
+def compress_file(
+    path: Path, codec: str, level: Optional[int] = None
+) -> tuple[BinaryIO, Optional[str], str]:
+    """
+    Compresses a file in chunks into a temporary file, hashing its content on
+    the way. If the codec does not save enough space, the file itself is
+    returned.
+
+    :param path: The file to compress.
+    :type path: Path
+    :param codec: Tag of the codec.
+    :type codec: str
+    :param level: Compression level of the codec, defaults to a fast level.
+    :type level: int | None
+
+    :return: The content to store opened for reading, the tag of the codec
+        (None if the content is raw) and the sha256 hash of the raw content.
+        The caller closes the file.
+    :rtype: tuple[BinaryIO, str | None, str]
+
+    :Example:
+
+    >>> source, codec, content_hash = compress_file(Path("batch.xml"), "zlib")
+    >>> with source:
+    ...     write_blob(conn, "kv_table", "blob_value", 42, source)
+
+    :raises ValueError: If the codec is unknown.
+    """
+    validate_codec(codec)
+
+    compressor = CODECS[codec][0](level)
+    digest = hashlib.sha256()
+    size = 0
+    target = tempfile.TemporaryFile()
+
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                target.write(compressor.compress(chunk))
+
+        target.write(compressor.flush())
+
+        if target.tell() > size * (1 - MIN_SAVING):
+            target.close()
+            return open(path, "rb"), None, digest.hexdigest()
+
+        target.seek(0)
+    except BaseException:
+        target.close()
+        raise
+
+    return target, codec, digest.hexdigest()  # type: ignore
+
+
+class DecompressingWriter:
+    """
+    File-like wrapper decompressing everything written to it into the target
+    file, used to stream compressed blobs into files.
+
+    :Example:
+
+    >>> with open("batch.xml", "wb") as f:
+    ...     with DecompressingWriter(f, "zlib") as writer:
+    ...         read_blob(conn, "kv_table", "blob_value", 42, writer)
+    """
+
+    def __init__(self, target: BinaryIO, codec: str):
+        validate_codec(codec)
+
+        self.target = target
+        self.decompressor = CODECS[codec][1]()
+
+    def write(self, chunk: bytes) -> int:
+        self.target.write(self.decompressor.decompress(chunk))
+
+        return len(chunk)
+
+    def close(self):
+        self.target.write(_flush(self.decompressor))
+
+    def __enter__(self) -> "DecompressingWriter":
+        return self
+
+    def __exit__(self, *args: Any):
+        self.close()
+
+
+def _flush(decompressor: Any) -> bytes:
+    # Only zlib buffers output, lzma returns everything at once.
+    flush = getattr(decompressor, "flush", None)
+
+    return flush() if flush else b""
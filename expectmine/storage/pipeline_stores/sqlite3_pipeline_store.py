@@ -1,8 +1,8 @@
-import atexit
 import json
 import pickle
 import sqlite3
 import sys
+import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -10,12 +10,62 @@ from expectmine.io.base_io import BaseIo
 from expectmine.io.io.dict_io import DictIo
 from expectmine.steps.base_step import BaseStep
 from expectmine.storage.base_pipeline_storage import BasePipelineStore
+from expectmine.storage.serialization import (
+    LEGACY_VALUE_CODEC,
+    decode_value,
+    encode_value,
+)
+from expectmine.storage.sqlite3_connection import (
+    ensure_schema,
+    get_connection,
+    retry_busy,
+    transaction,
+)
 from expectmine.storage.utils import (
     validate_key,
     validate_pipeline,
     validate_pipeline_store_init,
 )
 
+SCHEMA = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS pipeline_table (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    input_filetypes TEXT,
+    stored_at REAL
+);
+CREATE TABLE IF NOT EXISTS pipeline_step (
+    stepid INTEGER,
+    step_name TEXT NOT NULL,
+    step_number INTEGER NOT NULL,
+    python_version TEXT NOT NULL,
+    pickle_version TEXT NOT NULL,
+    blob_value BLOB,
+    encoding TEXT,
+    PRIMARY KEY (stepid, step_number),
+    FOREIGN KEY (stepid) REFERENCES pipeline_table(id) ON DELETE CASCADE
+);
+COMMIT;
+"""
+
+
+def _migrate(conn: sqlite3.Connection):
+    # Databases created before the value codec was recorded, their answers
+    # are pickled.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(pipeline_step);")]
+
+    if "encoding" not in columns:
+        conn.execute("ALTER TABLE pipeline_step ADD COLUMN encoding TEXT;")
+
+    # Databases created before the retention of pipelines. Their pipelines
+    # count as stored at the migration, their age is unknown.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(pipeline_table);")]
+
+    if "stored_at" not in columns:
+        conn.execute("ALTER TABLE pipeline_table ADD COLUMN stored_at REAL;")
+        conn.execute("UPDATE pipeline_table SET stored_at = ?;", (time.time(),))
+
 
 class Sqlite3PipelineStore(BasePipelineStore):
     def __init__(self, persistent_path: Path, **kwargs: Dict[Any, Any]):
@@ -24,11 +74,19 @@ class Sqlite3PipelineStore(BasePipelineStore):
         self.persistent_path = persistent_path
         self.kwargs = kwargs
 
-        self.conn = sqlite3.connect(persistent_path / "sqlite.db", isolation_level=None)
+        self.database = persistent_path / "sqlite.db"
 
         self._setup()
-        atexit.register(self._cleanup)
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Connection of the current thread, shared with all other stores of the
+        thread using the same database.
+        """
+        return get_connection(self.database)
+
+    @retry_busy
     def store_pipeline(
         self,
         key: str,
@@ -38,53 +96,55 @@ class Sqlite3PipelineStore(BasePipelineStore):
     ) -> None:
         validate_pipeline(key, steps, io, input_files)
 
-        cur = self.conn.cursor()
-
-        cur.execute(
-            """
-            DELETE FROM pipeline_table WHERE name == ?
-            """,
-            (key,),
-        )
-        res = cur.execute(
-            """
-            INSERT INTO pipeline_table (name, input_filetypes) VALUES (?, ?) RETURNING id
-            """,
-            (key, json.dumps([file.suffix for file in input_files])),
-        )
-
-        pipeline_id = next(res)[0]
         python_version = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
         pickle_version: str = pickle.format_version  # type: ignore
-
-        data = [
-            (
-                pipeline_id,
-                d[0].step_name(),
-                index,
-                python_version,
-                pickle_version if isinstance(pickle_version, str) else "0.0",
-                pickle.dumps(d[1].all_answers()),
+        answers = [encode_value(step_io.all_answers()) for step_io in io]
+
+        # The pipeline is replaced as a whole, readers never see it half
+        # written.
+        with transaction(self.conn, immediate=True) as cur:
+            cur.execute(
+                """
+                DELETE FROM pipeline_table WHERE name == ?
+                """,
+                (key,),
+            )
+            res = cur.execute(
+                """
+                INSERT INTO pipeline_table (name, input_filetypes, stored_at) VALUES (?, ?, ?) RETURNING id
+                """,
+                (key, json.dumps([file.suffix for file in input_files]), time.time()),
             )
-            for index, d in enumerate(zip(steps, io))
-        ]
 
-        cur.executemany(
-            """
-            INSERT INTO pipeline_step (stepid, step_name, step_number, python_version, pickle_version, blob_value)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            data,
-        )
+            pipeline_id = next(res)[0]
+
+            data = [
+                (
+                    pipeline_id,
+                    step.step_name(),
+                    index,
+                    python_version,
+                    pickle_version if isinstance(pickle_version, str) else "0.0",
+                    *answers[index],
+                )
+                for index, step in enumerate(steps)
+            ]
+
+            cur.executemany(
+                """
+                INSERT INTO pipeline_step
+                (stepid, step_name, step_number, python_version, pickle_version, blob_value, encoding)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                data,
+            )
 
     def list_pipelines(self) -> list[str]:
         cur = self.conn.cursor()
 
-        res = cur.execute(
-            """
+        res = cur.execute("""
             SELECT name FROM pipeline_table
-            """
-        )
+            """)
 
         return [k[0] for k in res]
 
@@ -93,42 +153,43 @@ class Sqlite3PipelineStore(BasePipelineStore):
     ) -> Optional[tuple[list[tuple[str, BaseIo]], list[str]]]:
         validate_key(key)
 
-        cur = self.conn.cursor()
-
-        res = cur.execute(
+        # Pipeline and steps are read by one query, pipelines without steps
+        # are returned as one row without step.
+        rows = self.conn.execute(
             """
-            SELECT input_filetypes
+            SELECT pipeline_table.input_filetypes, pipeline_step.step_name,
+            pipeline_step.pickle_version, pipeline_step.blob_value,
+            pipeline_step.encoding
             FROM pipeline_table
-            WHERE name = ?;
-            """,
-            (key,),
-        )
-
-        input_filetypes = next(res)[0]
-
-        res = cur.execute(
-            """
-            SELECT pipeline_step.stepid, pipeline_step.step_name, pipeline_step.step_number,
-            pipeline_step.python_version, pipeline_step.pickle_version,
-            pipeline_step.blob_value
-            FROM pipeline_step
-            INNER JOIN pipeline_table ON pipeline_step.stepid = pipeline_table.id
+            LEFT JOIN pipeline_step ON pipeline_step.stepid = pipeline_table.id
             WHERE pipeline_table.name = ?
             ORDER BY pipeline_step.step_number;
             """,
             (key,),
-        )
+        ).fetchall()
 
+        if not rows:
+            return None
+
+        input_filetypes: list[str] = json.loads(rows[0][0])
         steps: list[tuple[str, BaseIo]] = list()
 
-        for step in res:
-            if step[4] != pickle.format_version:  # type: ignore
+        for _, step_name, pickle_version, blob_value, encoding in rows:
+            if step_name is None:
+                break
+
+            encoding = encoding or LEGACY_VALUE_CODEC
+
+            # Only pickled answers depend on the pickle version.
+            if encoding == "pickle" and pickle_version != pickle.format_version:  # type: ignore
                 raise RuntimeError(
                     "Pickle version mismatch in store and execution environment."
                 )
 
-            step_name: str = step[1]
-            step_io_dict: dict[str, object] = step[5]
+            try:
+                step_io_dict = decode_value(bytes(blob_value), encoding)
+            except (TypeError, ValueError):
+                raise RuntimeError("Step loaded is not valid.")
 
             if (
                 not isinstance(step_name, str)
@@ -146,32 +207,4 @@ class Sqlite3PipelineStore(BasePipelineStore):
         """
         Sets up the database, creates the necessary tables (if they don't exist).
         """
-        cur = self.conn.cursor()
-        cur.executescript(
-            """
-            BEGIN;
-            PRAGMA foreign_keys = ON;
-            CREATE TABLE IF NOT EXISTS pipeline_table (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                input_filetypes TEXT
-            );
-            CREATE TABLE IF NOT EXISTS pipeline_step (
-                stepid INTEGER,
-                step_name TEXT NOT NULL,
-                step_number INTEGER NOT NULL,
-                python_version TEXT NOT NULL,
-                pickle_version TEXT NOT NULL,
-                blob_value BLOB,
-                PRIMARY KEY (stepid, step_number),
-                FOREIGN KEY (stepid) REFERENCES pipeline_table(id) ON DELETE CASCADE
-            );
-            COMMIT;
-            """
-        )
-
-    def _cleanup(self):
-        """
-        On exit, closes the sqlite3 connection.
-        """
-        self.conn.close()
+        ensure_schema(self.database, "Sqlite3PipelineStore", SCHEMA, _migrate)
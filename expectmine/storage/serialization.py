@@ -0,0 +1,103 @@
+from typing import Optional
+
+from expectmine.storage.base_value_codec import BaseValueCodec
+from expectmine.storage.value_codecs.pickle_codec import PickleCodec
+from expectmine.storage.value_codecs.typed_codec import TypedCodec
+
+# Value codecs by name. The name is stored next to every encoded value.
+VALUE_CODECS: dict[str, BaseValueCodec] = {
+    codec.name: codec for codec in [TypedCodec(), PickleCodec()]
+}
+# Codecs tried in order when encoding, pickle takes the objects the typed
+# format does not support.
+DEFAULT_VALUE_CODECS = ["typed", "pickle"]
+# Values stored before the codec was recorded are pickled.
+LEGACY_VALUE_CODEC = "pickle"
+
+
+def validate_value_codecs(codecs: list[str]):
+    """
+    Validates that all codecs are known. Throws an error if not.
+
+    :param codecs: Names of the codecs.
+    :type codecs: list[str]
+
+    :Example:
+
+    >>> validate_value_codecs(["typed", "pickle"])
+
+
+    >>> validate_value_codecs(["json"])
+    ValueError("Unknown value codec json.")
+
+
+    :raises ValueError: If a codec is unknown or no codec is given.
+    """
+    if not codecs:
+        raise ValueError("At least one value codec is needed.")
+
+    for name in codecs:
+        if name not in VALUE_CODECS:
+            raise ValueError(f"Unknown value codec {name}.")
+
+
+def encode_value(
+    value: object, codecs: Optional[list[str]] = None
+) -> tuple[bytes, str]:
+    """
+    Encodes an object with the first codec which supports it.
+
+    :param value: The object to encode.
+    :type value: object
+    :param codecs: Names of the codecs to try in order, defaults to
+        DEFAULT_VALUE_CODECS.
+    :type codecs: list[str] | None
+
+    :return: The encoded object and the name of the codec.
+    :rtype: tuple[bytes, str]
+
+    :Example:
+
+    >>> encode_value({"cores": 8})
+    (b"\\x81\\xa5cores\\x08", "typed")
+
+    >>> encode_value(Step())
+    (b"\\x80\\x05\\x95...", "pickle")
+
+    :raises ValueError: If no codec can encode the object.
+    """
+    for name in codecs or DEFAULT_VALUE_CODECS:
+        try:
+            return VALUE_CODECS[name].encode(value), name
+        except TypeError:
+            continue
+
+    raise ValueError("Object can not be encoded.")
+
+
+def decode_value(data: bytes, codec: Optional[str]) -> object:
+    """
+    Decodes an object encoded by encode_value.
+
+    :param data: The encoded object.
+    :type data: bytes
+    :param codec: Name of the codec returned by encode_value, None for values
+        stored before the codec was recorded.
+    :type codec: str | None
+
+    :return: The decoded object.
+    :rtype: object
+
+    :Example:
+
+    >>> decode_value(b"\\x81\\xa5cores\\x08", "typed")
+    {"cores": 8}
+
+    :raises ValueError: If the codec is unknown or the data is not valid.
+    """
+    name = codec or LEGACY_VALUE_CODEC
+
+    if name not in VALUE_CODECS:
+        raise ValueError(f"Unknown value codec {name}.")
+
+    return VALUE_CODECS[name].decode(data)
@@ -0,0 +1,265 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from expectmine.storage.base_blob_store import BaseBlobStore
+from expectmine.storage.pipeline_stores import sqlite3_pipeline_store
+from expectmine.storage.sqlite3_connection import (
+    ensure_schema,
+    get_connection,
+    retry_busy,
+    transaction,
+)
+from expectmine.storage.stores import sqlite3_store
+
+# Rows deleted and pages freed per transaction. Compaction runs in short
+# transactions, so writers of running pipelines only wait for one batch.
+BATCH_SIZE = 500
+VACUUM_PAGES = 256
+# Stored size of a value, values kept in a blob store count with the size of
+# their content.
+VALUE_SIZE = """
+CASE WHEN blob_value IS NULL AND hash IS NOT NULL THEN coalesce(int_value, 0)
+ELSE coalesce(length(blob_value), length(string_value), 8) END
+"""
+# Rows referencing a blob are kept if the first parameter is true, i.e. if
+# no blob store is passed.
+KEEP_REFERENCES = "NOT (? AND blob_value IS NULL AND hash IS NOT NULL)"
+DELETE_EXPIRED = f"""
+DELETE FROM kv_table WHERE rowid IN (
+    SELECT rowid FROM kv_table
+    WHERE {KEEP_REFERENCES} AND expires_at <= ? LIMIT {BATCH_SIZE}
+)
+RETURNING CASE WHEN blob_value IS NULL THEN hash END;
+"""
+STORED_SIZE = f"SELECT coalesce(sum({VALUE_SIZE}), 0) FROM kv_table;"
+# Least recently put values first, values stored before the update time was
+# recorded are the oldest.
+OLDEST = f"""
+SELECT rowid, {VALUE_SIZE} FROM kv_table
+WHERE {KEEP_REFERENCES}
+ORDER BY coalesce(updated_at, 0), rowid;
+"""
+DELETE_ROWS = """
+DELETE FROM kv_table WHERE rowid IN ({})
+RETURNING CASE WHEN blob_value IS NULL THEN hash END;
+"""
+DELETE_ORPHANS = f"""
+DELETE FROM kv_table
+WHERE {KEEP_REFERENCES} AND stepid NOT IN (SELECT id FROM step_table)
+RETURNING CASE WHEN blob_value IS NULL THEN hash END;
+"""
+DELETE_PIPELINES = """
+DELETE FROM pipeline_table WHERE stored_at <= ? RETURNING NULL;
+"""
+DELETE_ORPHAN_STEPS = """
+DELETE FROM pipeline_step WHERE stepid NOT IN (SELECT id FROM pipeline_table)
+RETURNING NULL;
+"""
+
+
+def compact(
+    persistent_path: Path,
+    max_size: Optional[int] = None,
+    pipeline_ttl: Optional[float] = None,
+    blob_store: Optional[BaseBlobStore] = None,
+    vacuum: bool = True,
+    full: bool = False,
+) -> dict[str, int]:
+    """
+    Compacts the sqlite3 database of a persistent path while pipelines keep
+    using it. Removes expired values, the least recently put values beyond
+    max_size, pipelines stored longer than pipeline_ttl ago and rows left
+    without namespace or pipeline. Blobs are released and collected, then the
+    free pages are returned to the file system by an incremental vacuum.
+
+    Every step runs in short transactions. Values referencing a blob store
+    are only removed if the blob store is passed, otherwise their
+    references would never be released.
+
+    Databases created before incremental vacuum was enabled need one full
+    vacuum, which blocks all other connections while the database is
+    rewritten. It only runs if full is set.
+
+    :param persistent_path: Path containing the sqlite.db file.
+    :type persistent_path: Path
+    :param max_size: Bound of the stored size of all values in bytes, None
+        keeps all values.
+    :type max_size: int | None
+    :param pipeline_ttl: Seconds stored pipelines are kept, None keeps all.
+    :type pipeline_ttl: float | None
+    :param blob_store: The blob store the stores of the database use.
+    :type blob_store: BaseBlobStore | None
+    :param vacuum: Whether to return free pages to the file system.
+    :type vacuum: bool
+    :param full: Whether to rewrite databases without incremental vacuum.
+    :type full: bool
+
+    :return: Number of expired, evicted and orphaned values, removed
+        pipelines, bytes freed in the blob store and pages freed.
+    :rtype: dict[str, int]
+
+    :Example:
+
+    >>> compact(Path("output"), max_size=10 * 1024**3)
+    {"expired": 12, "evicted": 0, "orphans": 0, "pipelines": 0, "blob_bytes": 0,
+        "pages": 96}
+
+    :raises ValueError: If the database does not exist or max_size or
+        pipeline_ttl is not positive.
+    """
+    database = persistent_path / "sqlite.db"
+
+    if not database.is_file():
+        raise ValueError(f"Database {database} does not exist.")
+
+    if max_size is not None and max_size <= 0:
+        raise ValueError("max_size needs to be a positive integer.")
+
+    if pipeline_ttl is not None and pipeline_ttl <= 0:
+        raise ValueError("pipeline_ttl needs to be a positive number.")
+
+    # Tables created by older versions get the columns compaction relies
+    # on, missing tables are created empty.
+    ensure_schema(
+        database, "Sqlite3Store", sqlite3_store.SCHEMA, sqlite3_store._migrate
+    )
+    ensure_schema(
+        database,
+        "Sqlite3PipelineStore",
+        sqlite3_pipeline_store.SCHEMA,
+        sqlite3_pipeline_store._migrate,
+    )
+
+    conn = get_connection(database)
+    keep = blob_store is None
+    report = dict.fromkeys(
+        ["expired", "evicted", "orphans", "pipelines", "blob_bytes", "pages"], 0
+    )
+
+    report["expired"] = _delete_batches(
+        conn, DELETE_EXPIRED, (keep, time.time()), blob_store
+    )
+
+    if max_size is not None:
+        report["evicted"] = _evict(conn, max_size, blob_store)
+
+    report["orphans"] = _delete(conn, DELETE_ORPHANS, (keep,), blob_store)
+
+    if pipeline_ttl is not None:
+        report["pipelines"] = _delete(
+            conn, DELETE_PIPELINES, (time.time() - pipeline_ttl,), None
+        )
+
+    # Steps of pipelines removed by connections without foreign keys.
+    _delete(conn, DELETE_ORPHAN_STEPS, (), None)
+
+    if blob_store is not None:
+        report["blob_bytes"] = blob_store.collect_garbage()
+
+    if vacuum:
+        report["pages"] = _vacuum(conn, full)
+
+    return report
+
+
+def _delete_batches(
+    conn: sqlite3.Connection,
+    statement: str,
+    parameters: tuple,
+    blob_store: Optional[BaseBlobStore],
+) -> int:
+    # The statement deletes at most BATCH_SIZE rows, it is repeated until no
+    # row is left.
+    deleted = 0
+
+    while True:
+        count = _delete(conn, statement, parameters, blob_store)
+        deleted += count
+
+        if count < BATCH_SIZE:
+            return deleted
+
+
+def _evict(
+    conn: sqlite3.Connection, max_size: int, blob_store: Optional[BaseBlobStore]
+) -> int:
+    size = conn.execute(STORED_SIZE).fetchone()[0]
+    rowids = []
+
+    # Values put after the rows are selected are newer, they are not evicted.
+    for rowid, value_size in conn.execute(OLDEST, (blob_store is None,)).fetchall():
+        if size <= max_size:
+            break
+
+        rowids.append(rowid)
+        size -= value_size
+
+    evicted = 0
+
+    for i in range(0, len(rowids), BATCH_SIZE):
+        chunk = rowids[i : i + BATCH_SIZE]
+        evicted += _delete(
+            conn,
+            DELETE_ROWS.format(", ".join("?" * len(chunk))),
+            tuple(chunk),
+            blob_store,
+        )
+
+    return evicted
+
+
+def _delete(
+    conn: sqlite3.Connection,
+    statement: str,
+    parameters: tuple,
+    blob_store: Optional[BaseBlobStore],
+) -> int:
+    """
+    Deletes rows in one transaction and releases the blobs they referenced
+    once it is committed. Returns the number of deleted rows.
+    """
+    hashes = _delete_rows(conn, statement, parameters)
+
+    for content_hash in hashes:
+        if content_hash is not None:
+            blob_store.release(content_hash)  # type: ignore
+
+    return len(hashes)
+
+
+@retry_busy
+def _delete_rows(
+    conn: sqlite3.Connection, statement: str, parameters: tuple
+) -> list[Optional[str]]:
+    with transaction(conn, immediate=True) as cur:
+        return [row[0] for row in cur.execute(statement, parameters).fetchall()]
+
+
+@retry_busy
+def _vacuum(conn: sqlite3.Connection, full: bool) -> int:
+    freed = 0
+
+    if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+        if not full:
+            return 0
+
+        # Rewrites the database, incremental vacuum applies from then on.
+        freed = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        conn.execute("VACUUM;")
+    else:
+        while True:
+            free = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+
+            if free == 0:
+                break
+
+            conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES});").fetchall()
+            freed += free - conn.execute("PRAGMA freelist_count;").fetchone()[0]
+
+    # Truncates the write-ahead log, which only succeeds if no reader uses it.
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchall()
+
+    return freed
@@ -0,0 +1,432 @@
+import atexit
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, TypeVar
+
+# Number of prepared statements kept per connection. The stores use constant
+# SQL strings, so every statement is only compiled once per connection.
+CACHED_STATEMENTS = 256
+# Size of the chunks blobs are streamed in.
+CHUNK_SIZE = 1024**2
+# Incremental blob I/O is available from python 3.11.
+BLOB_IO = hasattr(sqlite3.Connection, "blobopen")
+# Seconds a statement waits for the lock of another connection, e.g. of
+# another worker process, before it fails with "database is locked".
+BUSY_TIMEOUT = 30.0
+# Attempts and initial delay in seconds of retry_busy. Failing transactions
+# are retried with exponential backoff and jitter.
+RETRY_ATTEMPTS = 6
+RETRY_DELAY = 0.05
+# Primary result codes of busy and locked errors.
+BUSY_CODES = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections: dict[str, list[sqlite3.Connection]] = {}
+# Inode of every database file the schemas were created in. A database file
+# which was removed or replaced gets new connections.
+_schemas: dict[tuple[str, str], int] = {}
+# Increased when the database file was replaced, threads then close their
+# connection to the previous file and open new ones.
+_generations: dict[str, int] = {}
+# Connections inherited from the parent process. They must not be used or
+# closed in a forked child, so they are kept from being garbage collected.
+_inherited: list[sqlite3.Connection] = []
+
+
+@lru_cache(maxsize=64)
+def _database_key(database: Path) -> str:
+    # Resolving the path needs syscalls, it is done once per path.
+    return os.path.realpath(database)
+
+
+def get_connection(database: Path) -> sqlite3.Connection:
+    """
+    Returns the connection of the current thread to the given database file.
+    All stores of a thread using the same file share one connection. New
+    connections run in autocommit mode with write-ahead logging and
+    synchronous=NORMAL, so a commit does not wait for an fsync while the
+    database stays consistent on a crash. All connections are closed by a
+    single atexit handler.
+
+    :param database: Path to the sqlite3 database file.
+    :type database: Path
+
+    :return: The shared connection of the current thread.
+    :rtype: sqlite3.Connection
+
+    :Example:
+
+    >>> get_connection(Path("sqlite.db"))
+    sqlite3.Connection
+    """
+    key = _database_key(database)
+    connections: dict[str, tuple[int, sqlite3.Connection]] = _local.__dict__.setdefault(
+        "connections", {}
+    )
+    generation = _generations.get(key, 0)
+    cached = connections.get(key)
+
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+
+    if cached is not None:
+        # Only the thread using a connection closes it, other threads may be
+        # in a transaction on their connection to the previous file.
+        _discard(key, cached[1])
+
+    # check_same_thread is disabled so the connection can be closed by the
+    # atexit handler, it is only used by the thread which created it.
+    conn = sqlite3.connect(
+        key,
+        timeout=BUSY_TIMEOUT,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    # Only applies to new databases, freed pages are then returned to the
+    # file system by the compaction without rewriting the database.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    connections[key] = (generation, conn)
+    with _lock:
+        _connections.setdefault(key, []).append(conn)
+
+    return conn
+
+
+def ensure_schema(
+    database: Path,
+    name: str,
+    script: str,
+    migrate: Callable[[sqlite3.Connection], None] | None = None,
+):
+    """
+    Runs the DDL script of a store once per database file and process. If the
+    database file was removed or replaced since, the script runs again and
+    every thread replaces its connection the next time it asks for one.
+
+    :param database: Path to the sqlite3 database file.
+    :type database: Path
+    :param name: Name identifying the script, e.g. the class of the store.
+    :type name: str
+    :param script: SQL script creating the tables, needs to be idempotent.
+    :type script: str
+    :param migrate: Called after the script, to upgrade tables created by
+        older versions. Needs to be idempotent.
+    :type migrate: Callable[[sqlite3.Connection], None] | None
+
+    :Example:
+
+    >>> ensure_schema(Path("sqlite.db"), "Sqlite3Store", "CREATE TABLE ...")
+    """
+    key = _database_key(database)
+
+    try:
+        inode = os.stat(key).st_ino
+    except OSError:
+        inode = None
+
+    with _lock:
+        if inode is not None and _schemas.get((key, name)) == inode:
+            return
+
+        if any(k == key and i != inode for (k, _), i in _schemas.items()):
+            _invalidate(key)
+
+    conn = get_connection(database)
+    conn.executescript(script)
+
+    if migrate:
+        # Other processes may migrate the same database at the same time.
+        with transaction(conn, immediate=True):
+            migrate(conn)
+
+    with _lock:
+        _schemas[(key, name)] = os.stat(key).st_ino
+
+
+@contextmanager
+def transaction(
+    conn: sqlite3.Connection, immediate: bool = False
+) -> Iterator[sqlite3.Cursor]:
+    """
+    Runs the statements of the block in a single transaction on a connection
+    in autocommit mode. The transaction is rolled back if the block raises.
+    Inside another transaction of the connection, the block runs in a
+    savepoint, so it is rolled back on its own and committed with the outer
+    transaction.
+
+    :param conn: Connection returned by get_connection.
+    :type conn: sqlite3.Connection
+    :param immediate: Takes the write lock of the database at the start of
+        the transaction instead of the first write.
+    :type immediate: bool
+
+    :return: Cursor to execute the statements with.
+    :rtype: sqlite3.Cursor
+
+    :Example:
+
+    >>> with transaction(get_connection(Path("sqlite.db"))) as cur:
+    ...     cur.executemany("INSERT ...", rows)
+    """
+    cur = conn.cursor()
+
+    if conn.in_transaction:
+        cur.execute("SAVEPOINT nested;")
+
+        try:
+            yield cur
+        except BaseException:
+            cur.execute("ROLLBACK TO nested;")
+            cur.execute("RELEASE nested;")
+            raise
+
+        cur.execute("RELEASE nested;")
+        return
+
+    cur.execute("BEGIN IMMEDIATE;" if immediate else "BEGIN;")
+
+    try:
+        yield cur
+    except BaseException:
+        cur.execute("ROLLBACK;")
+        raise
+
+    cur.execute("COMMIT;")
+
+
+def is_busy(error: Exception) -> bool:
+    """
+    Returns whether an error was raised because another connection holds a
+    lock of the database.
+
+    :param error: The raised error.
+    :type error: Exception
+
+    :return: True for busy and locked errors.
+    :rtype: bool
+
+    :Example:
+
+    >>> is_busy(sqlite3.OperationalError("database is locked"))
+    True
+    """
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+
+    # Error codes are available from python 3.11.
+    code = getattr(error, "sqlite_errorcode", None)
+
+    if code is not None:
+        return code & 0xFF in BUSY_CODES
+
+    message = str(error)
+
+    return "locked" in message or "busy" in message
+
+
+def retry_busy(func: F) -> F:
+    """
+    Decorator retrying a function with exponential backoff if it fails
+    because the database is locked by another connection. The busy timeout
+    of the connections covers most conflicts, some are reported at once
+    (e.g. a read transaction which can no longer be upgraded). Only the
+    outermost decorated call of a thread is retried, nested calls raise, so
+    their transaction is rolled back as a whole.
+
+    :param func: Function running complete transactions.
+    :type func: Callable
+
+    :return: The retrying function.
+    :rtype: Callable
+
+    :Example:
+
+    >>> @retry_busy
+    ... def put_many(self, values):
+    ...     with transaction(self.conn, immediate=True) as cur:
+    ...         cur.executemany(PUT, rows)
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+
+        try:
+            for attempt in range(RETRY_ATTEMPTS):
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as error:
+                    if depth or attempt == RETRY_ATTEMPTS - 1 or not is_busy(error):
+                        raise
+
+                time.sleep(RETRY_DELAY * 2**attempt * random.uniform(0.5, 1.5))
+        finally:
+            _local.depth = depth
+
+    return wrapper  # type: ignore
+
+
+def write_blob(
+    conn: sqlite3.Connection,
+    table: str,
+    column: str,
+    rowid: int,
+    source: BinaryIO,
+    digest: Any = None,
+):
+    """
+    Fills a blob, created with zeroblob of the size of the source, from a
+    file in chunks. Without incremental blob I/O (python 3.10), the source is
+    written at once.
+
+    :param conn: Connection returned by get_connection.
+    :type conn: sqlite3.Connection
+    :param table: Table of the blob.
+    :type table: str
+    :param column: Column of the blob.
+    :type column: str
+    :param rowid: Rowid of the blob.
+    :type rowid: int
+    :param source: File opened in binary mode.
+    :type source: BinaryIO
+    :param digest: Hash object updated with every chunk, e.g. hashlib.sha256().
+    :type digest: Any
+
+    :Example:
+
+    >>> with open("batch.xml", "rb") as f:
+    ...     write_blob(conn, "kv_table", "blob_value", 42, f)
+    """
+    if not BLOB_IO:
+        content = source.read()
+        if digest:
+            digest.update(content)
+        conn.execute(
+            f"UPDATE {table} SET {column} = ? WHERE rowid = ?;", (content, rowid)
+        )
+        return
+
+    with conn.blobopen(table, column, rowid) as blob:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            blob.write(chunk)
+            if digest:
+                digest.update(chunk)
+
+
+def read_blob(
+    conn: sqlite3.Connection, table: str, column: str, rowid: int, target: BinaryIO
+):
+    """
+    Writes a blob to a file in chunks, without loading it into memory.
+
+    :param conn: Connection returned by get_connection.
+    :type conn: sqlite3.Connection
+    :param table: Table of the blob.
+    :type table: str
+    :param column: Column of the blob.
+    :type column: str
+    :param rowid: Rowid of the blob.
+    :type rowid: int
+    :param target: File opened in binary mode for writing.
+    :type target: BinaryIO
+
+    :Example:
+
+    >>> with open("batch.xml", "wb") as f:
+    ...     read_blob(conn, "kv_table", "blob_value", 42, f)
+    """
+    if BLOB_IO:
+        with conn.blobopen(table, column, rowid, readonly=True) as blob:
+            for chunk in iter(lambda: blob.read(CHUNK_SIZE), b""):
+                target.write(chunk)
+        return
+
+    offset = 1
+
+    while True:
+        chunk = conn.execute(
+            f"SELECT substr({column}, ?, ?) FROM {table} WHERE rowid = ?;",
+            (offset, CHUNK_SIZE, rowid),
+        ).fetchone()[0]
+
+        if not chunk:
+            break
+
+        target.write(chunk)
+        offset += CHUNK_SIZE
+
+
+def _invalidate(key: str):
+    # Needs to be called holding _lock.
+    for schema in [schema for schema in _schemas if schema[0] == key]:
+        del _schemas[schema]
+
+    _generations[key] = _generations.get(key, 0) + 1
+
+
+def _discard(key: str, conn: sqlite3.Connection):
+    with _lock:
+        if conn in _connections.get(key, []):
+            _connections[key].remove(conn)
+
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def _close(key: str):
+    # Needs to be called holding _lock.
+    for conn in _connections.pop(key, []):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    _invalidate(key)
+
+
+def _reset_after_fork():
+    global _lock
+
+    # The lock may have been held by another thread of the parent.
+    _lock = threading.Lock()
+
+    for connections in _connections.values():
+        _inherited.extend(connections)
+
+    _connections.clear()
+    _local.__dict__.clear()
+
+
+# The forked child opens its own connections, sqlite3 connections must not be
+# carried over a fork.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@atexit.register
+def close_connections():
+    """
+    Closes all connections, called on exit. Connections requested after
+    closing are opened again.
+    """
+    with _lock:
+        for key in list(_connections):
+            _close(key)
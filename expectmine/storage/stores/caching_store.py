@@ -0,0 +1,330 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Type
+
+from expectmine.storage.base_storage import BaseStore, T
+from expectmine.storage.stores.sqlite3_store import Sqlite3Store
+from expectmine.storage.utils import validate_key, value_size
+
+# Marks keys which are known to not exist in the wrapped store.
+_MISSING = object()
+
+
+class LruCache:
+    """
+    Thread safe least recently used cache, bounded by the total size of its
+    values. Values can expire, expired values count as misses. Counts hits,
+    misses and evictions, hits and misses also by namespace, the first item
+    of tuple keys.
+
+    :Example:
+
+    >>> cache = LruCache(max_size=2**20)
+    >>> cache.put(("Step", "cores"), 8, 28)
+    >>> cache.get(("Step", "cores"))
+    8
+    """
+
+    def __init__(self, max_size: int, max_entry_size: int | None = None):
+        """
+        Creates the cache.
+
+        :param max_size: Maximal total size of the values in bytes.
+        :type max_size: int
+        :param max_entry_size: Values larger than this are not cached,
+            defaults to an eighth of max_size.
+        :type max_entry_size: int | None
+        """
+        self.max_size = max_size
+        self.max_entry_size = (
+            max_entry_size if max_entry_size is not None else max_size // 8
+        )
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.epoch = 0
+        self._namespaces: dict[Hashable, list[int]] = {}
+        self._entries: OrderedDict[Hashable, tuple[object, int, float | None]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: object = None) -> object:
+        """
+        Returns the cached value and marks it as recently used.
+
+        :param key: Key of the value.
+        :type key: Hashable
+        :param default: Returned if the key is not cached.
+        :type default: object
+
+        :return: The cached value or default.
+        :rtype: object
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            counters = None
+
+            if isinstance(key, tuple) and key:
+                counters = self._namespaces.setdefault(key[0], [0, 0])
+
+            if entry is not None and entry[2] is not None and entry[2] <= time.time():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+
+                if counters is not None:
+                    counters[1] += 1
+
+                return default
+
+            self.hits += 1
+
+            if counters is not None:
+                counters[0] += 1
+
+            self._entries.move_to_end(key)
+
+            return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        value: object,
+        size: int,
+        epoch: int | None = None,
+        expires_at: float | None = None,
+    ):
+        """
+        Caches a value, evicting the least recently used values until the
+        cache fits. Values read from a store are passed with the epoch taken
+        before the read, they are dropped if a value was invalidated since,
+        as the read may have returned the value before the invalidation.
+
+        :param key: Key of the value.
+        :type key: Hashable
+        :param value: The value to cache.
+        :type value: object
+        :param size: Size of the value in bytes.
+        :type size: int
+        :param epoch: The epoch taken before the value was read.
+        :type epoch: int | None
+        :param expires_at: Time the value expires at, None if it does not.
+        :type expires_at: float | None
+        """
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+
+            self._remove(key)
+
+            if size > self.max_entry_size:
+                return
+
+            self._entries[key] = (value, size, expires_at)
+            self.size += size
+
+            while self.size > self.max_size:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """
+        Removes a value from the cache and starts a new epoch.
+
+        :param key: Key of the value.
+        :type key: Hashable
+        """
+        with self._lock:
+            self.epoch += 1
+            self._remove(key)
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= entry[1]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the counters and the current size of the cache.
+
+        :return: Hits, misses, evictions, number of entries and size.
+        :rtype: dict[str, int]
+
+        :Example:
+
+        >>> stats()
+        {"hits": 12, "misses": 3, "evictions": 0, "entries": 3, "size": 512}
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self.size,
+            }
+
+    def namespace_stats(self, namespace: Hashable) -> dict[str, int]:
+        """
+        Returns the hits and misses of the keys of a namespace.
+
+        :param namespace: First item of the keys, e.g. the step name.
+        :type namespace: Hashable
+
+        :return: Hits and misses.
+        :rtype: dict[str, int]
+
+        :Example:
+
+        >>> namespace_stats("Step")
+        {"hits": 12, "misses": 3}
+        """
+        with self._lock:
+            hits, misses = self._namespaces.get(namespace, (0, 0))
+
+            return {"hits": hits, "misses": misses}
+
+
+class CachingStore(BaseStore):
+    """
+    Read-through cache in front of another store. Decoded values are kept in
+    an LRU cache shared by all stores of a CachingStoreAdapter, values written
+    or deleted through the store are invalidated. Like the InMemoryStore,
+    cached objects are returned by reference and must not be modified. Files
+    are not cached, the wrapped store tracks them itself.
+
+    Writes to the wrapped store which do not go through the cache (e.g. from
+    another process) are not seen until the value is evicted. Values of a
+    wrapped Sqlite3Store expire in the cache when they expire in the store.
+    """
+
+    def __init__(
+        self,
+        step_name: str,
+        persistent_path: Path,
+        working_directory: Path,
+        **kwargs: Dict[Any, Any],
+    ):
+        """
+        :param store: The wrapped store, passed as keyword argument.
+        :type store: BaseStore
+        :param cache: The cache shared with the other stores of the adapter,
+            passed as keyword argument.
+        :type cache: LruCache
+        """
+        self.step_name = step_name
+        self.persistent_path = persistent_path
+        self.working_directory = working_directory
+        self.store: BaseStore = kwargs["store"]  # type: ignore
+        self.cache: LruCache = kwargs["cache"]  # type: ignore
+
+    def put(self, key: str, value: object | Path):
+        self.store.put(key, value)
+        self.cache.invalidate((self.step_name, key))
+
+    def put_many(self, values: dict[str, object | Path]):
+        self.store.put_many(values)
+
+        for key in values:
+            self.cache.invalidate((self.step_name, key))
+
+    def get(self, key: str, returning: Type[T]) -> Optional[T]:
+        validate_key(key)
+
+        value = self.cache.get((self.step_name, key), _MISSING)
+
+        if value is None:
+            return None
+
+        if value is not _MISSING and isinstance(value, returning):
+            return value
+
+        epoch = self.cache.epoch
+        value, expires_at = self._read([key], returning)[key]
+        self._cache(key, value, epoch, expires_at)
+
+        return value
+
+    def get_many(
+        self, keys: list[str], returning: Type[T] = object
+    ) -> dict[str, Optional[T]]:
+        values: dict[str, Optional[T]] = {}
+        missing = []
+
+        for key in keys:
+            validate_key(key)
+            value = self.cache.get((self.step_name, key), _MISSING)
+
+            if value is None or (
+                value is not _MISSING and isinstance(value, returning)
+            ):
+                values[key] = value  # type: ignore
+            else:
+                missing.append(key)
+
+        if missing:
+            epoch = self.cache.epoch
+
+            for key, (value, expires_at) in self._read(missing, returning).items():
+                self._cache(key, value, epoch, expires_at)
+                values[key] = value
+
+        return {key: values[key] for key in keys}
+
+    def delete(self, key: str):
+        self.store.delete(key)
+        self.cache.invalidate((self.step_name, key))
+
+    def delete_many(self, keys: list[str]):
+        self.store.delete_many(keys)
+
+        for key in keys:
+            self.cache.invalidate((self.step_name, key))
+
+    def list(self) -> list[str]:
+        return self.store.list()
+
+    def exists(self, key: str) -> bool:
+        validate_key(key)
+
+        value = self.cache.get((self.step_name, key), _MISSING)
+
+        if value is _MISSING:
+            return self.store.exists(key)
+
+        return value is not None
+
+    def _read(
+        self, keys: List[str], returning: Type[T]
+    ) -> dict[str, tuple[Optional[T], Optional[float]]]:
+        """
+        Reads values from the wrapped store together with the time they
+        expire at.
+        """
+        if isinstance(self.store, Sqlite3Store):
+            return self.store.get_many_with_expiry(keys, returning)
+
+        if len(keys) == 1:
+            return {keys[0]: (self.store.get(keys[0], returning), None)}
+
+        return {
+            key: (value, None)
+            for key, value in self.store.get_many(keys, returning).items()
+        }
+
+    def _cache(self, key: str, value: object, epoch: int, expires_at: Optional[float]):
+        if isinstance(value, Path):
+            return
+
+        # Missing keys are cached as None, steps often check optional keys.
+        self.cache.put(
+            (self.step_name, key), value, value_size(value), epoch, expires_at
+        )
@@ -0,0 +1,213 @@
+import glob
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Type
+from urllib.parse import quote, unquote
+
+from expectmine.storage.base_storage import BaseStore, T
+from expectmine.storage.utils import (
+    validate_key,
+    validate_storage_init,
+)
+from expectmine.storage.value_codecs.pickle_codec import PICKLE_PROTOCOL
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+# Suffixes of the value files, by layout. Files keep their own suffix after
+# FILE_SUFFIX.
+PICKLE_SUFFIX = ".pickle"
+ARRAY_SUFFIX = ".npy"
+BYTES_SUFFIX = ".bin"
+FILE_SUFFIX = ".file"
+# Most filesystems limit file names to 255 bytes, room is left for suffixes.
+MAX_NAME_LENGTH = 200
+# Mode of the stored files. Files are returned as hard links, writing to a
+# link would change the stored value.
+READ_ONLY = 0o444
+
+
+def _quote(name: str) -> str:
+    # Dots are quoted as well, the first dot of a file name separates the
+    # quoted key from the suffix.
+    return quote(name, safe="").replace(".", "%2E")
+
+
+class FileStore(BaseStore):
+    """
+    Scoped filesystem based store: Each value lives in its own file in the
+    directory of the step namespace, there is no size limit. Numpy arrays are
+    stored in the raw .npy layout and returned as read-only numpy.memmap,
+    bytes are stored raw and returned as read-only memoryview of an mmap. Large
+    values are therefore shared between steps without copying them into
+    memory. Other objects are pickled, files are copied into the store.
+
+    Mapped values and returned files share the storage of the store and must
+    not be modified, stored files are read-only. Overwriting or deleting a
+    key replaces the file, views returned before keep the previous content.
+    """
+
+    def __init__(
+        self,
+        step_name: str,
+        persistent_path: Path,
+        working_directory: Path,
+        **kwargs: Dict[Any, Any],
+    ):
+        validate_storage_init(step_name, persistent_path, working_directory)
+
+        self.step_name = step_name
+        self.persistent_path = persistent_path
+        self.working_directory = working_directory
+        self.kwargs = kwargs
+        self.directory = persistent_path / "files" / _quote(step_name)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, key: str, value: object | Path):
+        validate_key(key)
+
+        if len(_quote(key)) > MAX_NAME_LENGTH:
+            raise ValueError("Key is too long to be used as file name.")
+
+        fd, temp_path = tempfile.mkstemp(prefix=".", dir=self.directory)
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(value, Path):
+                    suffix = FILE_SUFFIX + value.suffix
+                    with open(value, "rb") as source:
+                        shutil.copyfileobj(source, f)
+                elif (
+                    np is not None
+                    and isinstance(value, np.ndarray)
+                    and not value.dtype.hasobject
+                ):
+                    suffix = ARRAY_SUFFIX
+                    np.save(f, value, allow_pickle=False)
+                elif isinstance(value, (bytes, bytearray, memoryview)):
+                    suffix = BYTES_SUFFIX
+                    f.write(value)
+                else:
+                    suffix = PICKLE_SUFFIX
+                    try:
+                        pickle.dump(value, f, protocol=PICKLE_PROTOCOL)
+                    except Exception:
+                        raise ValueError("Object can not be pickled.")
+
+            os.chmod(temp_path, READ_ONLY)
+            path = self.directory / (_quote(key) + suffix)
+
+            for previous in self._paths(key):
+                if previous != path:
+                    previous.unlink(missing_ok=True)
+
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    def get(self, key: str, returning: Type[T]) -> Optional[T]:
+        validate_key(key)
+
+        paths = self._paths(key)
+
+        if not paths:
+            return None
+
+        path = paths[0]
+        suffix = path.name[len(_quote(key)) :]
+
+        if suffix == ARRAY_SUFFIX:
+            if np is None:
+                raise ValueError("Value is a numpy array, numpy is not installed.")
+            return_object = np.load(path, mmap_mode="r")
+        elif suffix == BYTES_SUFFIX:
+            return_object = self._map(path, returning)
+        elif suffix == PICKLE_SUFFIX:
+            with open(path, "rb") as f:
+                return_object = pickle.load(f)
+        else:
+            return_object = self._link(key, path, suffix[len(FILE_SUFFIX) :])
+
+        if not isinstance(return_object, returning | None):
+            raise ValueError("Value and return type do not match.")
+
+        return return_object
+
+    def delete(self, key: str):
+        validate_key(key)
+
+        for path in self._paths(key):
+            path.unlink(missing_ok=True)
+
+    def list(self) -> list[str]:
+        return [
+            unquote(entry.name.split(".", 1)[0])
+            for entry in os.scandir(self.directory)
+            if not entry.name.startswith(".")
+        ]
+
+    def exists(self, key: str) -> bool:
+        validate_key(key)
+
+        return bool(self._paths(key))
+
+    def _paths(self, key: str) -> List[Path]:
+        """
+        Returns the files of a key, only more than one if a put was
+        interrupted.
+        """
+        base = self.directory / _quote(key)
+
+        return [
+            Path(path)
+            for path in glob.glob(glob.escape(str(base)) + ".*")
+            if Path(path).name.split(".", 1)[0] == base.name
+        ]
+
+    def _map(self, path: Path, returning: type) -> object:
+        """
+        Returns the content of a bytes value as read-only memoryview of an
+        mmap, or as bytes if the caller asks for bytes.
+        """
+        if returning in (bytes, bytearray):
+            return returning(path.read_bytes())
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _link(self, key: str, path: Path, suffix: str) -> Path:
+        """
+        Returns the file of a file value in the working directory, as hard
+        link to the stored file if possible. The link is read-only like the
+        stored file, a copy is not.
+        """
+        target = self.working_directory / f"{self.step_name}-{_quote(key)}{suffix}"
+        os.makedirs(self.working_directory, exist_ok=True)
+
+        try:
+            if os.path.samefile(path, target):
+                return target
+        except OSError:
+            pass
+
+        temp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+
+        try:
+            os.link(path, temp_path)
+        except OSError:
+            shutil.copyfile(path, temp_path)
+
+        os.replace(temp_path, target)
+
+        return target
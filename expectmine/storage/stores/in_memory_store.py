@@ -1,8 +1,50 @@
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, Optional, Type
 
 from expectmine.storage.base_storage import BaseStore, T
-from expectmine.storage.utils import validate_key, validate_storage_init, validate_value
+from expectmine.storage.utils import (
+    validate_key,
+    validate_storage_init,
+    validate_value,
+    value_size,
+)
+from expectmine.storage.value_codecs.pickle_codec import PICKLE_PROTOCOL
+
+# Objects are kept as they are, they are only pickled to validate and
+# measure them, like they are spilled.
+MEASURING_CODECS = ["pickle"]
+
+
+def default_memory_budget() -> Optional[int]:
+    """
+    Returns the memory budget of in memory stores in bytes, configured in MiB
+    through the env variable EXPECTMINE_MEMORY_BUDGET.
+
+    :return: The budget, None if the stores are not limited.
+    :rtype: int | None
+
+    :Example:
+
+    >>> default_memory_budget()
+    1073741824
+
+    :raises ValueError: If the env variable is not a positive integer.
+    """
+    budget = os.environ.get("EXPECTMINE_MEMORY_BUDGET")
+
+    if not budget:
+        return None
+
+    if not budget.isdigit() or int(budget) < 1:
+        raise ValueError("EXPECTMINE_MEMORY_BUDGET needs to be a positive integer.")
+
+    return int(budget) * 1024**2
 
 
 class InMemoryStore(BaseStore):
@@ -11,6 +53,11 @@ class InMemoryStore(BaseStore):
     associated with a specific namespace. In this context, a namespace
     corresponds to a step, meaning that each step can maintain its
     distinct set of keys. The KV-store is implemented in-memory.
+
+    If the values exceed the memory budget of the store, the least recently
+    used objects are pickled to a spill directory in the working directory and
+    loaded again on access. Objects are returned by reference, modifications
+    of a returned object are lost once it was spilled.
     """
 
     def __init__(
@@ -18,24 +65,59 @@ class InMemoryStore(BaseStore):
         step_name: str,
         persistent_path: Path,
         working_directory: Path,
-        **kwargs: Dict[Any, Any]
+        **kwargs: Dict[Any, Any],
     ):
+        """
+        :param memory_budget: Bytes the values of the store may use before
+            they are spilled to disk, passed as keyword argument. Defaults to
+            default_memory_budget().
+        :type memory_budget: int | None
+        """
         validate_storage_init(step_name, persistent_path, working_directory)
         self.step_name = step_name
         self.persistent_path = persistent_path
         self.working_directory = working_directory
-        self.storage: dict[str, object] = dict()
+        self.memory_budget: Optional[int] = kwargs.get(  # type: ignore
+            "memory_budget", default_memory_budget()
+        )
+        # Values in memory, in the order they were used.
+        self.storage: OrderedDict[str, object] = OrderedDict()
+        self.sizes: dict[str, int] = dict()
+        self.spilled: dict[str, Path] = dict()
+        self.memory = 0
+        self.spills = 0
+        self.reloads = 0
+        self._spill_directory: Optional[Path] = None
 
     def put(self, key: str, value: object | Path):
         validate_key(key)
-        validate_value(value)
+        encoded = validate_value(value, MEASURING_CODECS)
 
-        self.storage[key] = value
+        self._put(key, value, encoded)
+        self._enforce_budget()
+
+    def put_many(self, values: dict[str, object | Path]):
+        encoded = {}
+
+        for key, value in values.items():
+            validate_key(key)
+            encoded[key] = validate_value(value, MEASURING_CODECS)
+
+        for key, value in values.items():
+            self._put(key, value, encoded[key])
+
+        self._enforce_budget()
 
     def get(self, key: str, returning: Type[T]) -> Optional[T]:
         validate_key(key)
 
-        return_object = self.storage.get(key)
+        if key in self.spilled:
+            return_object = self._reload(key)
+        else:
+            return_object = self.storage.get(key)
+
+            if key in self.storage:
+                self.storage.move_to_end(key)
 
         if issubclass(returning, Path) and isinstance(return_object, str):
             return_object = Path(return_object)
@@ -47,11 +129,133 @@ class InMemoryStore(BaseStore):
 
     def delete(self, key: str):
         validate_key(key)
-        self.storage.pop(key, None)
+        self._remove(key)
+
+    def delete_many(self, keys: list[str]):
+        for key in keys:
+            validate_key(key)
+
+        for key in keys:
+            self._remove(key)
 
     def list(self) -> list[str]:
-        return list(self.storage.keys())
+        return [*self.storage.keys(), *self.spilled.keys()]
 
     def exists(self, key: str) -> bool:
         validate_key(key)
-        return key in self.storage
+        return key in self.storage or key in self.spilled
+
+    def stats(self) -> dict[str, object]:
+        """
+        Returns the memory used by the values and the spill statistics.
+
+        :return: Memory used, budget, number of values in memory and on disk,
+            bytes on disk and the number of spills and reloads.
+        :rtype: dict[str, object]
+
+        :Example:
+
+        >>> stats()
+        {"memory": 1048576, "memory_budget": 2097152, "resident": 12,
+        "spilled": 2, "spilled_size": 3145728, "spills": 2, "reloads": 0}
+        """
+        return {
+            "memory": self.memory,
+            "memory_budget": self.memory_budget,
+            "resident": len(self.storage),
+            "spilled": len(self.spilled),
+            "spilled_size": sum(self.sizes[key] for key in self.spilled),
+            "spills": self.spills,
+            "reloads": self.reloads,
+        }
+
+    def _put(
+        self, key: str, value: object | Path, encoded: Optional[tuple[bytes, str]]
+    ):
+        self._remove(key)
+
+        # Pickled objects are measured by their pickled size, the decoded
+        # object usually needs at least as much memory.
+        size = len(encoded[0]) if encoded is not None else value_size(value)
+
+        self.storage[key] = value
+        self.sizes[key] = size
+        self.memory += size
+
+    def _remove(self, key: str):
+        if key in self.storage:
+            del self.storage[key]
+            self.memory -= self.sizes.pop(key)
+
+        if key in self.spilled:
+            self.spilled.pop(key).unlink(missing_ok=True)
+            del self.sizes[key]
+
+    def _enforce_budget(self):
+        """
+        Spills the least recently used objects until the values fit into the
+        budget. Paths and primitive values stay in memory.
+        """
+        if self.memory_budget is None or self.memory <= self.memory_budget:
+            return
+
+        for key in list(self.storage.keys()):
+            if self.memory <= self.memory_budget:
+                break
+
+            value = self.storage[key]
+
+            if isinstance(value, (Path, bool, int, float, str)):
+                continue
+
+            path = self._spill_path()
+
+            with open(path, "wb") as f:
+                pickle.dump(value, f, protocol=PICKLE_PROTOCOL)
+
+            del self.storage[key]
+            self.spilled[key] = path
+            self.memory -= self.sizes[key]
+            self.spills += 1
+
+    def _reload(self, key: str) -> object:
+        """
+        Loads a spilled object. It stays in memory if it fits into the
+        budget.
+        """
+        path = self.spilled[key]
+
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+
+        self.reloads += 1
+
+        if self.memory_budget is not None and self.sizes[key] > self.memory_budget:
+            return value
+
+        del self.spilled[key]
+        path.unlink(missing_ok=True)
+
+        self.storage[key] = value
+        self.memory += self.sizes[key]
+        self._enforce_budget()
+
+        return value
+
+    def _spill_path(self) -> Path:
+        if self._spill_directory is None:
+            os.makedirs(self.working_directory, exist_ok=True)
+            self._spill_directory = Path(
+                tempfile.mkdtemp(
+                    prefix=f".spill_{self.step_name}_", dir=self.working_directory
+                )
+            )
+            # Spilled values are removed with the store.
+            weakref.finalize(
+                self, shutil.rmtree, self._spill_directory, ignore_errors=True
+            )
+
+        fd, path = tempfile.mkstemp(suffix=".pickle", dir=self._spill_directory)
+        os.close(fd)
+
+        return Path(path)
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+from expectmine.storage.base_storage import BaseStore, T
+from expectmine.storage.utils import value_size
+
+# Upper bounds of the latency histogram buckets in seconds, the last bucket
+# takes all slower operations.
+LATENCY_BUCKETS = [0.0001, 0.001, 0.01, 0.1, 1.0, 10.0]
+OPERATIONS = ["put", "get", "delete", "list", "exists"]
+
+
+class StoreMetrics:
+    """
+    Thread safe counters of the operations on a set of stores, aggregated
+    per step namespace. Batch operations count as their single key
+    counterpart, e.g. put_many as put.
+
+    :Example:
+
+    >>> metrics = StoreMetrics()
+    >>> metrics.record("Step", "get", 0.0002, bytes_out=28)
+    >>> metrics.snapshot()["Step"]["operations"]["get"]["count"]
+    1
+    """
+
+    def __init__(self):
+        self._steps: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        step_name: str,
+        operation: str,
+        seconds: float,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        error: bool = False,
+    ):
+        """
+        Records a single operation.
+
+        :param step_name: Namespace of the store.
+        :type step_name: str
+        :param operation: One of OPERATIONS.
+        :type operation: str
+        :param seconds: Duration of the operation.
+        :type seconds: float
+        :param bytes_in: Size of the values written.
+        :type bytes_in: int
+        :param bytes_out: Size of the values read.
+        :type bytes_out: int
+        :param error: Whether the operation raised an error.
+        :type error: bool
+        """
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+
+        with self._lock:
+            step = self._steps.get(step_name)
+
+            if step is None:
+                step = self._steps[step_name] = {
+                    "operations": {},
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                }
+
+            counters = step["operations"].get(operation)
+
+            if counters is None:
+                counters = step["operations"][operation] = {
+                    "count": 0,
+                    "errors": 0,
+                    "seconds": 0.0,
+                    "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+                }
+
+            counters["count"] += 1
+            counters["errors"] += error
+            counters["seconds"] += seconds
+            counters["histogram"][bucket] += 1
+            step["bytes_in"] += bytes_in
+            step["bytes_out"] += bytes_out
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns a copy of the counters by step. Histogram buckets are labeled
+        by their upper bound in seconds.
+
+        :return: Operations, bytes in and bytes out of every step.
+        :rtype: dict[str, dict[str, Any]]
+
+        :Example:
+
+        >>> snapshot()
+        {"Step": {"operations": {"get": {"count": 1, "errors": 0,
+            "seconds": 0.0002, "histogram": {"0.0001": 0, "0.001": 1, ...,
+            "inf": 0}}}, "bytes_in": 0, "bytes_out": 28}}
+        """
+        labels = [str(bound) for bound in LATENCY_BUCKETS] + ["inf"]
+
+        with self._lock:
+            return {
+                step_name: {
+                    "operations": {
+                        operation: {
+                            **counters,
+                            "histogram": dict(zip(labels, counters["histogram"])),
+                        }
+                        for operation, counters in step["operations"].items()
+                    },
+                    "bytes_in": step["bytes_in"],
+                    "bytes_out": step["bytes_out"],
+                }
+                for step_name, step in self._steps.items()
+            }
+
+    def reset(self):
+        """
+        Clears all counters.
+        """
+        with self._lock:
+            self._steps.clear()
+
+
+class InstrumentedStore(BaseStore):
+    """
+    Measures the operations on another store. Counts, latencies and the size
+    of the values read and written are recorded in a StoreMetrics object
+    shared by all stores of an InstrumentedStoreAdapter. Sizes of objects are
+    estimated like in the CachingStore, files count with their size on disk.
+    """
+
+    def __init__(
+        self,
+        step_name: str,
+        persistent_path: Path,
+        working_directory: Path,
+        **kwargs: Dict[Any, Any],
+    ):
+        """
+        :param store: The wrapped store, passed as keyword argument.
+        :type store: BaseStore
+        :param metrics: The metrics shared with the other stores of the
+            adapter, passed as keyword argument.
+        :type metrics: StoreMetrics
+        """
+        self.step_name = step_name
+        self.persistent_path = persistent_path
+        self.working_directory = working_directory
+        self.store: BaseStore = kwargs["store"]  # type: ignore
+        self.metrics: StoreMetrics = kwargs["metrics"]  # type: ignore
+
+    def put(self, key: str, value: object | Path):
+        with self._measure("put", bytes_in=_size(value)):
+            self.store.put(key, value)
+
+    def put_many(self, values: dict[str, object | Path]):
+        size = sum(_size(value) for value in values.values())
+
+        with self._measure("put", bytes_in=size):
+            self.store.put_many(values)
+
+    def get(self, key: str, returning: Type[T]) -> Optional[T]:
+        with self._measure("get") as sizes:
+            value = self.store.get(key, returning)
+            sizes.append(_size(value))
+
+        return value
+
+    def get_many(
+        self, keys: list[str], returning: Type[T] = object
+    ) -> dict[str, Optional[T]]:
+        with self._measure("get") as sizes:
+            values = self.store.get_many(keys, returning)
+            sizes.extend(_size(value) for value in values.values())
+
+        return values
+
+    def delete(self, key: str):
+        with self._measure("delete"):
+            self.store.delete(key)
+
+    def delete_many(self, keys: list[str]):
+        with self._measure("delete"):
+            self.store.delete_many(keys)
+
+    def list(self) -> list[str]:
+        with self._measure("list"):
+            return self.store.list()
+
+    def exists(self, key: str) -> bool:
+        with self._measure("exists"):
+            return self.store.exists(key)
+
+    @contextmanager
+    def _measure(self, operation: str, bytes_in: int = 0) -> Iterator[List[int]]:
+        # Operations append the sizes of the values read to the yielded list.
+        sizes: list[int] = []
+        error = False
+        start = time.perf_counter()
+
+        try:
+            yield sizes
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.metrics.record(
+                self.step_name,
+                operation,
+                time.perf_counter() - start,
+                bytes_in=bytes_in,
+                bytes_out=sum(sizes),
+                error=error,
+            )
+
+
+def _size(value: object) -> int:
+    if value is None:
+        return 0
+
+    if isinstance(value, Path):
+        try:
+            return value.stat().st_size
+        except OSError:
+            return 0
+
+    return value_size(value)
@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Any, Dict, Optional, Type
+
+from expectmine.storage.base_storage import BaseStore, T
+from expectmine.storage.stores.in_memory_store import MEASURING_CODECS
+from expectmine.storage.utils import validate_key, validate_storage_init, validate_value
+
+
+class SharedInMemoryStore(BaseStore):
+    """
+    Scoped in-memory store shared between processes. The values of all steps
+    live in one dictionary of a server process started by the
+    SharedInMemoryStoreAdapter, keyed by step name and key. Stores can be
+    pickled and passed to worker processes, every operation is a single
+    request to the server process and therefore atomic.
+
+    Unlike the InMemoryStore, values are copied on every put and get, so
+    modifying a returned object does not change the stored value.
+    """
+
+    def __init__(
+        self,
+        step_name: str,
+        persistent_path: Path,
+        working_directory: Path,
+        **kwargs: Dict[Any, Any],
+    ):
+        """
+        :param storage: Proxy of the dictionary in the server process, passed
+            as keyword argument.
+        :type storage: multiprocessing.managers.DictProxy
+        """
+        validate_storage_init(step_name, persistent_path, working_directory)
+        self.step_name = step_name
+        self.persistent_path = persistent_path
+        self.working_directory = working_directory
+        self.storage = kwargs["storage"]
+
+    def put(self, key: str, value: object | Path):
+        validate_key(key)
+        validate_value(value, MEASURING_CODECS)
+
+        self.storage[(self.step_name, key)] = value
+
+    def get(self, key: str, returning: Type[T]) -> Optional[T]:
+        validate_key(key)
+
+        return_object = self.storage.get((self.step_name, key))
+
+        if issubclass(returning, Path) and isinstance(return_object, str):
+            return_object = Path(return_object)
+
+        if not isinstance(return_object, returning | None):
+            raise ValueError("Value and return type do not match.")
+
+        return return_object
+
+    def put_many(self, values: dict[str, object | Path]):
+        for key, value in values.items():
+            validate_key(key)
+            validate_value(value, MEASURING_CODECS)
+
+        self.storage.update({(self.step_name, k): v for k, v in values.items()})
+
+    def delete(self, key: str):
+        validate_key(key)
+        self.storage.pop((self.step_name, key), None)
+
+    def delete_many(self, keys: list[str]):
+        for key in keys:
+            validate_key(key)
+
+        for key in keys:
+            self.storage.pop((self.step_name, key), None)
+
+    def list(self) -> list[str]:
+        return [
+            key for step_name, key in self.storage.keys() if step_name == self.step_name
+        ]
+
+    def exists(self, key: str) -> bool:
+        validate_key(key)
+        return (self.step_name, key) in self.storage
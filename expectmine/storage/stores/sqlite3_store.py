@@ -1,12 +1,177 @@
-import atexit
+import hashlib
 import os
-import pickle
 import sqlite3
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional, Type
+from typing import Any, Dict, List, Optional, Type
 
+from expectmine.storage.base_blob_store import BaseBlobStore
 from expectmine.storage.base_storage import BaseStore, T
-from expectmine.storage.utils import validate_key, validate_storage_init, validate_value
+from expectmine.storage.compression import (
+    COMPRESSION_THRESHOLD,
+    DecompressingWriter,
+    compress,
+    compress_file,
+    decompress,
+    validate_codec,
+)
+from expectmine.storage.serialization import (
+    DEFAULT_VALUE_CODECS,
+    decode_value,
+    validate_value_codecs,
+)
+from expectmine.storage.sqlite3_connection import (
+    ensure_schema,
+    get_connection,
+    read_blob,
+    retry_busy,
+    transaction,
+    write_blob,
+)
+from expectmine.storage.utils import (
+    validate_key,
+    validate_storage_init,
+    validate_value,
+    value_hash,
+)
+
+SCHEMA = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS step_table (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS kv_table (
+    stepid INTEGER,
+    key TEXT NOT NULL,
+    type TEXT NOT NULL CHECK (type IN ('int', 'float', 'string', 'boolean', 'blob', 'file')),
+    int_value INTEGER,
+    float_value REAL,
+    string_value TEXT,
+    boolean_value BOOLEAN,
+    blob_value BLOB,
+    hash TEXT,
+    codec TEXT,
+    encoding TEXT,
+    updated_at REAL,
+    expires_at REAL,
+    PRIMARY KEY (stepid, key),
+    FOREIGN KEY (stepid) REFERENCES step_table(id)
+);
+COMMIT;
+"""
+
+# Statements are module constants, so the statement cache of the shared
+# connection only compiles them once.
+INSERT_STEP = "INSERT OR IGNORE INTO step_table(name) VALUES (?);"
+SELECT_STEP = "SELECT id FROM step_table WHERE name = ?;"
+PUT = """
+INSERT OR REPLACE INTO kv_table
+(stepid, key, type, boolean_value, string_value, int_value, float_value, blob_value, codec, encoding,
+updated_at, expires_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+# Files are stored with a zeroblob of their stored size, which is filled in
+# chunks. The size of the raw file is kept in int_value.
+PUT_FILE = """
+INSERT OR REPLACE INTO kv_table
+(stepid, key, type, string_value, int_value, codec, updated_at, expires_at, blob_value)
+VALUES (?, ?, 'file', ?, ?, ?, ?, ?, zeroblob(?));
+"""
+SET_HASH = "UPDATE kv_table SET hash = ? WHERE rowid = ?;"
+# Values kept in a blob store only reference the hash of their content, the
+# size of files is kept in int_value.
+PUT_REFERENCE = """
+INSERT OR REPLACE INTO kv_table
+(stepid, key, type, string_value, int_value, hash, encoding, updated_at, expires_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+SELECT_REFERENCE = """
+SELECT hash FROM kv_table
+WHERE stepid = ? AND key = ? AND blob_value IS NULL AND hash IS NOT NULL;
+"""
+# Values past their expiry time are not read, they are removed by the
+# compaction.
+LIVE = "(expires_at IS NULL OR expires_at > ?)"
+# The content of files is not selected, it is streamed if needed.
+VALUE_COLUMNS = """
+type, int_value, float_value, string_value, boolean_value,
+CASE WHEN type = 'file' THEN NULL ELSE blob_value END,
+hash, rowid, coalesce(int_value, length(blob_value)),
+blob_value IS NULL AND hash IS NOT NULL, codec, encoding, expires_at
+"""
+GET = f"""
+SELECT {VALUE_COLUMNS}
+FROM kv_table
+WHERE stepid = ? AND key = ? AND {LIVE};
+"""
+# Keys selected at once by get_many, below the sqlite3 limit of variables.
+MAX_VARIABLES = 500
+GET_MANY = f"""
+SELECT key, {VALUE_COLUMNS}
+FROM kv_table
+WHERE stepid = ? AND {LIVE} AND key IN ({{}});
+"""
+# Encoded objects and files from this size on are kept in the blob store.
+BLOB_THRESHOLD = 4096
+DELETE = "DELETE FROM kv_table WHERE stepid = ? AND key = ?;"
+LIST = f"SELECT key FROM kv_table WHERE stepid = ? AND {LIVE};"
+EXISTS = f"SELECT 1 FROM kv_table WHERE stepid = ? AND key = ? AND {LIVE};"
+
+
+def _migrate(conn: sqlite3.Connection):
+    # Databases created before content hashes were stored.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(kv_table);")]
+
+    if "hash" not in columns:
+        conn.execute("ALTER TABLE kv_table ADD COLUMN hash TEXT;")
+
+    # Databases created before values were compressed, their values are raw.
+    if "codec" not in columns:
+        conn.execute("ALTER TABLE kv_table ADD COLUMN codec TEXT;")
+
+    # Databases created before the value codec was recorded, their objects
+    # are pickled.
+    if "encoding" not in columns:
+        conn.execute("ALTER TABLE kv_table ADD COLUMN encoding TEXT;")
+
+    # Databases created before values expired, their values are kept until
+    # the retention removes them, oldest first.
+    if "updated_at" not in columns:
+        conn.execute("ALTER TABLE kv_table ADD COLUMN updated_at REAL;")
+
+    if "expires_at" not in columns:
+        conn.execute("ALTER TABLE kv_table ADD COLUMN expires_at REAL;")
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS kv_expires_at ON kv_table(expires_at) "
+        "WHERE expires_at IS NOT NULL;"
+    )
+
+
+def validate_ttl(ttl: object):
+    """
+    Validates a time to live passed to the Sqlite3Store. Throws an error if
+    not valid.
+
+    :param ttl: Seconds values are kept, or seconds by step name.
+    :type ttl: float | dict[str, float] | None
+
+    :Example:
+
+    >>> validate_ttl({"SiriusFingerprint": 7 * 24 * 3600})
+
+
+    >>> validate_ttl(0)
+    ValueError("ttl needs to be a positive number.")
+
+    :raises ValueError: If a time to live is not a positive number.
+    """
+    ttls = ttl.values() if isinstance(ttl, dict) else [] if ttl is None else [ttl]
+
+    for value in ttls:
+        if isinstance(value, bool) or not isinstance(value, int | float) or value <= 0:
+            raise ValueError("ttl needs to be a positive number.")
 
 
 class Sqlite3Store(BaseStore):
@@ -17,6 +182,24 @@ class Sqlite3Store(BaseStore):
         working_directory: Path,
         **kwargs: Dict[Any, Any],
     ):
+        """
+        :param value_codecs: Names of the value codecs objects are encoded
+            with, tried in order, passed as keyword argument. Defaults to
+            the typed format with pickle as fallback.
+        :type value_codecs: list[str]
+        :param compression: Codec encoded objects and files are compressed
+            with, passed as keyword argument. Values are stored raw by
+            default.
+        :type compression: str | None
+        :param compression_threshold: Smallest size in bytes which is
+            compressed, passed as keyword argument.
+        :type compression_threshold: int
+        :param ttl: Seconds values are kept after they were put, or seconds
+            by step name, passed as keyword argument. Expired values are not
+            read anymore and removed by the compaction. Values are kept
+            forever by default.
+        :type ttl: float | dict[str, float] | None
+        """
         validate_storage_init(step_name, persistent_path, working_directory)
 
         self.step_name = step_name
@@ -25,17 +208,199 @@ class Sqlite3Store(BaseStore):
         self.kwargs = kwargs
 
         os.makedirs(persistent_path, exist_ok=True)
-        self.conn = sqlite3.connect(persistent_path / "sqlite.db", isolation_level=None)
+        self.database = persistent_path / "sqlite.db"
+        # Hash and (mtime, size) of the files written to the working
+        # directory, so unchanged files are not hashed again.
+        self._materialized: dict[Path, tuple[str, tuple[int, int]]] = {}
+        self.blob_store: Optional[BaseBlobStore] = kwargs.get("blob_store")  # type: ignore
+        self.blob_threshold: int = kwargs.get("blob_threshold", BLOB_THRESHOLD)  # type: ignore
+        self.value_codecs: list[str] = kwargs.get(  # type: ignore
+            "value_codecs", DEFAULT_VALUE_CODECS
+        )
+        self.compression: Optional[str] = kwargs.get("compression")  # type: ignore
+        self.compression_threshold: int = kwargs.get(  # type: ignore
+            "compression_threshold", COMPRESSION_THRESHOLD
+        )
+
+        ttl = kwargs.get("ttl")
+
+        validate_value_codecs(self.value_codecs)
+        validate_codec(self.compression)
+        validate_ttl(ttl)
+
+        self.ttl: Optional[float] = (
+            ttl.get(step_name) if isinstance(ttl, dict) else ttl  # type: ignore
+        )
 
         self._setup()
-        atexit.register(self._cleanup)
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Connection of the current thread, shared with all other stores of the
+        thread using the same database.
+        """
+        return get_connection(self.database)
+
+    @retry_busy
     def put(self, key: str, value: object | Path):
+        if isinstance(value, Path) or self.blob_store:
+            self.put_many({key: value})
+            return
+
+        validate_key(key)
+        encoded = validate_value(value, self.value_codecs)
+
+        cur = self.conn.cursor()
+
+        cur.execute(PUT, self._row(key, value, encoded))
+
+    @retry_busy
+    def put_many(self, values: dict[str, object | Path]):
+        encoded_values: dict[str, tuple[bytes, str]] = {}
+
+        for key, value in values.items():
+            validate_key(key)
+            encoded = validate_value(value, self.value_codecs)
+
+            if encoded is not None:
+                encoded_values[key] = encoded
+        references = self._add_references(values, encoded_values)
+
+        try:
+            with transaction(self.conn, immediate=True) as cur:
+                released = self._references(cur, list(values))
+
+                cur.executemany(
+                    PUT,
+                    [
+                        self._row(key, value, encoded_values.get(key))
+                        for key, value in values.items()
+                        if not isinstance(value, Path) and key not in references
+                    ],
+                )
+                cur.executemany(PUT_REFERENCE, references.values())
+
+                for key, value in values.items():
+                    if isinstance(value, Path) and key not in references:
+                        self._put_file(cur, key, value)
+        except BaseException:
+            self._release([reference[5] for reference in references.values()])
+            raise
+
+        self._release(released)
+
+    def get(self, key: str, returning: Type[T]) -> Optional[T]:
         validate_key(key)
-        validate_value(value)
 
         cur = self.conn.cursor()
 
+        res = cur.execute(GET, (self.step_id, key, time.time())).fetchone()
+
+        if res is None:
+            return None
+
+        return self._value(key, res, returning)
+
+    def get_many(
+        self, keys: list[str], returning: Type[T] = object
+    ) -> dict[str, Optional[T]]:
+        return {
+            key: value
+            for key, (value, _) in self.get_many_with_expiry(keys, returning).items()
+        }
+
+    def get_many_with_expiry(
+        self, keys: list[str], returning: Type[T] = object
+    ) -> dict[str, tuple[Optional[T], Optional[float]]]:
+        """
+        Like get_many, but returns every value together with the time it
+        expires at, so caches in front of the store can expire it too.
+
+        :param keys: The keys of the values.
+        :type keys: list[str]
+        :param returning: Type of the values.
+        :type returning: Type[T]
+
+        :return: Value and expiry time by key, None for values which do not
+            expire or do not exist.
+        :rtype: dict[str, tuple[Optional[T], Optional[float]]]
+
+        :Example:
+
+        >>> get_many_with_expiry(["cores"], int)
+        {"cores": (8, 1767225600.0)}
+        """
+        for key in keys:
+            validate_key(key)
+
+        values: dict[str, tuple[Optional[T], Optional[float]]] = {
+            key: (None, None) for key in keys
+        }
+        unique_keys = list(values)
+        now = time.time()
+
+        with transaction(self.conn) as cur:
+            for i in range(0, len(unique_keys), MAX_VARIABLES):
+                chunk = unique_keys[i : i + MAX_VARIABLES]
+                res = cur.execute(
+                    GET_MANY.format(", ".join("?" * len(chunk))),
+                    (self.step_id, now, *chunk),
+                )
+
+                for row in res.fetchall():
+                    values[row[0]] = (
+                        self._value(row[0], row[1:], returning),
+                        row[13],
+                    )
+
+        return values
+
+    @retry_busy
+    def delete(self, key: str):
+        validate_key(key)
+
+        if self.blob_store:
+            self.delete_many([key])
+            return
+
+        cur = self.conn.cursor()
+
+        cur.execute(DELETE, (self.step_id, key))
+
+    @retry_busy
+    def delete_many(self, keys: list[str]):
+        for key in keys:
+            validate_key(key)
+
+        with transaction(self.conn, immediate=True) as cur:
+            released = self._references(cur, keys)
+            cur.executemany(DELETE, [(self.step_id, key) for key in keys])
+
+        self._release(released)
+
+    def list(self) -> list[str]:
+        cur = self.conn.cursor()
+
+        res = cur.execute(LIST, (self.step_id, time.time()))
+
+        return [k[0] for k in res]
+
+    def exists(self, key: str) -> bool:
+        cur = self.conn.cursor()
+
+        res = cur.execute(EXISTS, (self.step_id, key, time.time())).fetchone()
+
+        return res is not None
+
+    def _row(
+        self, key: str, value: object, encoded: Optional[tuple[bytes, str]]
+    ) -> tuple:
+        """
+        Returns the parameters of the PUT statement for a key value pair and
+        the encoded value returned by validate_value, files are stored with
+        _put_file.
+        """
         match value:
             case bool():
                 value_type = "boolean"
@@ -45,53 +410,114 @@ class Sqlite3Store(BaseStore):
                 value_type = "int"
             case float():
                 value_type = "float"
-            case Path():
-                value_type = "file"
             case _:
                 value_type = "blob"
 
-        cur.execute(
-            """
-            INSERT OR REPLACE INTO kv_table
-            (stepid, key, type, boolean_value, string_value, int_value, float_value, blob_value)
-            SELECT step.id, ?, ?, ?, ?, ?, ?, ?
-            FROM steps_table step
-            WHERE step.name = ?;
-            """,
-            (
-                key,
-                value_type,
-                value if value_type == "boolean" else None,
-                value
-                if value_type == "string"
-                else (value.suffix if isinstance(value, Path) else None),
-                value if value_type == "int" else None,
-                value if value_type == "float" else None,
-                pickle.dumps(value)
-                if value_type == "blob"
-                else (value.read_bytes() if isinstance(value, Path) else None),
-                self.step_name,
-            ),
+        data, codec, encoding = None, None, None
+
+        if value_type == "blob":
+            data, encoding = encoded  # type: ignore
+            data, codec = compress(data, self.compression, self.compression_threshold)
+
+        return (
+            self.step_id,
+            key,
+            value_type,
+            value if value_type == "boolean" else None,
+            value if value_type == "string" else None,
+            value if value_type == "int" else None,
+            value if value_type == "float" else None,
+            data,
+            codec,
+            encoding,
+            *self._timestamps(),
         )
 
-    def get(self, key: str, returning: Type[T]) -> Optional[T]:
-        validate_key(key)
+    def _add_references(
+        self,
+        values: dict[str, object | Path],
+        encoded_values: dict[str, tuple[bytes, str]],
+    ) -> dict[str, tuple]:
+        """
+        Adds the files and encoded objects from the blob threshold on to the
+        blob store. Returns the parameters of the PUT_REFERENCE statement by
+        key.
+        """
+        references: dict[str, tuple] = {}
 
-        cur = self.conn.cursor()
+        if self.blob_store is None:
+            return references
 
-        res = cur.execute(
-            """
-            SELECT type, int_value, float_value, string_value, boolean_value, blob_value
-            FROM step_table
-            JOIN kv_table ON step_table.id = kv_table.stepid
-            WHERE step_table.name = ? AND kv_table.key = ?;
-            """,
-            (self.step_name, key),
-        ).fetchone()
+        try:
+            for key, value in values.items():
+                if isinstance(value, Path):
+                    size = value.stat().st_size
+                    value_type, suffix, content, encoding = (
+                        "file",
+                        value.suffix,
+                        value,
+                        None,
+                    )
+                elif key in encoded_values:
+                    content, encoding = encoded_values[key]
+                    size = len(content)
+                    value_type, suffix = "blob", None
+                else:
+                    continue
 
-        if res is None:
-            return None
+                if size >= self.blob_threshold:
+                    content_hash = self.blob_store.put(content)
+                    references[key] = (
+                        self.step_id,
+                        key,
+                        value_type,
+                        suffix,
+                        size,
+                        content_hash,
+                        encoding,
+                        *self._timestamps(),
+                    )
+        except BaseException:
+            self._release([reference[5] for reference in references.values()])
+            raise
+
+        return references
+
+    def _timestamps(self) -> tuple[float, Optional[float]]:
+        """
+        Returns the update and expiry time of a value put now.
+        """
+        now = time.time()
+
+        return now, now + self.ttl if self.ttl is not None else None
+
+    def _references(self, cur: sqlite3.Cursor, keys: List[str]) -> List[str]:
+        """
+        Returns the hashes the given keys reference in the blob store.
+        """
+        if self.blob_store is None:
+            return []
+
+        hashes = []
+
+        for key in keys:
+            res = cur.execute(SELECT_REFERENCE, (self.step_id, key)).fetchone()
+            if res:
+                hashes.append(res[0])
+
+        return hashes
+
+    def _release(self, hashes: List[str]):
+        """
+        Releases references to the blob store.
+        """
+        for content_hash in hashes:
+            self.blob_store.release(content_hash)  # type: ignore
 
+    def _value(self, key: str, res: tuple, returning: Type[T]) -> T:
+        """
+        Returns the value of a row selected by the GET statement.
+        """
         match res[0]:
             case "int":
                 return_object = int(res[1])
@@ -102,103 +528,128 @@ class Sqlite3Store(BaseStore):
             case "boolean":
                 return_object = bool(res[4])
             case "file":
-                return_object = (
-                    self.working_directory / f"{self.step_name}-{key}{res[3]}"
-                )
-                with open(return_object, "wb") as f:
-                    f.write(res[5])
+                return_object = self._materialize(key, res)
+            case "blob" if res[9]:
+                content = self._blob_store().get(res[6])
+
+                if content is None:
+                    raise ValueError(
+                        f"Content {res[6]} of {key} is missing in the blob store."
+                    )
+
+                return_object = decode_value(content, res[11])
             case "blob":
-                return_object = pickle.loads(bytes(res[5]))
+                return_object = decode_value(
+                    decompress(bytes(res[5]), res[10]), res[11]
+                )
             case _:
                 raise ValueError("Value and return type do not match.")
 
         if not isinstance(return_object, returning | None):
-            print(type(return_object), return_object)
-            print(type(returning), returning)
             raise ValueError("Value and return type do not match.")
 
         return return_object
 
-    def delete(self, key: str):
-        validate_key(key)
+    def _put_file(self, cur: sqlite3.Cursor, key: str, path: Path):
+        """
+        Stores a file in chunks, without loading it into memory, together
+        with the hash of its content. Needs to run in a transaction.
+        """
+        size = path.stat().st_size
+        digest = None
 
-        cur = self.conn.cursor()
+        if self.compression and size >= self.compression_threshold:
+            source, codec, content_hash = compress_file(path, self.compression)
+        else:
+            source, codec, digest = open(path, "rb"), None, hashlib.sha256()
 
-        cur.execute(
-            """
-            DELETE FROM kv_table
-            WHERE key = ? AND stepid IN (SELECT id FROM step_table WHERE name = ?);
-            """,
-            (key, self.step_name),
-        )
+        with source:
+            stored_size = os.fstat(source.fileno()).st_size
+            cur.execute(
+                PUT_FILE,
+                (
+                    self.step_id,
+                    key,
+                    path.suffix,
+                    size,
+                    codec,
+                    *self._timestamps(),
+                    stored_size,
+                ),
+            )
+            rowid = cur.lastrowid
+            write_blob(self.conn, "kv_table", "blob_value", rowid, source, digest)
 
-    def list(self) -> list[str]:
-        cur = self.conn.cursor()
+        if digest is not None:
+            content_hash = digest.hexdigest()
 
-        res = cur.execute(
-            """
-            SELECT key
-            FROM kv_table
-            WHERE stepid IN (SELECT id FROM step_table WHERE name = ?);
-            """,
-            (self.step_name,),
-        )
+        cur.execute(SET_HASH, (content_hash, rowid))
 
-        return [k[0] for k in res]
+    def _materialize(self, key: str, res: tuple) -> Path:
+        """
+        Returns the path of a stored file in the working directory. The file
+        is only written if it does not exist yet with the same content,
+        otherwise the existing file is returned.
+        """
+        path = self.working_directory / f"{self.step_name}-{key}{res[3]}"
+        content_hash, rowid, size = res[6], res[7], res[8] or 0
 
-    def exists(self, key: str) -> bool:
-        cur = self.conn.cursor()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
 
-        res = cur.execute(
-            """
-            SELECT 1
-            FROM kv_table
-            WHERE key = ? AND stepid IN (SELECT id from step_table WHERE name = ?)
-            """,
-            (key, self.step_name),
-        ).fetchone()
+        if content_hash and stat and stat.st_size == size:
+            fingerprint = (stat.st_mtime_ns, stat.st_size)
 
-        return res is not None
+            if self._materialized.get(path) == (content_hash, fingerprint):
+                return path
 
-    def _setup(self):
-        """
-        Sets up the database, creates the necessary tables (if they don't exist)
-        and checks that the necessary namespace (given by the step) exists.
-        """
-        cur = self.conn.cursor()
-        cur.executescript(
-            """
-            BEGIN;
-            PRAGMA foreign_keys = ON;
-            CREATE TABLE IF NOT EXISTS step_table (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE
-            );
-            CREATE TABLE IF NOT EXISTS kv_table (
-                stepid INTEGER,
-                key TEXT NOT NULL,
-                type TEXT NOT NULL CHECK (type IN ('int', 'float', 'string', 'boolean', 'blob', 'file')),
-                int_value INTEGER,
-                float_value REAL,
-                string_value TEXT,
-                boolean_value BOOLEAN,
-                blob_value BLOB,
-                PRIMARY KEY (stepid, key),
-                FOREIGN KEY (stepid) REFERENCES step_table(id)
-            );
-            COMMIT;
-            """
-        )
+            if value_hash(path) == content_hash:
+                self._materialized[path] = (content_hash, fingerprint)
+                return path
 
-        cur.execute(
-            """
-            INSERT OR IGNORE INTO step_table(name) VALUES (?);
-            """,
-            (self.step_name,),
-        )
+        os.makedirs(self.working_directory, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        if res[9]:
+            if not self._blob_store().copy_to(content_hash, temp_path):
+                raise ValueError(
+                    f"Content {content_hash} of {key} is missing in the blob store."
+                )
+        elif res[10]:
+            with open(temp_path, "wb") as f, DecompressingWriter(f, res[10]) as writer:
+                read_blob(self.conn, "kv_table", "blob_value", rowid, writer)  # type: ignore
+        else:
+            with open(temp_path, "wb") as f:
+                read_blob(self.conn, "kv_table", "blob_value", rowid, f)
+
+        os.replace(temp_path, path)
+
+        if content_hash:
+            stat = os.stat(path)
+            self._materialized[path] = (
+                content_hash,
+                (stat.st_mtime_ns, stat.st_size),
+            )
+
+        return path
+
+    def _blob_store(self) -> BaseBlobStore:
+        if self.blob_store is None:
+            raise ValueError("Value is kept in a blob store, which is not configured.")
 
-    def _cleanup(self):
+        return self.blob_store
+
+    @retry_busy
+    def _setup(self):
         """
-        On exit, closes the sqlite3 connection.
+        Sets up the database, creates the necessary tables (once per database
+        and process) and checks that the necessary namespace (given by the
+        step) exists. The id of the namespace is cached for all queries.
         """
-        self.conn.close()
+        ensure_schema(self.database, "Sqlite3Store", SCHEMA, _migrate)
+
+        cur = self.conn.cursor()
+        cur.execute(INSERT_STEP, (self.step_name,))
+        self.step_id: int = cur.execute(SELECT_STEP, (self.step_name,)).fetchone()[0]
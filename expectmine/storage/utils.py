@@ -1,10 +1,12 @@
+import hashlib
 import os
-import pickle
 import sys
 from pathlib import Path
+from typing import Optional
 
 from expectmine.io.base_io import BaseIo
 from expectmine.steps.base_step import BaseStep
+from expectmine.storage.serialization import encode_value
 
 
 def validate_adapter_init(persistent_path: Path, working_directory: Path):
@@ -137,45 +139,62 @@ def validate_key(key: str):
         raise ValueError("Key needs to be shorter than 255 characters.")
 
 
-def validate_value(value: object):
+def validate_value(
+    value: object, codecs: Optional[list[str]] = None
+) -> Optional[tuple[bytes, str]]:
     """
-    Validates that the given object is of valid format. Throws an error
-    if not.
+    Validates that the given object is of valid format and encodes it. Throws
+    an error if not. Objects which are not stored natively are encoded once
+    with the first value codec supporting them, the size limit applies to
+    the encoded bytes, which the store should keep instead of encoding the
+    object again.
 
     :param value: The value to store. The maximum size of a value is
-        25 MiB. The object needs to be Pickled.
+        25 MiB. The object needs to be supported by one of the codecs.
     :type value: object
+    :param codecs: Names of the value codecs to try in order, defaults to
+        DEFAULT_VALUE_CODECS (typed, then pickle).
+    :type codecs: list[str] | None
+
+    :return: The encoded object and the name of its codec, None for files,
+        booleans, strings, integers and floats, which are stored natively.
+    :rtype: tuple[bytes, str] | None
 
     :Example:
 
     >>> validate_value("hello")
+    None
 
+    >>> validate_value({"hello": "world"})
+    (b"\\x81\\xa5hello\\xa5world", "typed")
 
-    >>> validate_value("")
-    ValueError("Key can not be empty")
+    >>> validate_value([bytes(2**20)] * 30)
+    ValueError("Size of object should be smaller than 25mb.")
 
     :raises TypeError: If the arguments have the wrong type.
     :raises ValueError: If the object or file is too big, the wrong
-        size or can't be pickled.
+        size or can't be encoded.
     """
 
     if isinstance(value, Path):
         if os.path.getsize(value) / (1024 * 1024) > 100:
             raise ValueError("File should be smaller than 100MiB.")
-        return
+        return None
+
+    if isinstance(value, (bool, int, float)):
+        return None
 
-    if isinstance(value, object):
-        if (sys.getsizeof(value) / (1024 * 1024)) > 25:
+    if isinstance(value, str):
+        if len(value) / (1024 * 1024) > 25:
             raise ValueError("Size of object should be smaller than 25mb.")
+        return None
 
-        try:
-            pickle.dumps(value)
-        except Exception:
-            raise ValueError("Object can not be pickled.")
+    encoded, codec = encode_value(value, codecs)
 
-        return
+    if len(encoded) / (1024 * 1024) > 25:
+        raise ValueError("Size of object should be smaller than 25mb.")
 
-    raise TypeError("Value should be of type object or Path.")
+    return encoded, codec
 
 
 def validate_step_name(step_name: str):
@@ -262,3 +281,68 @@ def validate_pipeline(
 
     if not all(path.is_file() for path in input_files):
         raise ValueError("Input_files should be files and not paths.")
+
+
+def value_hash(value: bytes | Path) -> str:
+    """
+    Returns the sha256 hash of bytes or of the content of a file. Files are
+    read in chunks.
+
+    :param value: The bytes or file to hash.
+    :type value: bytes | Path
+
+    :return: Hex digest of the content.
+    :rtype: str
+
+    :Example:
+
+    >>> value_hash(b"hello")
+    "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+
+    >>> value_hash(Path("hello.txt"))
+    "a948904f2f0f479b8f8197694b30184b0d2ed1c1cd2a1ec0fb85d299a192a447"
+    """
+    if not isinstance(value, Path):
+        return hashlib.sha256(value).hexdigest()
+
+    digest = hashlib.sha256()
+
+    with open(value, "rb") as f:
+        for chunk in iter(lambda: f.read(1024**2), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def value_size(value: object, depth: int = 3) -> int:
+    """
+    Estimates the memory used by a decoded value, including the items of
+    containers up to the given depth.
+
+    :param value: The value to measure.
+    :type value: object
+    :param depth: Levels of nested containers to include.
+    :type depth: int
+
+    :return: Estimated size in bytes.
+    :rtype: int
+
+    :Example:
+
+    >>> value_size({"cores": 8})
+    306
+    """
+    size = sys.getsizeof(value)
+
+    if depth <= 0 or isinstance(value, (str, bytes, bytearray)):
+        return size
+
+    if isinstance(value, dict):
+        size += sum(
+            value_size(k, depth - 1) + value_size(v, depth - 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(value_size(item, depth - 1) for item in value)
+
+    return size
@@ -0,0 +1,29 @@
+import pickle
+
+from expectmine.storage.base_value_codec import BaseValueCodec
+
+# Protocol objects are pickled with, the highest protocol serializes large
+# buffers without copying them.
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class PickleCodec(BaseValueCodec):
+    """
+    Encodes every object pickle supports. Decoding pickled data can run
+    arbitrary code, so it should only be used for data the pipeline wrote
+    itself and as fallback for objects other codecs do not support.
+    """
+
+    name = "pickle"
+
+    def encode(self, value: object) -> bytes:
+        try:
+            return pickle.dumps(value, protocol=PICKLE_PROTOCOL)
+        except Exception:
+            raise TypeError("Object can not be pickled.")
+
+    def decode(self, data: bytes) -> object:
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            raise ValueError(f"Pickled object can not be loaded: {e}")
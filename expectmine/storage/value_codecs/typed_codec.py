@@ -0,0 +1,411 @@
+import struct
+from pathlib import Path
+
+from expectmine.storage.base_value_codec import BaseValueCodec
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+# The C implementation of msgpack is used if it is installed, both write the
+# same bytes.
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None  # type: ignore
+
+# Extension types of the format, stored in the type byte of msgpack ext
+# values.
+EXT_TUPLE = 1
+EXT_PATH = 2
+EXT_ARRAY = 3
+EXT_SET = 4
+EXT_FROZENSET = 5
+_EXT_TYPES = {tuple: EXT_TUPLE, set: EXT_SET, frozenset: EXT_FROZENSET}
+
+_UINT8 = struct.Struct(">BB")
+_UINT16 = struct.Struct(">BH")
+_UINT32 = struct.Struct(">BI")
+_UINT64 = struct.Struct(">BQ")
+_INT8 = struct.Struct(">Bb")
+_INT16 = struct.Struct(">Bh")
+_INT32 = struct.Struct(">Bi")
+_INT64 = struct.Struct(">Bq")
+_DOUBLE = struct.Struct(">Bd")
+_EXT8 = struct.Struct(">BBb")
+_EXT16 = struct.Struct(">BHb")
+_EXT32 = struct.Struct(">BIb")
+# Extension values of these sizes have no length, by size: marker.
+_FIXEXT = {1: 0xD4, 2: 0xD5, 4: 0xD6, 8: 0xD7, 16: 0xD8}
+_FIXEXT_HEADER = struct.Struct(">Bb")
+
+
+class TypedCodec(BaseValueCodec):
+    """
+    Typed binary format for configs, answers and arrays. Values are encoded
+    in the msgpack format, paths, tuples, sets and numpy arrays as msgpack
+    extension types, so they are decoded with their type.
+    Unlike pickle, the format does not depend on the python version and
+    decoding never runs code.
+
+    Supported are None, bool, int (64 bit), float, str, bytes, Path, numpy
+    arrays of numeric, boolean and string dtypes, and lists, tuples, sets and
+    dicts of them. Subclasses (e.g. OrderedDict) are not supported, they are
+    left to the next codec. If the msgpack package is installed, its C
+    implementation encodes and decodes the values, otherwise a python
+    implementation.
+
+    :Example:
+
+    >>> codec = TypedCodec()
+    >>> codec.decode(codec.encode({"batchfile": Path("batch.xml"), "cores": 8}))
+    {"batchfile": PosixPath("batch.xml"), "cores": 8}
+    """
+
+    name = "typed"
+
+    def encode(self, value: object) -> bytes:
+        return _dumps(value)
+
+    def decode(self, data: bytes) -> object:
+        try:
+            return _loads(data)
+        except (IndexError, TypeError, struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Typed value is not valid: {e}")
+
+
+def _dumps(value: object) -> bytes:
+    if msgpack is not None:
+        try:
+            return msgpack.packb(
+                value,
+                default=_default,
+                strict_types=True,
+                use_bin_type=True,
+                unicode_errors="surrogatepass",
+            )
+        except OverflowError:
+            raise TypeError("Integers larger than 64 bit are not supported.")
+
+    out = bytearray()
+    _encode(value, out)
+
+    return bytes(out)
+
+
+def _loads(data: bytes) -> object:
+    if msgpack is not None:
+        return msgpack.unpackb(
+            data,
+            ext_hook=_decode_ext,
+            raw=False,
+            strict_map_key=False,
+            unicode_errors="surrogatepass",
+        )
+
+    value, position = _decode(data, 0)
+
+    if position != len(data):
+        raise ValueError("Typed value is not valid: trailing data.")
+
+    return value
+
+
+def _default(value: object) -> object:
+    # Called by msgpack for the types it does not encode itself.
+    if isinstance(value, Path):
+        return msgpack.ExtType(EXT_PATH, str(value).encode("utf-8", "surrogateescape"))
+
+    if type(value) in _EXT_TYPES:
+        return msgpack.ExtType(_EXT_TYPES[type(value)], _dumps(list(value)))  # type: ignore
+
+    if np is not None and type(value) is np.ndarray:
+        return msgpack.ExtType(EXT_ARRAY, _encode_array(value))
+
+    raise TypeError(f"Type {type(value).__name__} is not supported.")
+
+
+def _encode(value: object, out: bytearray):
+    # Types are compared exactly and ordered by how often they occur in
+    # configs, isinstance would accept subclasses the format can not restore.
+    value_type = type(value)
+
+    if value_type is str:
+        data = value.encode("utf-8", "surrogatepass")  # type: ignore
+        size = len(data)
+
+        if size < 32:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += _UINT8.pack(0xD9, size)
+        elif size < 0x10000:
+            out += _UINT16.pack(0xDA, size)
+        else:
+            out += _UINT32.pack(0xDB, size)
+
+        out += data
+    elif value_type is int:
+        _encode_int(value, out)  # type: ignore
+    elif value_type is bool:
+        out.append(0xC3 if value else 0xC2)
+    elif value_type is float:
+        out += _DOUBLE.pack(0xCB, value)
+    elif value is None:
+        out.append(0xC0)
+    elif value_type is dict:
+        _header(len(value), 0x80, 0xDE, 0xDF, out)  # type: ignore
+
+        for key, item in value.items():  # type: ignore
+            _encode(key, out)
+            _encode(item, out)
+    elif value_type is list:
+        _header(len(value), 0x90, 0xDC, 0xDD, out)  # type: ignore
+
+        for item in value:  # type: ignore
+            _encode(item, out)
+    elif isinstance(value, Path):
+        _ext(EXT_PATH, str(value).encode("utf-8", "surrogateescape"), out)
+    elif value_type is bytes:
+        size = len(value)  # type: ignore
+
+        if size < 0x100:
+            out += _UINT8.pack(0xC4, size)
+        elif size < 0x10000:
+            out += _UINT16.pack(0xC5, size)
+        else:
+            out += _UINT32.pack(0xC6, size)
+
+        out += value  # type: ignore
+    elif value_type in (tuple, set, frozenset):
+        items = bytearray()
+        _header(len(value), 0x90, 0xDC, 0xDD, items)  # type: ignore
+
+        for item in value:  # type: ignore
+            _encode(item, items)
+
+        _ext(_EXT_TYPES[value_type], items, out)
+    elif np is not None and value_type is np.ndarray:
+        _ext(EXT_ARRAY, _encode_array(value), out)
+    else:
+        raise TypeError(f"Type {value_type.__name__} is not supported.")
+
+
+def _encode_int(value: int, out: bytearray):
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xFF)
+    elif value >= 0:
+        if value < 0x100:
+            out += _UINT8.pack(0xCC, value)
+        elif value < 0x10000:
+            out += _UINT16.pack(0xCD, value)
+        elif value < 0x100000000:
+            out += _UINT32.pack(0xCE, value)
+        elif value < 0x10000000000000000:
+            out += _UINT64.pack(0xCF, value)
+        else:
+            raise TypeError("Integers larger than 64 bit are not supported.")
+    elif value >= -0x80:
+        out += _INT8.pack(0xD0, value)
+    elif value >= -0x8000:
+        out += _INT16.pack(0xD1, value)
+    elif value >= -0x80000000:
+        out += _INT32.pack(0xD2, value)
+    elif value >= -0x8000000000000000:
+        out += _INT64.pack(0xD3, value)
+    else:
+        raise TypeError("Integers larger than 64 bit are not supported.")
+
+
+def _header(size: int, fix: int, marker16: int, marker32: int, out: bytearray):
+    # Header of arrays and maps, fix holds up to 15 items.
+    if size < 16:
+        out.append(fix | size)
+    elif size < 0x10000:
+        out += _UINT16.pack(marker16, size)
+    else:
+        out += _UINT32.pack(marker32, size)
+
+
+def _ext(ext_type: int, data: bytes | bytearray, out: bytearray):
+    size = len(data)
+
+    if size in _FIXEXT:
+        out += _FIXEXT_HEADER.pack(_FIXEXT[size], ext_type)
+    elif size < 0x100:
+        out += _EXT8.pack(0xC7, size, ext_type)
+    elif size < 0x10000:
+        out += _EXT16.pack(0xC8, size, ext_type)
+    else:
+        out += _EXT32.pack(0xC9, size, ext_type)
+
+    out += data
+
+
+def _encode_array(value: "np.ndarray") -> bytes:
+    # Object and structured dtypes can not be restored from their raw bytes.
+    if value.dtype.kind not in "biufcSU":
+        raise TypeError(f"Arrays of dtype {value.dtype} are not supported.")
+
+    dtype = value.dtype.str.encode()
+    header = struct.pack(
+        f">B{len(dtype)}sB{value.ndim}Q", len(dtype), dtype, value.ndim, *value.shape
+    )
+
+    return header + value.tobytes(order="C")
+
+
+def _decode_array(data: bytes) -> object:
+    if np is None:
+        raise ValueError("Value is a numpy array, numpy is not installed.")
+
+    dtype_size = data[0]
+    dtype = data[1 : 1 + dtype_size].decode()
+    ndim = data[1 + dtype_size]
+    offset = 2 + dtype_size
+    shape = struct.unpack_from(f">{ndim}Q", data, offset)
+
+    # Copied into a bytearray, so the array is writable like an unpickled one.
+    buffer = bytearray(data[offset + 8 * ndim :])
+
+    return np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape)
+
+
+def _decode_ext(ext_type: int, data: bytes) -> object:
+    if ext_type == EXT_PATH:
+        return Path(data.decode("utf-8", "surrogateescape"))
+
+    if ext_type == EXT_TUPLE:
+        return tuple(_loads(data))  # type: ignore
+
+    if ext_type == EXT_SET:
+        return set(_loads(data))  # type: ignore
+
+    if ext_type == EXT_FROZENSET:
+        return frozenset(_loads(data))  # type: ignore
+
+    if ext_type == EXT_ARRAY:
+        return _decode_array(data)
+
+    raise ValueError(f"Unknown extension type {ext_type}.")
+
+
+# Markers with a length in front of their content, by marker: (struct of
+# the length, kind).
+_SIZED = {
+    0xD9: (">B", "str"),
+    0xDA: (">H", "str"),
+    0xDB: (">I", "str"),
+    0xC4: (">B", "bin"),
+    0xC5: (">H", "bin"),
+    0xC6: (">I", "bin"),
+    0xDC: (">H", "array"),
+    0xDD: (">I", "array"),
+    0xDE: (">H", "map"),
+    0xDF: (">I", "map"),
+    0xC7: (">B", "ext"),
+    0xC8: (">H", "ext"),
+    0xC9: (">I", "ext"),
+}
+_NUMBERS = {
+    0xCC: struct.Struct(">B"),
+    0xCD: struct.Struct(">H"),
+    0xCE: struct.Struct(">I"),
+    0xCF: struct.Struct(">Q"),
+    0xD0: struct.Struct(">b"),
+    0xD1: struct.Struct(">h"),
+    0xD2: struct.Struct(">i"),
+    0xD3: struct.Struct(">q"),
+    0xCA: struct.Struct(">f"),
+    0xCB: struct.Struct(">d"),
+}
+_CONSTANTS = {0xC0: None, 0xC2: False, 0xC3: True}
+
+
+def _decode(data: bytes, position: int) -> tuple[object, int]:
+    marker = data[position]
+    position += 1
+
+    if marker < 0x80:
+        return marker, position
+
+    if marker >= 0xE0:
+        return marker - 0x100, position
+
+    if marker >= 0xA0 and marker < 0xC0:
+        end = _end(data, position, marker & 0x1F)
+        return data[position:end].decode("utf-8", "surrogatepass"), end
+
+    if marker < 0x90:
+        return _decode_map(data, position, marker & 0x0F)
+
+    if marker < 0xA0:
+        return _decode_array_items(data, position, marker & 0x0F)
+
+    if marker in _CONSTANTS:
+        return _CONSTANTS[marker], position
+
+    if 0xD4 <= marker <= 0xD8:
+        ext_type = struct.unpack_from(">b", data, position)[0]
+        end = _end(data, position + 1, 1 << (marker - 0xD4))
+        return _decode_ext(ext_type, data[position + 1 : end]), end
+
+    number = _NUMBERS.get(marker)
+
+    if number is not None:
+        return number.unpack_from(data, position)[0], position + number.size
+
+    if marker not in _SIZED:
+        raise ValueError(f"Unknown marker {marker:#x}.")
+
+    size_format, kind = _SIZED[marker]
+    size = struct.unpack_from(size_format, data, position)[0]
+    position += struct.calcsize(size_format)
+
+    if kind == "map":
+        return _decode_map(data, position, size)
+
+    if kind == "array":
+        return _decode_array_items(data, position, size)
+
+    if kind == "ext":
+        ext_type = struct.unpack_from(">b", data, position)[0]
+        end = _end(data, position + 1, size)
+        return _decode_ext(ext_type, data[position + 1 : end]), end
+
+    end = _end(data, position, size)
+
+    if kind == "str":
+        return data[position:end].decode("utf-8", "surrogatepass"), end
+
+    return data[position:end], end
+
+
+def _end(data: bytes, position: int, size: int) -> int:
+    if position + size > len(data):
+        raise ValueError("Typed value is truncated.")
+
+    return position + size
+
+
+def _decode_map(data: bytes, position: int, size: int) -> tuple[object, int]:
+    value = {}
+
+    for _ in range(size):
+        key, position = _decode(data, position)
+        value[key], position = _decode(data, position)
+
+    return value, position
+
+
+def _decode_array_items(data: bytes, position: int, size: int) -> tuple[object, int]:
+    value = []
+    append = value.append
+
+    for _ in range(size):
+        item, position = _decode(data, position)
+        append(item)
+
+    return value, position
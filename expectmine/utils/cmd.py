@@ -1,10 +1,90 @@
+import atexit
+import signal
 import subprocess
 import os
-from pathlib import Path
+import threading
+import time
 from typing import Optional
 
+from expectmine.logger.base_logger import BaseLogger
+from expectmine.utils.monitor import ProcessMonitor
 
-def validate_cmd(cmd: str, options: Optional[list[tuple[str, str] | str]] = None):
+# Seconds a process group gets to exit after SIGTERM before it is killed.
+TERMINATE_GRACE_PERIOD = 5.0
+# Seconds between two checks for timeouts and cancellation.
+POLL_INTERVAL = 0.2
+
+_running: dict[subprocess.Popen, threading.Event] = {}
+_running_lock = threading.Lock()
+
+
+def terminate_process_tree(
+    process: subprocess.Popen, grace_period: float = TERMINATE_GRACE_PERIOD
+):
+    """
+    Terminates a process started by run_cmd together with all processes in
+    its process group. The group first receives SIGTERM and, if it did not
+    exit within the grace period, SIGKILL.
+
+    :param process: Process started in its own session.
+    :type process: subprocess.Popen
+    :param grace_period: Seconds to wait after SIGTERM.
+    :type grace_period: float
+
+    :Example:
+
+    >>> terminate_process_tree(process)
+    """
+    if not hasattr(os, "killpg"):
+        process.kill()
+        return
+
+    for sig in [signal.SIGTERM, signal.SIGKILL]:
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+
+        try:
+            process.wait(grace_period)
+            # Children which ignore SIGTERM can outlive the group leader.
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            return
+        except subprocess.TimeoutExpired:
+            continue
+        return
+
+
+def cancel_running_cmds():
+    """
+    Cancels all commands currently running through run_cmd, e.g. from a
+    signal handler or another thread. The process trees are terminated and
+    the calls of run_cmd raise InterruptedError.
+
+    :Example:
+
+    >>> cancel_running_cmds()
+    """
+    with _running_lock:
+        for event in _running.values():
+            event.set()
+
+
+@atexit.register
+def _terminate_running_cmds():
+    with _running_lock:
+        processes = list(_running)
+
+    for process in processes:
+        terminate_process_tree(process)
+
+
+def validate_cmd(
+    cmd: str,
+    options: Optional[list[tuple[str, str] | str]] = None,
+    env: Optional[dict[str, str]] = None,
+):
     """
     Validates the cmd parameters.
 
@@ -14,6 +94,8 @@ def validate_cmd(cmd: str, options: Optional[list[tuple[str, str] | str]] = None
     :param options: List of options added to the command. Options can be either arguments
         or tuples of option followed by the argument.
     :type options: Optional[list[tuple[str, str] | str]]
+    :param env: Additional env variables for the command.
+    :type env: Optional[dict[str, str]]
 
     :Example:
 
@@ -29,6 +111,11 @@ def validate_cmd(cmd: str, options: Optional[list[tuple[str, str] | str]] = None
         raise TypeError("Cmd needs to be of type str.")
     if not isinstance(options, list | None):
         raise TypeError("Options are not a list or None.")
+    if env is not None and (
+        not isinstance(env, dict)
+        or not all(isinstance(k, str) and isinstance(v, str) for k, v in env.items())
+    ):
+        raise TypeError("Env needs to be of type dict[str, str] or None.")
 
     if not options:
         return
@@ -41,20 +128,100 @@ def validate_cmd(cmd: str, options: Optional[list[tuple[str, str] | str]] = None
         raise TypeError("Option of options list is not of type tuple[str, str] or str")
 
 
-def run_cmd(
+def build_argv(
     cmd: str, options: list[tuple[str, str] | str] | None = None
+) -> list[str]:
+    """
+    Builds the argument vector of a command. Every option is passed as its own
+    argument, so no quoting is needed for paths containing spaces or quotes.
+
+    :param cmd: The base command to run.
+    :type cmd: str
+    :param options: List of options added to the command. Options can be either arguments
+        or tuples of option followed by the argument.
+    :type options: Optional[list[tuple[str, str] | str]]
+
+    :return: The argument vector.
+    :rtype: list[str]
+
+    :Example:
+
+    >>> build_argv("ls", ["-lh", ("--color", "never")])
+    ["ls", "-lh", "--color", "never"]
+    """
+    argv = [cmd]
+
+    for option in options if options else []:
+        if isinstance(option, str):
+            argv.append(option)
+        else:
+            argv.extend(option)
+
+    return argv
+
+
+def _read(stream, chunks: list[str]):
+    chunks.append(stream.read())
+    stream.close()
+
+
+def _wait_finished(
+    process: subprocess.Popen,
+    readers: list[threading.Thread],
+    finished: threading.Event,
+):
+    # Waits for the exit without reaping the process, the counters of a
+    # process stay readable in /proc until it is waited for.
+    try:
+        if hasattr(os, "waitid"):
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        else:
+            process.wait()
+    except ChildProcessError:
+        # Already reaped by terminate_process_tree.
+        pass
+
+    for reader in readers:
+        reader.join()
+
+    finished.set()
+
+
+def run_cmd(
+    cmd: str,
+    options: list[tuple[str, str] | str] | None = None,
+    env: dict[str, str] | None = None,
+    monitor: ProcessMonitor | None = None,
+    timeout: float | None = None,
+    cancel_event: threading.Event | None = None,
+    logger: BaseLogger | None = None,
 ) -> tuple[int, str, str]:
     """
-    Runs a command and options in the command line. Returns three values,
-    the result status code, a string of the cmd output and a string containing
-    the error message if any is produced during execution.
+    Runs a command with options. Returns three values, the result status
+    code, a string of the cmd output and a string containing the error message
+    if any is produced during execution. The command is executed directly
+    (without a shell), if it can not be started the status code is 127.
 
 
-    :param cmd: The base command to run.
+    :param cmd: The executable to run.
     :type cmd: str
     :param options: List of options added to the command. Options can be either arguments
         or tuples of option followed by the argument.
     :type options: Optional[list[tuple[str, str] | str]]
+    :param env: Additional env variables for the command. The environment of the
+        current process is inherited.
+    :type env: Optional[dict[str, str]]
+    :param monitor: Monitor which samples the resource usage of the command
+        and all its child processes while it is running.
+    :type monitor: Optional[ProcessMonitor]
+    :param timeout: Wall-clock timeout in seconds after which the command and
+        all its child processes are terminated.
+    :type timeout: Optional[float]
+    :param cancel_event: Event which terminates the command once it is set.
+    :type cancel_event: Optional[threading.Event]
+    :param logger: Logger the partial output is written to if the command is
+        terminated.
+    :type logger: Optional[BaseLogger]
 
     :Example:
 
@@ -64,39 +231,160 @@ def run_cmd(
     >>> run_cmd(None , ["-lh", "*"])
     TypeError("Cmd needs to be of type str.")
 
+    >>> run_cmd("sleep", ["10"], timeout=1)
+    TimeoutError("Command timed out after 1 seconds.")
+
 
     :raises TypeError: If the arguments have the wrong type.
+    :raises TimeoutError: If the command did not finish within the timeout.
+    :raises InterruptedError: If the command was cancelled.
     """
-    validate_cmd(cmd, options)
+    validate_cmd(cmd, options, env)
 
-    if not options:
-        full_cmd = cmd
-    else:
-        options_string = ""
-
-        for option in options:
-            if isinstance(option, str):
-                if Path(option).exists():
-                    option = f'"{option}"'
-
-                options_string += f" {option}"
-            else:
-                if Path(option[1]).exists():
-                    options_string += f' {option[0]} "{option[1]}"'
-                else:
-                    options_string += f" {option[0]} {option[1]}"
-
-        full_cmd = f"'{cmd}' {options_string}"
-
-    result = subprocess.run(
-        full_cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        shell=True,
-        text=True,
+    cancel_event = cancel_event if cancel_event else threading.Event()
+    deadline = time.monotonic() + timeout if timeout else None
+
+    if cancel_event.is_set():
+        raise InterruptedError("Command was cancelled.")
+
+    # The command runs in its own session, so the whole process tree (e.g. the
+    # JVM started by a launcher script) can be terminated at once.
+    try:
+        process = subprocess.Popen(
+            build_argv(cmd, options),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env={**os.environ, **env} if env else None,
+            start_new_session=True,
+        )
+    except OSError as e:
+        return 127, "", str(e)
+
+    with _running_lock:
+        _running[process] = cancel_event
+
+    if monitor:
+        monitor.start(process.pid)
+
+    stdout: list[str] = []
+    stderr: list[str] = []
+    readers = [
+        threading.Thread(target=_read, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=_read, args=(process.stderr, stderr), daemon=True),
+    ]
+    finished = threading.Event()
+    waiter = threading.Thread(
+        target=_wait_finished, args=(process, readers, finished), daemon=True
     )
 
-    stdout = result.stdout
-    stderr = result.stderr
+    for thread in [*readers, waiter]:
+        thread.start()
+
+    error: Exception | None = None
+
+    try:
+        while not finished.wait(POLL_INTERVAL):
+            if cancel_event.is_set():
+                error = InterruptedError("Command was cancelled.")
+            elif deadline and time.monotonic() > deadline:
+                error = TimeoutError(f"Command timed out after {timeout} seconds.")
+
+            if error:
+                terminate_process_tree(process)
+                finished.wait()
+                break
+
+        # The process exited but was not waited for yet, so the last sample
+        # still contains all of its cpu time and io.
+        if monitor:
+            monitor.stop()
+
+        process.wait()
+    except BaseException:
+        # E.g. KeyboardInterrupt, the tools should not outlive the pipeline.
+        terminate_process_tree(process)
+        raise
+    finally:
+        with _running_lock:
+            _running.pop(process, None)
+
+        if monitor:
+            monitor.stop()
+
+    if error:
+        if logger:
+            logger.error(f"{error} Partial output:")
+            logger.info("".join(stdout))
+            logger.error("".join(stderr))
+        raise error
+
+    return process.returncode, "".join(stdout), "".join(stderr)
+
+
+def run_cmds(
+    cmds: list[tuple[str, list[tuple[str, str] | str] | None]],
+    env: dict[str, str] | None = None,
+    monitor: ProcessMonitor | None = None,
+    timeout: float | None = None,
+    cancel_event: threading.Event | None = None,
+    logger: BaseLogger | None = None,
+) -> tuple[int, str, str]:
+    """
+    Runs multiple commands one after another, like chaining them with && in a
+    shell. Stops at the first command returning a status code other than 0.
+    The timeout applies to all commands together.
+
+    :param cmds: List of commands and their options, see run_cmd.
+    :type cmds: list[tuple[str, Optional[list[tuple[str, str] | str]]]]
+    :param env: Additional env variables for all commands.
+    :type env: Optional[dict[str, str]]
+    :param monitor: Monitor which samples the resource usage of all commands.
+    :type monitor: Optional[ProcessMonitor]
+    :param timeout: Wall-clock timeout in seconds for all commands together.
+    :type timeout: Optional[float]
+    :param cancel_event: Event which terminates the running command once it
+        is set, the remaining commands are not started.
+    :type cancel_event: Optional[threading.Event]
+    :param logger: Logger the partial output is written to if a command is
+        terminated.
+    :type logger: Optional[BaseLogger]
+
+    :return: Status code of the last command run and the output and error
+        output of all commands run.
+    :rtype: tuple[int, str, str]
+
+    :Example:
+
+    >>> run_cmds([("sirius", ["login"]), ("sirius", ["-i", "in.mgf"])])
+    0, "...", ""
+
+    :raises TypeError: If the arguments have the wrong type.
+    :raises TimeoutError: If the commands did not finish within the timeout.
+    :raises InterruptedError: If the commands were cancelled.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    status, stdout, stderr = 0, "", ""
+
+    for cmd, options in cmds:
+        remaining = deadline - time.monotonic() if deadline else None
+
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError(f"Commands timed out after {timeout} seconds.")
+
+        status, out, err = run_cmd(
+            cmd,
+            options,
+            env=env,
+            monitor=monitor,
+            timeout=remaining,
+            cancel_event=cancel_event,
+            logger=logger,
+        )
+        stdout += out
+        stderr += err
+
+        if status != 0:
+            break
 
-    return result.returncode, stdout, stderr
+    return status, stdout, stderr
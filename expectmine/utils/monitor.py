@@ -0,0 +1,295 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+PROC_PATH = Path("/proc")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# A JVM needs memory outside its heap. Rss of the process tree relative to the
+# configured heap above which the memory use is considered a blowup.
+JVM_RSS_FACTOR = 1.5
+# Counters which only grow over the lifetime of a process.
+CUMULATIVE_KEYS = ("cpu_ticks", "read_bytes", "write_bytes")
+
+
+def _stat_fields(pid: int) -> list[str] | None:
+    try:
+        with open(PROC_PATH / str(pid) / "stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # The command name is in parentheses and can contain spaces, the fields
+    # after it are the state (field 3) and following.
+    return stat[stat.rfind(")") + 2 :].split()
+
+
+def _io_counters(pid: int) -> tuple[int, int]:
+    counters = {}
+
+    try:
+        with open(PROC_PATH / str(pid) / "io", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                counters[key] = int(value)
+    except (OSError, ValueError):
+        return 0, 0
+
+    return counters.get("read_bytes", 0), counters.get("write_bytes", 0)
+
+
+def process_tree(pid: int) -> list[int]:
+    """
+    Returns the pid and the pids of all its descendants.
+
+    :param pid: Pid of the root process.
+    :type pid: int
+
+    :return: List of pids, starting with the root process.
+    :rtype: list[int]
+
+    :Example:
+
+    >>> process_tree(4242)
+    [4242, 4243, 4250]
+    """
+    children: dict[int, list[int]] = {}
+
+    for entry in os.scandir(PROC_PATH):
+        if not entry.name.isdigit():
+            continue
+
+        fields = _stat_fields(int(entry.name))
+        if fields:
+            children.setdefault(int(fields[1]), []).append(int(entry.name))
+
+    tree = [pid]
+    for parent in tree:
+        tree.extend(children.get(parent, []))
+
+    return tree
+
+
+def sample_process_tree(pid: int) -> dict[str, int]:
+    """
+    Samples the resource usage of a process and all its descendants from
+    /proc. The cpu time and io of children which already exited and were
+    waited for is included in the counters of their parents.
+
+    :param pid: Pid of the root process.
+    :type pid: int
+
+    :return: Rss in bytes, cpu time in clock ticks, number of threads and
+        bytes read and written.
+    :rtype: dict[str, int]
+
+    :Example:
+
+    >>> sample_process_tree(4242)
+    {"rss": 1073741824, "cpu_ticks": 1234, "threads": 42, "read_bytes": 4096,
+    "write_bytes": 0}
+    """
+    sample = {"rss": 0, "cpu_ticks": 0, "threads": 0, "read_bytes": 0, "write_bytes": 0}
+
+    for process in process_tree(pid):
+        fields = _stat_fields(process)
+        if not fields:
+            continue
+
+        # utime, stime, cutime, cstime, num_threads and rss (fields 14-17, 20
+        # and 24 of /proc/<pid>/stat).
+        sample["cpu_ticks"] += sum(int(field) for field in fields[11:15])
+        sample["threads"] += int(fields[17])
+        sample["rss"] += int(fields[21]) * PAGE_SIZE
+
+        read_bytes, write_bytes = _io_counters(process)
+        sample["read_bytes"] += read_bytes
+        sample["write_bytes"] += write_bytes
+
+    return sample
+
+
+class ProcessMonitor:
+    """
+    Samples the resource usage of a process tree in a background thread while
+    an external tool is running. Records peak rss, cpu seconds, peak thread
+    count and bytes read and written, together with a time series of the
+    samples. Only available on systems providing /proc, on other systems the
+    monitor records nothing.
+
+    :Example:
+
+    >>> monitor = ProcessMonitor()
+    >>> run_cmd("sirius", ["--version"], monitor=monitor)
+    >>> monitor.summary()
+    {"wall_seconds": 2.1, "cpu_seconds": 3.5, "peak_rss": 536870912, ...}
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        max_samples: int = 512,
+        rss_limit: int | None = None,
+        on_rss_limit: Callable[[int], None] | None = None,
+    ):
+        """
+        Creates the monitor, sampling starts once start is called.
+
+        :param interval: Seconds between two samples.
+        :type interval: float
+        :param max_samples: Maximal length of the time series. If it is
+            exceeded, every second sample is dropped and the interval doubled.
+        :type max_samples: int
+        :param rss_limit: Rss in bytes after which on_rss_limit is called.
+        :type rss_limit: int | None
+        :param on_rss_limit: Called once with the current rss from the
+            sampling thread when the rss of the tree exceeds rss_limit.
+        :type on_rss_limit: Callable[[int], None] | None
+        """
+        self.interval = interval
+        self.max_samples = max_samples
+        self.rss_limit = rss_limit
+        self.on_rss_limit = on_rss_limit
+        self.rss_limit_exceeded = False
+        self.series: list[list[float | int]] = []
+        self._peak: dict[str, int] = {}
+        self._last: dict[str, int] = {}
+        self._totals = dict.fromkeys(CUMULATIVE_KEYS, 0)
+        self._start = 0.0
+        self._end = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def available() -> bool:
+        return (PROC_PATH / "self" / "stat").is_file()
+
+    def start(self, pid: int):
+        """
+        Starts sampling the process tree of pid. A monitor can be started
+        again for the next process of a chain of commands, the samples are
+        then appended to the same time series and the cumulative counters of
+        the next process are added to those of the previous ones.
+
+        :param pid: Pid of the root process.
+        :type pid: int
+        """
+        if not self._start:
+            self._start = time.monotonic()
+        self._stop.clear()
+
+        for key in CUMULATIVE_KEYS:
+            self._totals[key] += self._last.get(key, 0)
+        self._last = {}
+
+        if not self.available():
+            return
+
+        self._thread = threading.Thread(target=self._sample, args=(pid,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling and takes a last sample. Called after the process
+        exited but before it is waited for, the last sample contains the total
+        cpu time and io of the process. Samples of a process which was already
+        waited for are dropped.
+        """
+        if self._stop.is_set():
+            return
+
+        self._end = time.monotonic()
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _record(self, pid: int):
+        # Once the process was waited for, its counters are gone.
+        if not _stat_fields(pid):
+            return
+
+        sample = sample_process_tree(pid)
+
+        for key in CUMULATIVE_KEYS:
+            self._last[key] = max(self._last.get(key, 0), sample[key])
+            sample[key] += self._totals[key]
+
+        for key, value in sample.items():
+            self._peak[key] = max(self._peak.get(key, 0), value)
+
+        self.series.append(
+            [
+                round(time.monotonic() - self._start, 3),
+                sample["rss"],
+                round(sample["cpu_ticks"] / CLOCK_TICKS, 2),
+                sample["threads"],
+                sample["read_bytes"],
+                sample["write_bytes"],
+            ]
+        )
+
+        if self.rss_limit and sample["rss"] > self.rss_limit:
+            if not self.rss_limit_exceeded and self.on_rss_limit:
+                self.on_rss_limit(sample["rss"])
+            self.rss_limit_exceeded = True
+
+        if len(self.series) > self.max_samples:
+            self.series = self.series[::2]
+            self.interval *= 2
+
+    def _sample(self, pid: int):
+        while True:
+            self._record(pid)
+
+            if self._stop.wait(self.interval):
+                break
+
+        self._record(pid)
+
+    def summary(self) -> dict[str, object]:
+        """
+        Returns the summary of the monitored invocation. Cpu time and io are
+        totals over all monitored processes, rss and threads are the peak of
+        any single process.
+
+        :return: Wall time, cpu seconds, peak rss in bytes, peak thread count,
+            bytes read and written and the number of samples.
+        :rtype: dict[str, object]
+        """
+        return {
+            "wall_seconds": round(self._end - self._start, 3),
+            "cpu_seconds": round(self._peak.get("cpu_ticks", 0) / CLOCK_TICKS, 2),
+            "peak_rss": self._peak.get("rss", 0),
+            "peak_threads": self._peak.get("threads", 0),
+            "read_bytes": self._peak.get("read_bytes", 0),
+            "write_bytes": self._peak.get("write_bytes", 0),
+            "samples": len(self.series),
+            "rss_limit_exceeded": self.rss_limit_exceeded,
+        }
+
+    def report(self) -> dict[str, object]:
+        """
+        Returns the summary together with the time series, as stored in the
+        metadata of a step. Columns of the series are seconds since start,
+        rss, cpu seconds, threads, bytes read and bytes written. Cpu seconds
+        and bytes are running totals over all monitored processes.
+
+        :return: Dict with the keys summary, columns and series.
+        :rtype: dict[str, object]
+        """
+        return {
+            "summary": self.summary(),
+            "columns": [
+                "seconds",
+                "rss",
+                "cpu_seconds",
+                "threads",
+                "read_bytes",
+                "write_bytes",
+            ],
+            "series": self.series,
+        }
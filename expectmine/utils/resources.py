@@ -0,0 +1,208 @@
+import math
+import os
+from pathlib import Path
+
+from expectmine.storage.base_storage import BaseStore
+
+CGROUP_PATH = Path("/sys/fs/cgroup")
+
+
+def _read_first_line(path: Path) -> str | None:
+    try:
+        with open(path, "r") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_cores() -> int | None:
+    # cgroup v2 exposes "<quota> <period>" or "max <period>".
+    cpu_max = _read_first_line(CGROUP_PATH / "cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return max(1, math.ceil(int(quota) / int(period)))
+        return None
+
+    quota = _read_first_line(CGROUP_PATH / "cpu" / "cpu.cfs_quota_us")
+    period = _read_first_line(CGROUP_PATH / "cpu" / "cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return max(1, math.ceil(int(quota) / int(period)))
+
+    return None
+
+
+def _cgroup_memory() -> int | None:
+    memory_max = _read_first_line(CGROUP_PATH / "memory.max")
+    if memory_max:
+        return None if memory_max == "max" else int(memory_max)
+
+    limit = _read_first_line(CGROUP_PATH / "memory" / "memory.limit_in_bytes")
+    # cgroup v1 reports a huge number if no limit is set.
+    if limit and int(limit) < 2**60:
+        return int(limit)
+
+    return None
+
+
+def available_cores() -> int:
+    """
+    Returns the number of cores this process may use. Takes the cpu affinity
+    of the process and cgroup cpu quotas (v1 and v2) into account.
+
+    :return: Number of usable cores, at least 1.
+    :rtype: int
+
+    :Example:
+
+    >>> available_cores()
+    8
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+
+    cgroup_cores = _cgroup_cores()
+    if cgroup_cores:
+        cores = min(cores, cgroup_cores)
+
+    return max(1, cores)
+
+
+def available_memory() -> int:
+    """
+    Returns the memory in bytes this process may use. Takes the physical
+    memory of the host and cgroup memory limits (v1 and v2) into account.
+
+    :return: Usable memory in bytes.
+    :rtype: int
+
+    :Example:
+
+    >>> available_memory()
+    17179869184
+    """
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        memory = 4 * 1024**3
+
+    cgroup_memory = _cgroup_memory()
+    if cgroup_memory:
+        memory = min(memory, cgroup_memory)
+
+    return memory
+
+
+def concurrent_jobs() -> int:
+    """
+    Returns the number of tool invocations expected to run at the same time on
+    this host. Configured through the env variable EXPECTMINE_CONCURRENT_JOBS,
+    defaults to 1.
+
+    :return: Number of concurrent jobs, at least 1.
+    :rtype: int
+
+    :raises ValueError: If the env variable is not a positive integer.
+    """
+    jobs = os.environ.get("EXPECTMINE_CONCURRENT_JOBS")
+
+    if not jobs:
+        return 1
+
+    if not jobs.isdigit() or int(jobs) < 1:
+        raise ValueError("EXPECTMINE_CONCURRENT_JOBS needs to be a positive integer.")
+
+    return int(jobs)
+
+
+def plan_resources(
+    jobs: int | None = None, memory_fraction: float = 0.8
+) -> tuple[int, int]:
+    """
+    Divides the available cores and memory among the concurrently running
+    tool invocations. A part of the memory is held back for the operating
+    system and the JVM overhead outside the heap.
+
+    :param jobs: Number of concurrent invocations, defaults to concurrent_jobs().
+    :type jobs: int | None
+    :param memory_fraction: Fraction of the available memory to hand out.
+    :type memory_fraction: float
+
+    :return: Tuple of cores and memory in MiB per invocation.
+    :rtype: tuple[int, int]
+
+    :Example:
+
+    >>> plan_resources(2)
+    4, 6553
+
+    >>> plan_resources(0)
+    ValueError("Jobs need to be at least 1.")
+
+    :raises ValueError: If jobs is smaller than 1 or the memory fraction is not
+        between 0 and 1.
+    """
+    jobs = jobs if jobs is not None else concurrent_jobs()
+
+    if jobs < 1:
+        raise ValueError("Jobs need to be at least 1.")
+
+    if not 0 < memory_fraction <= 1:
+        raise ValueError("Memory fraction needs to be between 0 and 1.")
+
+    cores = max(1, available_cores() // jobs)
+    memory = max(256, int(available_memory() * memory_fraction / jobs / 1024**2))
+
+    return cores, memory
+
+
+def jvm_environment(memory: int) -> dict[str, str]:
+    """
+    Returns env variables limiting the heap of every JVM started with them.
+    JAVA_TOOL_OPTIONS is picked up by every HotSpot JVM, independent of the
+    launcher script of the tool. Existing options are kept.
+
+    :param memory: Maximal heap size in MiB.
+    :type memory: int
+
+    :return: Env variables to pass to run_cmd.
+    :rtype: dict[str, str]
+
+    :Example:
+
+    >>> jvm_environment(4096)
+    {"JAVA_TOOL_OPTIONS": "-Xmx4096m"}
+    """
+    options = os.environ.get("JAVA_TOOL_OPTIONS", "")
+
+    return {"JAVA_TOOL_OPTIONS": f"{options} -Xmx{int(memory)}m".strip()}
+
+
+def resolve_resources(volatile_store: BaseStore) -> tuple[int, int]:
+    """
+    Returns the cores and memory a tool invocation of a step should use. Values
+    set by the user in the volatile store ("cores" and "memory") take precedence
+    over the automatically planned resources.
+
+    :param volatile_store: Volatile store of the step.
+    :type volatile_store: BaseStore
+
+    :return: Tuple of cores and memory in MiB.
+    :rtype: tuple[int, int]
+
+    :Example:
+
+    >>> resolve_resources(Store(...))
+    8, 13107
+    """
+    cores = volatile_store.get("cores", int)
+    memory = volatile_store.get("memory", int)
+
+    if cores and memory:
+        return cores, memory
+
+    planned_cores, planned_memory = plan_resources()
+
+    return cores if cores else planned_cores, memory if memory else planned_memory
@@ -0,0 +1,401 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+from expectmine.logger.base_logger import BaseLogger
+from expectmine.utils.resources import available_cores, available_memory
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+# Without fcntl (Windows) slots are only coordinated within this process.
+_process_lock = threading.Lock()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def _default_directory() -> Path:
+    # The temp directory is shared by all users of the host, every user gets
+    # a directory only accessible to them.
+    user = os.getuid() if hasattr(os, "getuid") else os.getlogin()
+    directory = Path(tempfile.gettempdir()) / f"expectmine_scheduler_{user}"
+
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    if not hasattr(os, "getuid"):
+        return directory
+
+    # Another user could have created the directory or a symlink first.
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(
+            f"Scheduler directory {directory} is not owned by the current user."
+        )
+
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+
+    return directory
+
+
+def parse_capacities(value: str) -> dict[str, int]:
+    """
+    Parses capacities in the form "cpu=16,memory=65536,sirius-license=1".
+
+    :param value: Comma separated list of name=capacity pairs.
+    :type value: str
+
+    :return: Capacity of every named resource.
+    :rtype: dict[str, int]
+
+    :Example:
+
+    >>> parse_capacities("cpu=16,sirius-license=1")
+    {"cpu": 16, "sirius-license": 1}
+
+    >>> parse_capacities("cpu")
+    ValueError("Capacity cpu is not of the form name=capacity.")
+
+    :raises ValueError: If a pair is malformed or the capacity is not a
+        positive integer.
+    """
+    capacities = {}
+
+    for pair in value.split(","):
+        if not pair.strip():
+            continue
+
+        name, _, capacity = pair.partition("=")
+
+        if not capacity.strip().isdigit() or int(capacity) < 1:
+            raise ValueError(f"Capacity {pair} is not of the form name=capacity.")
+
+        capacities[name.strip()] = int(capacity)
+
+    return capacities
+
+
+def default_capacities() -> dict[str, int]:
+    """
+    Returns the capacities of the host. Cpu is the number of available cores,
+    memory the available memory in MiB. Capacities set in the env variable
+    EXPECTMINE_SLOTS (e.g. "memory=32768,sirius-license=2") take precedence
+    and can add further named resources. Resources without capacity are not
+    limited.
+
+    :return: Capacity of every named resource.
+    :rtype: dict[str, int]
+
+    :Example:
+
+    >>> default_capacities()
+    {"cpu": 16, "memory": 65536}
+    """
+    return {
+        "cpu": available_cores(),
+        "memory": available_memory() // 1024**2,
+        **parse_capacities(os.environ.get("EXPECTMINE_SLOTS", "")),
+    }
+
+
+class JobScheduler:
+    """
+    Allocates named resource slots (e.g. cpu, memory in MiB or a license) to
+    external tool invocations, so concurrently running pipelines do not
+    oversubscribe the host. The state is kept in a json file guarded by a lock
+    file, so the scheduler works across all processes on a host using the same
+    directory.
+
+    Waiting requests are served strictly in the order of their priority
+    (higher first) and, within the same priority, in the order they arrived.
+    A request is only granted once all requests before it were granted, so
+    large requests can not be starved by a stream of small ones.
+
+    :Example:
+
+    >>> scheduler = JobScheduler()
+    >>> with scheduler.slots({"cpu": 4, "memory": 8192}):
+    ...     run_cmd("sirius", [...])
+    """
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        capacities: dict[str, int] | None = None,
+        poll_interval: float = 0.5,
+    ):
+        """
+        Creates the scheduler. Schedulers sharing the directory share their
+        slots, they should use the same capacities.
+
+        :param directory: Directory of the state and lock file, defaults to
+            the env variable EXPECTMINE_SCHEDULER_DIRECTORY or a directory of
+            the current user in the temp directory of the system.
+        :type directory: Path | None
+        :param capacities: Capacity of every named resource, defaults to
+            default_capacities().
+        :type capacities: dict[str, int] | None
+        :param poll_interval: Seconds between two checks of waiting requests.
+        :type poll_interval: float
+        """
+        if directory is None and os.environ.get("EXPECTMINE_SCHEDULER_DIRECTORY"):
+            directory = Path(os.environ["EXPECTMINE_SCHEDULER_DIRECTORY"])
+
+        if directory is None:
+            directory = _default_directory()
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.capacities = capacities if capacities else default_capacities()
+        self.poll_interval = poll_interval
+        self._lock_path = directory / "slots.lock"
+        self._state_path = directory / "slots.json"
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[dict]:
+        with _process_lock, open(self._lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            try:
+                with open(self._state_path, "r") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {"holders": {}, "queue": []}
+
+            # Slots of crashed processes are freed.
+            state["holders"] = {
+                slot: holder
+                for slot, holder in state["holders"].items()
+                if _pid_alive(holder["pid"])
+            }
+            state["queue"] = [
+                request for request in state["queue"] if _pid_alive(request["pid"])
+            ]
+
+            yield state
+
+            temp_path = self._state_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self._state_path)
+
+    def _clamp(self, resources: dict[str, int]) -> dict[str, int]:
+        # Requests larger than the capacity could never be granted.
+        return {
+            name: min(amount, self.capacities.get(name, amount))
+            for name, amount in resources.items()
+        }
+
+    def _fits(self, state: dict, resources: dict[str, int]) -> bool:
+        for name, amount in resources.items():
+            if name not in self.capacities:
+                continue
+
+            used = sum(
+                holder["resources"].get(name, 0) for holder in state["holders"].values()
+            )
+
+            if used + amount > self.capacities[name]:
+                return False
+
+        return True
+
+    def _try_grant(self, slot: str) -> bool:
+        with self._locked_state() as state:
+            queue = sorted(
+                state["queue"], key=lambda r: (-r["priority"], r["time"], r["slot"])
+            )
+
+            if not queue or queue[0]["slot"] != slot:
+                return False
+
+            request = queue[0]
+
+            if not self._fits(state, request["resources"]):
+                return False
+
+            state["queue"].remove(request)
+            state["holders"][slot] = request
+
+            return True
+
+    def acquire(
+        self,
+        resources: dict[str, int],
+        priority: int | None = None,
+        timeout: float | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> str:
+        """
+        Waits until the resources are free and allocates them.
+
+        :param resources: Amount of every named resource needed.
+        :type resources: dict[str, int]
+        :param priority: Priority of the request, higher is served first.
+            Defaults to the env variable EXPECTMINE_PRIORITY or 0.
+        :type priority: int | None
+        :param timeout: Maximal seconds to wait.
+        :type timeout: float | None
+        :param cancel_event: Event which stops waiting once it is set.
+        :type cancel_event: threading.Event | None
+
+        :return: Id of the allocated slot, needed to release it.
+        :rtype: str
+
+        :Example:
+
+        >>> acquire({"cpu": 4, "sirius-license": 1}, priority=10)
+        "3f2b..."
+
+        :raises TimeoutError: If the resources were not free within timeout.
+        :raises InterruptedError: If waiting was cancelled.
+        """
+        if priority is None:
+            priority = int(os.environ.get("EXPECTMINE_PRIORITY") or 0)
+
+        slot = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout if timeout else None
+
+        with self._locked_state() as state:
+            state["queue"].append(
+                {
+                    "slot": slot,
+                    "pid": os.getpid(),
+                    "priority": priority,
+                    "time": time.time(),
+                    "resources": self._clamp(resources),
+                }
+            )
+
+        try:
+            while not self._try_grant(slot):
+                if cancel_event and cancel_event.is_set():
+                    raise InterruptedError("Waiting for resources was cancelled.")
+
+                if deadline and time.monotonic() > deadline:
+                    raise TimeoutError(f"Resources {resources} were not free in time.")
+
+                time.sleep(self.poll_interval)
+        except BaseException:
+            self.release(slot)
+            raise
+
+        return slot
+
+    def release(self, slot: str):
+        """
+        Releases a slot, or removes the request from the queue if it was not
+        granted yet.
+
+        :param slot: Id returned by acquire.
+        :type slot: str
+        """
+        with self._locked_state() as state:
+            state["holders"].pop(slot, None)
+            state["queue"] = [r for r in state["queue"] if r["slot"] != slot]
+
+    @contextmanager
+    def slots(
+        self,
+        resources: dict[str, int],
+        priority: int | None = None,
+        timeout: float | None = None,
+        cancel_event: threading.Event | None = None,
+        logger: BaseLogger | None = None,
+    ) -> Iterator[str]:
+        """
+        Context manager allocating the resources for the duration of the
+        block, see acquire.
+
+        :param logger: Logger informed if the request has to wait.
+        :type logger: BaseLogger | None
+
+        :Example:
+
+        >>> with scheduler.slots({"cpu": 4}, logger=logger):
+        ...     run_cmd(...)
+        """
+        if logger and not self.available(resources):
+            logger.info(f"Waiting for free resources {resources}.")
+
+        slot = self.acquire(resources, priority, timeout, cancel_event)
+
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    def available(self, resources: dict[str, int]) -> bool:
+        """
+        Returns whether the resources are currently free and nobody is
+        waiting.
+
+        :param resources: Amount of every named resource needed.
+        :type resources: dict[str, int]
+
+        :return: True if a request would be granted immediately.
+        :rtype: bool
+        """
+        with self._locked_state() as state:
+            return not state["queue"] and self._fits(state, self._clamp(resources))
+
+    def status(self) -> dict[str, object]:
+        """
+        Returns the current usage of every resource and the number of holders
+        and waiting requests.
+
+        :return: Usage, capacities, holders and waiting requests.
+        :rtype: dict[str, object]
+
+        :Example:
+
+        >>> status()
+        {"usage": {"cpu": 8}, "capacities": {"cpu": 16}, "holders": 2,
+        "waiting": 0}
+        """
+        with self._locked_state() as state:
+            usage: dict[str, int] = {}
+
+            for holder in state["holders"].values():
+                for name, amount in holder["resources"].items():
+                    usage[name] = usage.get(name, 0) + amount
+
+            return {
+                "usage": usage,
+                "capacities": self.capacities,
+                "holders": len(state["holders"]),
+                "waiting": len(state["queue"]),
+            }
+
+
+@lru_cache(maxsize=None)
+def default_scheduler() -> JobScheduler:
+    """
+    Returns the scheduler shared by all steps of this process. It coordinates
+    with all other processes using the same scheduler directory.
+
+    :return: The shared scheduler.
+    :rtype: JobScheduler
+    """
+    return JobScheduler()
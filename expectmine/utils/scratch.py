@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+def scratch_root(default: Path) -> Path:
+    """
+    Returns the directory scratch data of external tools is placed in. The
+    directory is configured through the env variable
+    EXPECTMINE_SCRATCH_DIRECTORY and should point to a fast local disk (e.g.
+    local NVMe or a tmpfs like /dev/shm). Defaults to the given directory.
+
+    :param default: Directory used if no scratch directory is configured.
+    :type default: Path
+
+    :return: Directory to create scratch directories in.
+    :rtype: Path
+
+    :Example:
+
+    >>> scratch_root(Path("output"))
+    Path("/scratch")
+
+    :raises ValueError: If the configured scratch directory does not exist.
+    """
+    root = os.environ.get("EXPECTMINE_SCRATCH_DIRECTORY")
+
+    if not root:
+        return default
+
+    if not os.path.isdir(root):
+        raise ValueError(f"EXPECTMINE_SCRATCH_DIRECTORY {root} is not a directory.")
+
+    return Path(root)
+
+
+def directory_size(path: Path) -> int:
+    """
+    Returns the size of all files in a directory and its subdirectories.
+
+    :param path: Directory to measure.
+    :type path: Path
+
+    :return: Size in bytes, 0 if the directory does not exist.
+    :rtype: int
+
+    :Example:
+
+    >>> directory_size(Path("output/temp"))
+    1073741824
+    """
+    size = 0
+
+    for directory, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(directory, file)).st_size
+            except OSError:
+                pass
+
+    return size
+
+
+class ScratchDirectory:
+    """
+    Scratch directory of a single tool invocation. On enter, a unique directory
+    is created in the root after checking that enough space is free. On exit,
+    the size of the directory is recorded and the directory is removed if the
+    invocation succeeded. Scratch data of failed invocations is kept for
+    debugging.
+
+    :Example:
+
+    >>> with ScratchDirectory(Path("/scratch"), "mzmine3", 2**30) as scratch:
+    ...     status, _, _ = run_cmd("mzmine", [("-temp", str(scratch.path))])
+    ...     scratch.failed = status != 0
+    >>> scratch.size
+    536870912
+    """
+
+    def __init__(self, root: Path, name: str, required_space: int = 0):
+        """
+        Creates the scratch directory manager, the directory itself is only
+        created on enter.
+
+        :param root: Directory the scratch directory is created in.
+        :type root: Path
+        :param name: Name used as prefix of the scratch directory.
+        :type name: str
+        :param required_space: Free bytes needed in the root before starting.
+        :type required_space: int
+        """
+        self.root = root
+        self.name = name
+        self.required_space = required_space
+        self.path: Path | None = None
+        self.free_space: int | None = None
+        self.size = 0
+        self.failed = False
+
+    def __enter__(self) -> "ScratchDirectory":
+        """
+        :raises OSError: If less than required_space bytes are free in root.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        self.free_space = shutil.disk_usage(self.root).free
+
+        if self.free_space < self.required_space:
+            raise OSError(
+                f"Only {self.free_space // 1024**2} MiB free in scratch directory "
+                f"{self.root}, {self.required_space // 1024**2} MiB required."
+            )
+
+        self.path = Path(
+            tempfile.mkdtemp(prefix=f"{self.name}_", dir=self.root.absolute())
+        )
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.path is None:
+            return
+
+        self.size = directory_size(self.path)
+        self.failed = self.failed or exc_type is not None
+
+        if not self.failed:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def usage(self) -> dict[str, object]:
+        """
+        Returns the accounting information of the scratch directory.
+
+        :return: Path, size, free space before the start and whether the
+            directory was kept.
+        :rtype: dict[str, object]
+
+        :Example:
+
+        >>> scratch.usage()
+        {"path": "/scratch/mzmine3_x1y2", "size": 536870912,
+        "free_space": 107374182400, "kept": False}
+        """
+        return {
+            "path": str(self.path) if self.path else None,
+            "size": self.size,
+            "free_space": self.free_space,
+            "kept": self.failed,
+        }
@@ -0,0 +1,84 @@
+import os
+
+from expectmine.storage.base_storage import BaseStore
+from expectmine.utils.cmd import run_cmd
+
+
+def executable_fingerprint(executable: str) -> list[str | int] | None:
+    """
+    Returns a fingerprint of an executable consisting of its resolved path,
+    size and modification time. Returns None if the executable does not exist.
+
+    :param executable: Path to the executable.
+    :type executable: str
+
+    :return: The fingerprint or None if the executable can not be found.
+    :rtype: list[str | int] | None
+
+    :Example:
+
+    >>> executable_fingerprint("/usr/bin/sirius")
+    ["/opt/sirius/bin/sirius", 10232, 1697721216000000000]
+
+    >>> executable_fingerprint("/unknown")
+    None
+    """
+    try:
+        path = os.path.realpath(executable)
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def probe_version(
+    persistent_store: BaseStore, executable: str, options: list[str] | None = None
+) -> tuple[int, str, str]:
+    """
+    Runs the executable with the version options and returns the result of
+    run_cmd. Successful results are cached in the persistent store together
+    with the fingerprint of the executable, the tool is only probed again once
+    the executable changes.
+
+    :param persistent_store: Persistent store of the step.
+    :type persistent_store: BaseStore
+    :param executable: Path to the executable.
+    :type executable: str
+    :param options: Options used to query the version, defaults to ["--version"].
+    :type options: list[str] | None
+
+    :return: Status code, output and error output of the version query.
+    :rtype: tuple[int, str, str]
+
+    :Example:
+
+    >>> probe_version(Store(...), "/usr/bin/sirius")
+    0, "SIRIUS 5.8.3 ...", ""
+    """
+    options = options if options else ["--version"]
+    fingerprint = executable_fingerprint(executable)
+    cached = persistent_store.get("version_probe", dict)
+
+    if (
+        fingerprint
+        and cached
+        and cached.get("fingerprint") == fingerprint
+        and cached.get("options") == options
+    ):
+        status, out, err = cached["result"]
+        return status, out, err
+
+    status, out, err = run_cmd(executable, list(options))
+
+    if fingerprint and status == 0:
+        persistent_store.put(
+            "version_probe",
+            {
+                "fingerprint": fingerprint,
+                "options": options,
+                "result": [status, out, err],
+            },
+        )
+
+    return status, out, err
@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import pytest
+
+from expectmine.storage.blob_stores.filesystem_blob_store import FilesystemBlobStore
+from expectmine.storage.blob_stores.sqlite3_blob_store import Sqlite3BlobStore
+from expectmine.storage.stores.sqlite3_store import Sqlite3Store
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+BLOB_STORES = [Sqlite3BlobStore, FilesystemBlobStore]
+
+
+@pytest.mark.parametrize("blob_store_class", BLOB_STORES)
+def test_blob_store_references(blob_store_class):
+    @with_directory
+    def test():
+        blob_store = blob_store_class(PERSISTENT_PATH)
+        content = b"batchfile" * 1000
+
+        content_hash = blob_store.put(content)
+
+        assert blob_store.put(content) == content_hash
+        assert blob_store.references(content_hash) == 2
+        assert blob_store.usage() == {"blobs": 1, "size": 9000, "references": 2}
+        assert blob_store.get(content_hash) == content
+
+        assert blob_store.copy_to(content_hash, PERSISTENT_PATH / "copy")
+        assert (PERSISTENT_PATH / "copy").read_bytes() == content
+
+        blob_store.release(content_hash)
+        assert blob_store.get(content_hash) == content
+
+        blob_store.release(content_hash)
+        assert blob_store.get(content_hash) is None
+        assert blob_store.usage()["blobs"] == 0
+
+    test()
+
+
+@with_directory
+def test_filesystem_blob_store_collect_garbage():
+    blob_store = FilesystemBlobStore(PERSISTENT_PATH)
+    content_hash = blob_store.put(b"kept")
+
+    # Files left behind by an interrupted write.
+    orphan = blob_store.path("0" * 64)
+    orphan.parent.mkdir(parents=True, exist_ok=True)
+    orphan.write_bytes(b"orphan")
+
+    assert blob_store.collect_garbage() == 6
+    assert not orphan.exists()
+    assert blob_store.get(content_hash) == b"kept"
+
+
+@pytest.mark.parametrize("blob_store_class", BLOB_STORES)
+def test_sqlite3_store_deduplicates(blob_store_class):
+    @with_directory
+    def test():
+        blob_store = blob_store_class(PERSISTENT_PATH)
+        first = Sqlite3Store(
+            "First", PERSISTENT_PATH, WORKING_DIRECTORY, blob_store=blob_store
+        )
+        second = Sqlite3Store(
+            "Second", PERSISTENT_PATH, WORKING_DIRECTORY, blob_store=blob_store
+        )
+        source = PERSISTENT_PATH / "library.mgf"
+        source.write_bytes(b"BEGIN IONS\n" * 1000)
+        answers = {"compounds": list(range(2000))}
+
+        for store in [first, second]:
+            store.put("library", source)
+            store.put("answers", answers)
+            store.put("small", {"a": 1})
+
+        assert blob_store.usage()["blobs"] == 2
+        assert blob_store.usage()["references"] == 4
+        assert second.get("answers", dict) == answers
+        assert second.get("small", dict) == {"a": 1}
+
+        path = second.get("library", Path)
+        assert path is not None
+        assert path.read_bytes() == source.read_bytes()
+
+        # Overwritten and deleted values release their references.
+        first.put("answers", {"a": 2})
+        first.delete("library")
+        second.delete_many(["library", "answers"])
+
+        assert blob_store.usage() == {"blobs": 0, "size": 0, "references": 0}
+        assert first.get("answers", dict) == {"a": 2}
+
+    test()
+
+
+@with_directory
+def test_sqlite3_store_missing_blob():
+    blob_store = FilesystemBlobStore(PERSISTENT_PATH)
+    store = Sqlite3Store(
+        "Step", PERSISTENT_PATH, WORKING_DIRECTORY, blob_store=blob_store
+    )
+    store.put("answers", {"compounds": list(range(2000))})
+    (content_hash,) = store.conn.execute("SELECT hash FROM kv_table;").fetchone()
+
+    blob_store.path(content_hash).unlink()
+
+    with pytest.raises(ValueError, match=f"{content_hash} of answers"):
+        store.get("answers", dict)
+
+
+@with_directory
+def test_sqlite3_blob_store_compression():
+    blob_store = Sqlite3BlobStore(PERSISTENT_PATH, compression="zlib")
+    content = b"<batch><step>mzmine</step></batch>" * 1000
+    source = PERSISTENT_PATH / "batch.xml"
+    source.write_bytes(content * 2)
+
+    content_hash = blob_store.put(content)
+    file_hash = blob_store.put(source)
+
+    assert blob_store.get(content_hash) == content
+    assert blob_store.copy_to(file_hash, PERSISTENT_PATH / "copy")
+    assert (PERSISTENT_PATH / "copy").read_bytes() == content * 2
+    assert blob_store.usage()["size"] == len(content) * 3
+    assert (
+        blob_store.conn.execute(
+            "SELECT sum(length(content)) FROM blob_table;"
+        ).fetchone()[0]
+        < len(content) // 10
+    )
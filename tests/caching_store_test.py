@@ -0,0 +1,136 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from expectmine.storage.adapters.caching_adapter import CachingStoreAdapter
+from expectmine.storage.adapters.sqlite3_adapter import Sqlite3StoreAdapter
+from expectmine.storage.stores.caching_store import LruCache
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+
+@with_directory
+def test_caching_store_read_through():
+    adapter = CachingStoreAdapter(
+        Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+    )
+    store = adapter.get_instance("SiriusFingerprint")
+
+    store.put("sirius_path", "/opt/sirius/bin/sirius")
+
+    for _ in range(3):
+        assert store.get("sirius_path", str) == "/opt/sirius/bin/sirius"
+
+    assert store.get("unknown", str) is None
+    assert store.get("unknown", str) is None
+    assert not store.exists("unknown")
+    assert adapter.stats()["hits"] == 4
+    assert adapter.stats()["misses"] == 2
+
+    # Writes invalidate the cached value, also for other instances.
+    adapter.get_instance("SiriusFingerprint").put("sirius_path", "sirius")
+
+    assert store.get("sirius_path", str) == "sirius"
+
+    store.put_many({"cores": 8, "memory": 16})
+
+    assert store.get_many(["cores", "memory", "sirius_path"], int | str) == {
+        "cores": 8,
+        "memory": 16,
+        "sirius_path": "sirius",
+    }
+
+    store.delete("cores")
+
+    assert store.get("cores", int) is None
+
+
+@with_directory
+def test_caching_store_files_not_cached():
+    adapter = CachingStoreAdapter(
+        Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+    )
+    store = adapter.get_instance("Step")
+    source = PERSISTENT_PATH / "batch.xml"
+    source.write_text("<batch/>")
+
+    store.put("batchfile", source)
+
+    assert store.get("batchfile", Path).read_text() == "<batch/>"
+    assert adapter.stats()["entries"] == 0
+
+
+def test_lru_cache_evicts_by_size():
+    cache = LruCache(max_size=100, max_entry_size=60)
+
+    cache.put("a", "a", 40)
+    cache.put("b", "b", 40)
+    cache.get("a")
+    cache.put("c", "c", 40)
+    cache.put("d", "d", 80)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("d") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 80
+
+
+@with_directory
+def test_caching_store_read_races_put():
+    adapter = CachingStoreAdapter(
+        Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+    )
+    store = adapter.get_instance("Step")
+    writer = adapter.get_instance("Step")
+    store.put("cores", 4)
+    get = store.store.get_many_with_expiry  # type: ignore
+
+    # Another thread puts a new value after the old one was read, but
+    # before it is cached.
+    def get_then_put(keys, returning):
+        values = get(keys, returning)
+        writer.put("cores", 8)
+        return values
+
+    store.store.get_many_with_expiry = get_then_put  # type: ignore
+
+    assert store.get("cores", int) == 4
+
+    store.store.get_many_with_expiry = get  # type: ignore
+
+    assert store.get("cores", int) == 8
+    assert adapter.stats()["entries"] == 1
+
+
+@with_directory
+def test_caching_store_expires_values():
+    adapter = CachingStoreAdapter(
+        Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY, ttl=60)
+    )
+    store = adapter.get_instance("Step")
+    store.put_many({"cores": 8, "memory": 16})
+
+    assert store.get_many(["cores", "memory"], int) == {"cores": 8, "memory": 16}
+    assert store.exists("cores")
+    assert adapter.stats()["entries"] == 2
+
+    now = time.time()
+
+    # The cached values expire together with the stored ones.
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(time, "time", lambda: now + 120)
+
+        assert not store.exists("cores")
+        assert store.get("memory", int) is None
+
+
+def test_lru_cache_expires_values():
+    cache = LruCache(max_size=100)
+
+    cache.put("a", "a", 10, expires_at=time.time() - 1)
+    cache.put("b", "b", 10, expires_at=time.time() + 60)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import pytest
+from expectmine.logger.base_logger import LogLevel
+from expectmine.logger.loggers.cli_logger import CliLogger
+from expectmine.utils.cmd import build_argv, cancel_running_cmds, run_cmd, run_cmds
+from .utils import PERSISTENT_PATH, with_directory
+
+
+def test_run_cmd():
+    status, out, err = run_cmd("echo", ["hello"])
+
+    assert status == 0
+    assert out == "hello\n"
+    assert err == ""
+
+
+def process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+
+    # Zombies are not yet reaped by init but are not running anymore.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@with_directory
+def test_run_cmd_timeout_kills_process_group():
+    os.makedirs(PERSISTENT_PATH, exist_ok=True)
+    script = PERSISTENT_PATH / "script.sh"
+    script.write_text(
+        f"echo started\nsleep 30 &\necho $! > {PERSISTENT_PATH / 'pid'}\nwait\n"
+    )
+    logger = CliLogger(LogLevel.ERROR, write_logfile=False, path=None)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        run_cmd("sh", [str(script)], timeout=0.5, logger=logger)
+
+    assert time.monotonic() - start < 10
+
+    # The signal is delivered asynchronously, the child may need a moment.
+    pid = int((PERSISTENT_PATH / "pid").read_text())
+    deadline = time.monotonic() + 5
+    while process_exists(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert not process_exists(pid)
+
+
+def test_run_cmd_cancel_event():
+    event = threading.Event()
+    threading.Timer(0.3, event.set).start()
+
+    with pytest.raises(InterruptedError):
+        run_cmd("sleep", ["30"], cancel_event=event)
+
+
+def test_cancel_running_cmds():
+    threading.Timer(0.3, cancel_running_cmds).start()
+
+    with pytest.raises(InterruptedError):
+        run_cmd("sleep", ["30"])
+
+
+@with_directory
+def test_run_cmd_argument_with_spaces():
+    os.makedirs(PERSISTENT_PATH / "with space", exist_ok=True)
+    path = PERSISTENT_PATH / "with space" / "it's.txt"
+    path.write_text("content")
+
+    status, out, _ = run_cmd("cat", [str(path)])
+
+    assert status == 0
+    assert out == "content"
+
+
+def test_run_cmd_missing_executable():
+    status, _, err = run_cmd("/does/not/exist", ["--version"])
+
+    assert status == 127
+    assert err
+
+
+def test_build_argv():
+    assert build_argv("ls", ["-lh", ("--color", "never")]) == [
+        "ls",
+        "-lh",
+        "--color",
+        "never",
+    ]
+
+
+def test_run_cmds_stops_on_failure():
+    status, out, _ = run_cmds(
+        [("echo", ["first"]), ("false", None), ("echo", ["second"])]
+    )
+
+    assert status == 1
+    assert out == "first\n"
@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from expectmine.io.io.dict_io import DictIo
+from expectmine.steps.steps.shrink_mgf import ShrinkMgf
+from expectmine.storage.blob_stores.sqlite3_blob_store import Sqlite3BlobStore
+from expectmine.storage.pipeline_stores.sqlite3_pipeline_store import (
+    Sqlite3PipelineStore,
+)
+from expectmine.storage.sqlite3_compaction import compact
+from expectmine.storage.stores.sqlite3_store import Sqlite3Store
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+
+def expire(store: Sqlite3Store, key: str):
+    store.conn.execute(
+        "UPDATE kv_table SET expires_at = ? WHERE stepid = ? AND key = ?;",
+        (time.time() - 1, store.step_id, key),
+    )
+
+
+@with_directory
+def test_sqlite3_store_ttl():
+    store = Sqlite3Store(
+        "Sirius", PERSISTENT_PATH, WORKING_DIRECTORY, ttl={"Sirius": 60}
+    )
+    other = Sqlite3Store("MZmine3", PERSISTENT_PATH, WORKING_DIRECTORY, ttl={})
+
+    store.put_many({"cores": 8, "memory": 16})
+    other.put("cores", 4)
+
+    expires_at = store.conn.execute(
+        "SELECT expires_at FROM kv_table WHERE stepid = ? AND key = 'cores';",
+        (store.step_id,),
+    ).fetchone()[0]
+
+    assert expires_at == pytest.approx(time.time() + 60, abs=5)
+
+    expire(store, "cores")
+
+    assert store.get("cores", int) is None
+    assert store.get_many(["cores", "memory"], int) == {"cores": None, "memory": 16}
+    assert not store.exists("cores")
+    assert store.list() == ["memory"]
+
+    report = compact(PERSISTENT_PATH)
+
+    assert report["expired"] == 1
+    assert other.get("cores", int) == 4
+
+    # Putting an expired key stores it again.
+    expire(store, "memory")
+    store.put("memory", 32)
+
+    assert store.get("memory", int) == 32
+
+    for ttl in [0, -1, "1", {"Sirius": 0}]:
+        with pytest.raises(ValueError):
+            Sqlite3Store("Sirius", PERSISTENT_PATH, WORKING_DIRECTORY, ttl=ttl)
+
+
+@with_directory
+def test_compact_retention():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    for i in range(10):
+        store.put(f"value{i}", os.urandom(1000))
+        store.conn.execute(
+            "UPDATE kv_table SET updated_at = ? WHERE key = ?;", (i, f"value{i}")
+        )
+
+    report = compact(PERSISTENT_PATH, max_size=5500)
+
+    assert report["evicted"] == 5
+    assert sorted(store.list()) == [f"value{i}" for i in range(5, 10)]
+
+    with pytest.raises(ValueError):
+        compact(PERSISTENT_PATH, max_size=0)
+
+
+@with_directory
+def test_compact_releases_blobs():
+    blob_store = Sqlite3BlobStore(PERSISTENT_PATH)
+    store = Sqlite3Store(
+        "Step",
+        PERSISTENT_PATH,
+        WORKING_DIRECTORY,
+        blob_store=blob_store,
+        blob_threshold=16,
+    )
+
+    store.put_many({"large": os.urandom(1000), "small": 1})
+    expire(store, "large")
+    expire(store, "small")
+
+    # Without the blob store, values referencing blobs are kept.
+    assert compact(PERSISTENT_PATH)["expired"] == 1
+    assert blob_store.usage()["blobs"] == 1
+
+    report = compact(PERSISTENT_PATH, blob_store=blob_store)
+
+    assert report["expired"] == 1
+    assert blob_store.usage()["blobs"] == 0
+
+
+@with_directory
+def test_compact_vacuum():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    database = PERSISTENT_PATH / "sqlite.db"
+
+    assert store.conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2
+
+    store.put_many({f"value{i}": os.urandom(100_000) for i in range(20)})
+    compact(PERSISTENT_PATH)
+    size = database.stat().st_size
+    store.delete_many([f"value{i}" for i in range(20)])
+
+    report = compact(PERSISTENT_PATH)
+
+    assert report["pages"] > 0
+    assert database.stat().st_size < size / 2
+
+
+@with_directory
+def test_compact_legacy_database():
+    os.makedirs(PERSISTENT_PATH)
+    conn = sqlite3.connect(PERSISTENT_PATH / "sqlite.db")
+    conn.executescript("""
+        CREATE TABLE step_table (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE);
+        CREATE TABLE kv_table (
+            stepid INTEGER, key TEXT NOT NULL, type TEXT NOT NULL, int_value INTEGER,
+            float_value REAL, string_value TEXT, boolean_value BOOLEAN, blob_value BLOB,
+            PRIMARY KEY (stepid, key)
+        );
+        INSERT INTO kv_table (stepid, key, type, int_value) VALUES (7, 'orphan', 'int', 1);
+        """)
+    conn.close()
+
+    report = compact(PERSISTENT_PATH)
+
+    assert report["orphans"] == 1
+    assert report["pages"] == 0
+
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    assert store.conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 0
+
+    compact(PERSISTENT_PATH, full=True)
+
+    assert store.conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2
+
+
+@with_directory
+def test_compact_pipelines():
+    os.makedirs(PERSISTENT_PATH)
+    store = Sqlite3PipelineStore(PERSISTENT_PATH)
+    source = PERSISTENT_PATH / "spectra.mgf"
+    source.write_text("BEGIN IONS\nEND IONS\n")
+
+    for key in ["Old", "New"]:
+        store.store_pipeline(
+            key, [ShrinkMgf()], [DictIo({"compounds_per_file": 10})], [source]
+        )
+
+    store.conn.execute("UPDATE pipeline_table SET stored_at = 0 WHERE name = 'Old';")
+
+    report = compact(PERSISTENT_PATH, pipeline_ttl=3600)
+
+    assert report["pipelines"] == 1
+    assert store.list_pipelines() == ["New"]
+    assert store.conn.execute("SELECT count(*) FROM pipeline_step;").fetchone() == (1,)
+
+
+@with_directory
+def test_compact_legacy_pipelines():
+    os.makedirs(PERSISTENT_PATH)
+    conn = sqlite3.connect(PERSISTENT_PATH / "sqlite.db")
+    conn.executescript("""
+        CREATE TABLE pipeline_table (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, input_filetypes TEXT
+        );
+        INSERT INTO pipeline_table (name, input_filetypes) VALUES ('Legacy', '[".mgf"]');
+        """)
+    conn.close()
+
+    # Pipelines stored before their time was recorded count as stored at the
+    # migration.
+    report = compact(PERSISTENT_PATH, pipeline_ttl=3600)
+
+    assert report["pipelines"] == 0
+    assert Sqlite3PipelineStore(PERSISTENT_PATH).list_pipelines() == ["Legacy"]
@@ -0,0 +1,62 @@
+import io
+import os
+
+import pytest
+
+from expectmine.storage.compression import (
+    CODECS,
+    DecompressingWriter,
+    compress,
+    compress_file,
+    decompress,
+)
+from .utils import PERSISTENT_PATH, with_directory
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+def test_compress_decompress(codec):
+    data = b"100.5 20\n" * 1000
+
+    compressed, used_codec = compress(data, codec)
+
+    assert used_codec == codec
+    assert len(compressed) < len(data)
+    assert decompress(compressed, used_codec) == data
+
+    # Small and incompressible values stay raw.
+    assert compress(b"small", codec) == (b"small", None)
+    random = os.urandom(8192)
+    assert compress(random, codec) == (random, None)
+    assert decompress(random, None) == random
+
+
+def test_compress_unknown_codec():
+    with pytest.raises(ValueError):
+        compress(b"data", "zstd")
+
+    with pytest.raises(ValueError):
+        decompress(b"data", "zstd")
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+def test_compress_file(codec):
+    @with_directory
+    def test():
+        os.makedirs(PERSISTENT_PATH)
+        path = PERSISTENT_PATH / "spectra.mgf"
+        content = b"BEGIN IONS\nPEPMASS=301.1\n100.5 20\nEND IONS\n" * 50000
+        path.write_bytes(content)
+
+        source, used_codec, content_hash = compress_file(path, codec)
+        target = io.BytesIO()
+
+        with source, DecompressingWriter(target, used_codec) as writer:
+            # Decompressed in chunks, like blobs are read.
+            for chunk in iter(lambda: source.read(1000), b""):
+                writer.write(chunk)
+
+        assert used_codec == codec
+        assert target.getvalue() == content
+        assert len(content_hash) == 64
+
+    test()
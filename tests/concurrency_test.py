@@ -0,0 +1,184 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from expectmine.storage import sqlite3_connection
+from expectmine.storage.adapters.shared_in_memory_adapter import (
+    SharedInMemoryStoreAdapter,
+)
+from expectmine.storage.adapters.sqlite3_adapter import Sqlite3StoreAdapter
+from expectmine.storage.blob_stores.sqlite3_blob_store import Sqlite3BlobStore
+from expectmine.storage.sqlite3_connection import (
+    close_connections,
+    is_busy,
+    retry_busy,
+)
+from expectmine.storage.stores.sqlite3_store import Sqlite3Store
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+WRITERS = 8
+WRITES = 50
+
+# Workers are forked, so they inherit the module state of the test process.
+fork = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="Needs the fork start method.",
+)
+
+
+def write(adapter, writer: int):
+    # Every worker writes its own keys, a shared counter key and a batch to
+    # its own step, so writers conflict on the same pages.
+    store = adapter.get_instance("Shared")
+    own = adapter.get_instance(f"Writer{writer}")
+
+    for i in range(WRITES):
+        store.put(f"{writer}-{i}", {"writer": writer, "index": i})
+        store.put("last", writer)
+        own.put_many({f"batch{i}": i, "value": ["x" * 100]})
+
+    store.delete_many([f"{writer}-{i}" for i in range(0, WRITES, 2)])
+
+
+def run_writers(adapter):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=write, args=(adapter, writer))
+        for writer in range(WRITERS)
+    ]
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join(60)
+
+    assert [process.exitcode for process in processes] == [0] * WRITERS
+
+
+def check(adapter):
+    store = adapter.get_instance("Shared")
+
+    assert sorted(store.list()) == sorted(
+        [f"{w}-{i}" for w in range(WRITERS) for i in range(1, WRITES, 2)] + ["last"]
+    )
+    assert store.get("last", int) in range(WRITERS)
+    assert store.get("3-5", dict) == {"writer": 3, "index": 5}
+
+    for writer in range(WRITERS):
+        assert adapter.get_instance(f"Writer{writer}").get(
+            f"batch{WRITES - 1}", int
+        ) == (WRITES - 1)
+
+
+@fork
+@with_directory
+def test_sqlite3_store_many_writers():
+    adapter = Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    # The parent has an open connection when the workers are forked.
+    adapter.get_instance("Shared").put("last", -1)
+
+    run_writers(adapter)
+    check(adapter)
+
+
+@fork
+@with_directory
+def test_sqlite3_store_many_writers_with_blob_store():
+    blob_store = Sqlite3BlobStore(PERSISTENT_PATH)
+    adapter = Sqlite3StoreAdapter(
+        PERSISTENT_PATH, WORKING_DIRECTORY, blob_store=blob_store, blob_threshold=16
+    )
+
+    run_writers(adapter)
+    check(adapter)
+
+    # The objects left in the shared step and the batch value all writers
+    # stored once.
+    assert blob_store.usage()["blobs"] == WRITES // 2 * WRITERS + 1
+
+
+@fork
+@with_directory
+def test_shared_in_memory_store_many_writers():
+    adapter = SharedInMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    try:
+        run_writers(adapter)
+        check(adapter)
+
+        # Returned values are copies.
+        value = adapter.get_instance("Shared").get("3-5", dict)
+        value["index"] = 0
+        assert adapter.get_instance("Shared").get("3-5", dict)["index"] == 5
+    finally:
+        adapter.shutdown()
+
+
+def test_retry_busy():
+    calls = []
+
+    @retry_busy
+    def locked():
+        calls.append(1)
+
+        if len(calls) < 3:
+            raise sqlite3.OperationalError("database is locked")
+
+        return len(calls)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(sqlite3_connection, "RETRY_DELAY", 0)
+
+        assert locked() == 3
+
+        @retry_busy
+        def outer():
+            return locked()
+
+        # Nested calls are only retried by the outermost call.
+        calls.clear()
+        assert outer() == 3
+
+        @retry_busy
+        def failing():
+            calls.append(1)
+            raise sqlite3.OperationalError("no such table: kv_table")
+
+        calls.clear()
+        with pytest.raises(sqlite3.OperationalError):
+            failing()
+
+        assert len(calls) == 1
+
+    assert is_busy(sqlite3.OperationalError("database is locked"))
+    assert not is_busy(ValueError("database is locked"))
+
+
+@with_directory
+def test_sqlite3_store_waits_for_lock():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    other = sqlite3.connect(PERSISTENT_PATH / "sqlite.db", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE;")
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(sqlite3_connection, "RETRY_DELAY", 0.01)
+        monkeypatch.setattr(sqlite3_connection, "RETRY_ATTEMPTS", 2)
+
+        # The busy timeout only applies to new connections.
+        store.conn.execute("PRAGMA busy_timeout = 10;")
+
+        with pytest.raises(sqlite3.OperationalError):
+            store.put_many({"key": 1})
+
+        other.execute("COMMIT;")
+        other.close()
+
+        store.put_many({"key": 1})
+
+    assert store.get("key", int) == 1
+
+    # Later tests get connections with the default busy timeout.
+    close_connections()
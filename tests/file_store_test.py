@@ -0,0 +1,105 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from expectmine.storage.adapters.file_adapter import FileStoreAdapter
+from expectmine.storage.stores.file_store import FileStore
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+
+@with_directory
+def test_file_store_put_get():
+    store = FileStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY).get_instance("Step")
+
+    assert isinstance(store, FileStore)
+
+    store.put("int", 42)
+    store.put("object", {"a": [1, 2]})
+    store.put("key.with/special chars", "value")
+    source = PERSISTENT_PATH / "library.mgf"
+    source.write_text("BEGIN IONS")
+    store.put("dir/../../library", source)
+
+    assert store.get("int", int) == 42
+    assert store.get("object", dict) == {"a": [1, 2]}
+    assert store.get("key.with/special chars", str) == "value"
+    assert store.get("unknown", str) is None
+    # Keys of files do not leave the working directory.
+    path = store.get("dir/../../library", Path)
+    assert path.parent == WORKING_DIRECTORY
+    assert path.read_text() == "BEGIN IONS"
+    assert sorted(store.list()) == [
+        "dir/../../library",
+        "int",
+        "key.with/special chars",
+        "object",
+    ]
+
+    # Overwriting a key with a different layout replaces the previous file.
+    store.put("int", b"raw")
+    store.delete("object")
+
+    assert bytes(store.get("int", memoryview)) == b"raw"
+    assert not store.exists("object")
+    assert sorted(store.list()) == [
+        "dir/../../library",
+        "int",
+        "key.with/special chars",
+    ]
+
+    with pytest.raises(ValueError):
+        store.get("int", str)
+
+
+@with_directory
+def test_file_store_maps_bytes():
+    store = FileStore("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    content = bytes(range(256)) * (26 * 4096)
+
+    # Values above the 25 MiB limit of the other stores are stored.
+    store.put("index", content)
+    view = store.get("index", memoryview)
+
+    assert view.readonly
+    assert view[:256] == bytes(range(256))
+    assert len(view) == len(content)
+    assert store.get("index", bytes) == content
+
+
+@with_directory
+def test_file_store_links_files():
+    store = FileStore("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    source = PERSISTENT_PATH / "library.mgf"
+    source.write_text("BEGIN IONS")
+
+    store.put("library", source)
+    path = store.get("library", Path)
+
+    assert path == WORKING_DIRECTORY / "Step-library.mgf"
+    assert path.read_text() == "BEGIN IONS"
+    assert store.get("library", Path) == path
+
+    # The link shares the stored file, which can not be written.
+    assert path.stat().st_mode & 0o222 == 0
+
+    if os.geteuid() != 0:
+        with pytest.raises(PermissionError):
+            path.write_text("END IONS")
+
+    store.put("library", source)
+
+    assert store.get("library", Path).read_text() == "BEGIN IONS"
+
+
+@with_directory
+def test_file_store_memmaps_arrays():
+    np = pytest.importorskip("numpy")
+    store = FileStore("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    store.put("peaks", np.arange(1000, dtype=np.float64))
+    peaks = store.get("peaks", np.ndarray)
+
+    assert isinstance(peaks, np.memmap)
+    assert not peaks.flags.writeable
+    assert peaks[999] == 999.0
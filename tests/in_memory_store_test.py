@@ -0,0 +1,102 @@
+import pytest
+
+from expectmine.storage.stores.in_memory_store import (
+    InMemoryStore,
+    default_memory_budget,
+)
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY
+
+
+def test_in_memory_store_put_get_many():
+    store = InMemoryStore("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    store.put_many({"int": 1, "string": "value"})
+
+    assert store.get_many(["int", "unknown"], int) == {"int": 1, "unknown": None}
+
+    # Nothing is stored if any pair is invalid.
+    with pytest.raises(ValueError):
+        store.put_many({"valid": 1, "": 2})
+
+    assert not store.exists("valid")
+
+    store.delete_many(["int", "string"])
+
+    assert store.list() == []
+
+
+def test_in_memory_store_spill():
+    store = InMemoryStore(
+        "Step", PERSISTENT_PATH, WORKING_DIRECTORY, memory_budget=4096
+    )
+
+    store.put("first", b"a" * 2048)
+    store.put("second", b"b" * 2048)
+    store.put("count", 3)
+
+    # The least recently used object is spilled, primitives stay in memory.
+    assert store.stats()["spilled"] == 1
+    assert "first" in store.spilled
+    assert store.exists("first")
+    assert sorted(store.list()) == ["count", "first", "second"]
+    assert store.memory <= 4096
+
+    # Reloading the spilled value spills the other one.
+    assert store.get("first", bytes) == b"a" * 2048
+    assert "second" in store.spilled
+    assert store.get("count", int) == 3
+
+    stats = store.stats()
+    assert stats["spills"] == 2
+    assert stats["reloads"] == 1
+
+    path = store.spilled["second"]
+    store.delete("second")
+
+    assert not path.exists()
+    assert not store.exists("second")
+
+
+def test_in_memory_store_spill_large_value():
+    store = InMemoryStore(
+        "Step", PERSISTENT_PATH, WORKING_DIRECTORY, memory_budget=1024
+    )
+
+    store.put_many({"large": [1] * 4096, "small": 1})
+
+    # Values larger than the budget are loaded from disk on every access.
+    assert store.get("large", list) == [1] * 4096
+    assert store.get("large", list) == [1] * 4096
+    assert "large" in store.spilled
+    assert store.stats()["reloads"] == 2
+
+    store.put("large", 2)
+
+    assert store.stats()["spilled"] == 0
+    assert store.get("large", int) == 2
+
+
+def test_in_memory_store_spill_directory_removed():
+    store = InMemoryStore("Step", PERSISTENT_PATH, WORKING_DIRECTORY, memory_budget=1)
+
+    store.put("value", {"key": "value"})
+    directory = store._spill_directory
+
+    assert directory is not None and directory.exists()
+
+    del store
+
+    assert not directory.exists()
+
+
+def test_in_memory_store_memory_budget_env():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("EXPECTMINE_MEMORY_BUDGET", "2")
+        assert default_memory_budget() == 2 * 1024**2
+
+        monkeypatch.setenv("EXPECTMINE_MEMORY_BUDGET", "abc")
+        with pytest.raises(ValueError):
+            default_memory_budget()
+
+        monkeypatch.delenv("EXPECTMINE_MEMORY_BUDGET")
+        assert default_memory_budget() is None
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from expectmine.storage.adapters.caching_adapter import CachingStoreAdapter
+from expectmine.storage.adapters.in_memory_adapter import InMemoryStoreAdapter
+from expectmine.storage.adapters.instrumented_adapter import InstrumentedStoreAdapter
+from expectmine.storage.adapters.sqlite3_adapter import Sqlite3StoreAdapter
+from expectmine.storage.stores.instrumented_store import StoreMetrics
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+
+@with_directory
+def test_instrumented_store_counts_operations():
+    adapter = InstrumentedStoreAdapter(
+        Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+    )
+    store = adapter.get_instance("Sirius")
+    other = adapter.get_instance("MZmine3")
+    source = PERSISTENT_PATH / "batch.xml"
+    source.write_text("<batch/>")
+
+    store.put("cores", 8)
+    store.put_many({"memory": 16, "batchfile": source})
+    assert store.get("cores", int) == 8
+    assert store.get_many(["cores", "memory"], int) == {"cores": 8, "memory": 16}
+    assert store.get("unknown", int) is None
+    assert store.exists("cores")
+    assert sorted(store.list()) == ["batchfile", "cores", "memory"]
+    store.delete("cores")
+    other.put("cores", 4)
+
+    with pytest.raises(ValueError):
+        store.get("memory", str)
+
+    metrics = adapter.metrics()
+    operations = metrics["Sirius"]["operations"]
+
+    assert {name: counters["count"] for name, counters in operations.items()} == {
+        "put": 2,
+        "get": 4,
+        "exists": 1,
+        "list": 1,
+        "delete": 1,
+    }
+    assert operations["get"]["errors"] == 1
+    assert sum(operations["get"]["histogram"].values()) == 4
+    assert metrics["Sirius"]["bytes_in"] >= source.stat().st_size
+    assert metrics["Sirius"]["bytes_out"] > 0
+    assert metrics["MZmine3"]["operations"]["put"]["count"] == 1
+    assert "cache" not in metrics["Sirius"]
+
+    adapter.export(PERSISTENT_PATH / "metrics.json")
+
+    assert json.loads((PERSISTENT_PATH / "metrics.json").read_text()) == metrics
+
+
+@with_directory
+def test_instrumented_store_cache_hits():
+    adapter = InstrumentedStoreAdapter(
+        CachingStoreAdapter(InMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY))
+    )
+    store = adapter.get_instance("Sirius")
+
+    store.put("cores", 8)
+
+    for _ in range(3):
+        store.get("cores", int)
+
+    adapter.get_instance("MZmine3").get("cores", int)
+
+    metrics = adapter.metrics()
+
+    assert metrics["Sirius"]["cache"] == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
+    assert metrics["MZmine3"]["cache"]["hits"] == 0
+
+
+def test_store_metrics_histogram():
+    metrics = StoreMetrics()
+
+    for seconds in [0.00005, 0.0005, 0.0005, 20]:
+        metrics.record("Step", "get", seconds)
+
+    histogram = metrics.snapshot()["Step"]["operations"]["get"]["histogram"]
+
+    assert histogram["0.0001"] == 1
+    assert histogram["0.001"] == 2
+    assert histogram["inf"] == 1
+
+    metrics.reset()
+
+    assert metrics.snapshot() == {}
@@ -28,3 +28,13 @@ def test_key_not_found_dict_io():
         io = DictIo({})
 
         io.string("str", "")
+
+
+def test_boolean_default_dict_io():
+    assert not DictIo({}).boolean("advanced_settings", "", default=False)
+    assert DictIo({"advanced_settings": True}).boolean(
+        "advanced_settings", "", default=False
+    )
+
+    with pytest.raises(ValueError):
+        DictIo({"advanced_settings": 1}).boolean("advanced_settings", "", default=False)
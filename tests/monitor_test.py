@@ -0,0 +1,84 @@
+import os
+import sys
+
+import pytest
+from expectmine.utils.cmd import run_cmd, run_cmds
+from expectmine.utils.monitor import ProcessMonitor, process_tree
+
+pytestmark = pytest.mark.skipif(
+    not ProcessMonitor.available(), reason="Requires /proc."
+)
+
+# Spawns a child which allocates memory and keeps the cpu busy for a while.
+SCRIPT = """
+import subprocess, sys
+
+subprocess.run(
+    [
+        sys.executable,
+        "-c",
+        "import time\\n"
+        "data = bytearray(64 * 1024 ** 2)\\n"
+        "end = time.time() + 0.5\\n"
+        "while time.time() < end: pass",
+    ]
+)
+"""
+# Keeps the cpu busy for a while.
+BUSY = "import time\nend = time.time() + 0.3\nwhile time.time() < end: pass"
+
+
+def test_process_tree():
+    assert process_tree(os.getpid())[0] == os.getpid()
+
+
+def test_monitor_run_cmd(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(SCRIPT)
+    limits = []
+    monitor = ProcessMonitor(
+        interval=0.05, rss_limit=32 * 1024**2, on_rss_limit=limits.append
+    )
+
+    status, _, _ = run_cmd(sys.executable, [str(script)], monitor=monitor)
+    summary = monitor.summary()
+
+    assert status == 0
+    assert summary["peak_rss"] >= 64 * 1024**2
+    assert summary["cpu_seconds"] > 0
+    assert summary["peak_threads"] >= 2
+    assert summary["rss_limit_exceeded"]
+    assert len(limits) == 1
+    assert summary["samples"] == len(monitor.series) > 1
+    assert len(monitor.report()["columns"]) == len(monitor.series[0])
+
+
+def test_monitor_downsamples():
+    monitor = ProcessMonitor(interval=0.01, max_samples=4)
+
+    run_cmd("sleep", ["0.3"], monitor=monitor)
+
+    assert len(monitor.series) <= 4
+    assert monitor.interval > 0.01
+
+
+def test_monitor_run_cmds_totals():
+    single = ProcessMonitor(interval=0.05)
+    chain = ProcessMonitor(interval=0.05)
+
+    run_cmd(sys.executable, ["-c", BUSY], monitor=single)
+    run_cmds(
+        [(sys.executable, ["-c", BUSY]), (sys.executable, ["-c", BUSY])], monitor=chain
+    )
+
+    assert chain.summary()["cpu_seconds"] >= 1.5 * single.summary()["cpu_seconds"]
+
+
+def test_monitor_samples_before_reaping():
+    # Only the first and the last sample are taken.
+    monitor = ProcessMonitor(interval=60)
+
+    run_cmd(sys.executable, ["-c", BUSY], monitor=monitor)
+
+    assert monitor.summary()["cpu_seconds"] >= 0.2
+    assert monitor.series[-1][2] == monitor.summary()["cpu_seconds"]
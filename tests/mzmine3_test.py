@@ -1,9 +1,15 @@
+import os
+import threading
 from pathlib import Path
+from xml.etree import ElementTree
+
+import pytest
 
 from expectmine.io.io.dict_io import DictIo
 from expectmine.logger.base_logger import LogLevel
 from expectmine.logger.loggers.cli_logger import CliLogger
 from expectmine.steps.steps.mzmine3.mzmine3 import MZmine3
+from expectmine.steps.steps.mzmine3.utils import BatchfileTemplate
 from expectmine.storage.stores.in_memory_store import InMemoryStore
 from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
 
@@ -73,3 +79,226 @@ def test_metadata_mzmine3():
 
 def test_disclaimer_mzmine3():
     assert isinstance(MZmine3.citation_and_disclaimer(), str)
+
+
+BATCHFILE = """<?xml version="1.0" encoding="UTF-8"?>
+<batch mzmine_version="3.4.16">
+    <batchstep method="io.github.mzmine.modules.io.import_rawdata_all.AllSpectralDataImportModule" parameter_version="1">
+        <parameter name="File names">
+            <file>/old/input.mzML</file>
+        </parameter>
+        <parameter name="Spectral library files">
+            <file>/old/library.json</file>
+        </parameter>
+    </batchstep>
+</batch>
+"""
+
+
+@with_directory
+def test_batchfile_template_mzmine3():
+    os.makedirs(PERSISTENT_PATH, exist_ok=True)
+    (PERSISTENT_PATH / "batch.xml").write_text(BATCHFILE)
+
+    template = BatchfileTemplate(PERSISTENT_PATH / "batch.xml")
+
+    assert template.has_spectral_library_files
+    assert template.input_step_count == 1
+    assert template.added_output_step
+
+    rendered = template.render(
+        [Path("a.mzML"), Path("b.mzML")], Path("out.mgf"), [Path("library.mgf")]
+    )
+    root = ElementTree.fromstring(rendered)
+
+    assert [f.text for f in root.iter("file")] == [
+        str(Path("a.mzML").absolute()),
+        str(Path("b.mzML").absolute()),
+        str(Path("library.mgf").absolute()),
+    ]
+    assert [f.text for f in root.iter("current_file")] == [
+        str(Path("out.mgf").absolute())
+    ]
+
+
+@with_directory
+def test_batchfile_template_is_stored_mzmine3():
+    os.makedirs(PERSISTENT_PATH, exist_ok=True)
+    (PERSISTENT_PATH / "batch.xml").write_text(BATCHFILE)
+    store = InMemoryStore("Mzmine3", PERSISTENT_PATH, WORKING_DIRECTORY)
+    logger = CliLogger(LogLevel.ERROR, write_logfile=False, path=None)
+
+    MZmine3().setup(
+        store,
+        DictIo(
+            {
+                "batchfile": PERSISTENT_PATH / "batch.xml",
+                "spectral_library_files": [Path("library.mgf")],
+                "advanced_settings": False,
+            }
+        ),
+        logger,
+    )
+
+    assert isinstance(
+        store.get("batchfile_template", BatchfileTemplate), BatchfileTemplate
+    )
+
+
+SPLIT_BATCHFILE = """<?xml version="1.0" encoding="UTF-8"?>
+<batch mzmine_version="3.4.16">
+    <batchstep method="io.github.mzmine.modules.io.import_rawdata_all.AllSpectralDataImportModule" parameter_version="1">
+        <parameter name="File names"/>
+    </batchstep>
+    <batchstep method="io.github.mzmine.modules.dataprocessing.featdet_massdetection.MassDetectionModule" parameter_version="1"/>
+    <batchstep method="io.github.mzmine.modules.dataprocessing.align_join.JoinAlignerModule" parameter_version="1"/>
+    <batchstep method="io.github.mzmine.modules.dataprocessing.gapfill_peakfinder.PeakFinderModule" parameter_version="1"/>
+</batch>
+"""
+
+
+@with_directory
+def test_batchfile_template_split_mzmine3():
+    os.makedirs(PERSISTENT_PATH, exist_ok=True)
+    (PERSISTENT_PATH / "batch.xml").write_text(SPLIT_BATCHFILE)
+
+    split_templates = BatchfileTemplate(PERSISTENT_PATH / "batch.xml").split()
+
+    assert split_templates is not None
+
+    sample_template, joint_template = split_templates
+    sample_root = ElementTree.fromstring(
+        sample_template.render([Path("a.mzML")], Path("features.mzTab"))
+    )
+    joint_root = ElementTree.fromstring(
+        joint_template.render([Path("features.mzTab")], Path("out.mgf"))
+    )
+
+    assert [step.get("method").split(".")[-1] for step in sample_root] == [
+        "AllSpectralDataImportModule",
+        "MassDetectionModule",
+        "MZTabmExportModule",
+    ]
+    assert [step.get("method").split(".")[-1] for step in joint_root] == [
+        "MZTabmImportModule",
+        "JoinAlignerModule",
+        "PeakFinderModule",
+        "SiriusExportModule",
+    ]
+    assert [f.text for f in joint_root.iter("file")] == [
+        str(Path("features.mzTab").absolute())
+    ]
+
+
+def test_batchfile_template_without_alignment_mzmine3():
+    template = BatchfileTemplate(ElementTree.fromstring(BATCHFILE))
+
+    assert template.split() is None
+
+    # Without steps before the alignment there is no per-sample stage.
+    root = ElementTree.fromstring(SPLIT_BATCHFILE)
+    alignment = root[2]
+    root.remove(alignment)
+    root.insert(0, alignment)
+
+    assert BatchfileTemplate(root).split() is None
+
+
+def run_split(run_batch, spectral_library_files: list[Path] | None = None) -> Path:
+    os.makedirs(PERSISTENT_PATH, exist_ok=True)
+    (PERSISTENT_PATH / "batch.xml").write_text(SPLIT_BATCHFILE)
+    volatile_store = InMemoryStore("MZmine3", PERSISTENT_PATH, WORKING_DIRECTORY)
+    volatile_store.put_many({"samples_per_group": 2, "parallel_groups": 2})
+    step = MZmine3()
+    step._run_batch = run_batch  # type: ignore
+
+    return step._run_split(
+        BatchfileTemplate(PERSISTENT_PATH / "batch.xml").split(),  # type: ignore
+        [Path(f"{i}.mzML") for i in range(5)],
+        PERSISTENT_PATH,
+        spectral_library_files,
+        8,
+        4096,
+        {},
+        volatile_store,
+        InMemoryStore("MZmine3", PERSISTENT_PATH, WORKING_DIRECTORY),
+        CliLogger(LogLevel.ERROR, write_logfile=False, path=None),
+    )
+
+
+@with_directory
+def test_run_split_mzmine3():
+    calls = []
+    rendered = []
+    lock = threading.Lock()
+    render = BatchfileTemplate.render
+
+    def run_batch(batchfile, input_files, output_path, cores, memory, *args):
+        with lock:
+            calls.append((output_path.name, input_files, cores, memory))
+
+        return 0
+
+    def render_libraries(self, input_files, output_file, spectral_library_files=None):
+        rendered.append(spectral_library_files)
+        return render(self, input_files, output_file, spectral_library_files)
+
+    libraries = [Path("library.mgf")]
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(BatchfileTemplate, "render", render_libraries)
+        output_file = run_split(run_batch, libraries)
+
+    groups = sorted(calls[:-1])
+
+    assert output_file == PERSISTENT_PATH / "sirius_output.mgf"
+    assert [group[1] for group in groups] == [
+        [Path("0.mzML"), Path("1.mzML")],
+        [Path("2.mzML"), Path("3.mzML")],
+        [Path("4.mzML")],
+    ]
+    assert all(group[2:] == (4, 2048) for group in groups)
+    assert calls[-1] == (
+        PERSISTENT_PATH.name,
+        [PERSISTENT_PATH / "samples" / str(i) / "features.mzTab" for i in range(3)],
+        8,
+        4096,
+    )
+    # The joint stage is rendered with the libraries too.
+    assert rendered == [libraries] * 4
+
+    def fail_group(batchfile, input_files, output_path, *args):
+        return 1 if output_path.name == "1" else 0
+
+    with pytest.raises(RuntimeError, match="groups \\[1\\]"):
+        run_split(fail_group)
+
+    def fail_joint(batchfile, input_files, output_path, *args):
+        return 1 if output_path == PERSISTENT_PATH else 0
+
+    with pytest.raises(RuntimeError, match="Joint stage"):
+        run_split(fail_joint)
+
+
+@with_directory
+def test_run_split_cancels_groups_mzmine3():
+    started = threading.Event()
+    cancelled = []
+
+    def run_batch(batchfile, input_files, output_path, *args):
+        cancel_event: threading.Event = args[-1]
+
+        # The first group fails while the second one is still running.
+        if output_path.name == "0":
+            started.wait(5)
+            return 1
+
+        started.set()
+        cancelled.append(cancel_event.wait(5))
+
+        return 0
+
+    with pytest.raises(RuntimeError, match="groups \\[0\\]"):
+        run_split(run_batch)
+
+    assert cancelled and all(cancelled)
@@ -0,0 +1,126 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from expectmine.logger.base_logger import LogLevel
+from expectmine.logger.loggers.cli_logger import CliLogger
+from expectmine.steps.steps.mzmine3.mzmine3 import MZmine3
+from expectmine.steps.steps.mzmine3.mzml import (
+    check_mzml_summary,
+    inspect_mzml,
+    inspect_mzml_files,
+)
+from expectmine.storage.stores.in_memory_store import InMemoryStore
+from expectmine.storage.utils import value_hash
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+SPECTRUM = """
+        <spectrum index="{index}" id="scan={index}" defaultArrayLength="0">
+          <cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="{level}"/>
+          <scanList count="1">
+            <scan>
+              <cvParam cvRef="MS" accession="MS:1000016" name="scan start time" value="{rt}" unitAccession="UO:0000031"/>
+            </scan>
+          </scanList>
+          <binaryDataArrayList count="1">
+            <binaryDataArray encodedLength="0"><binary></binary></binaryDataArray>
+          </binaryDataArrayList>
+        </spectrum>"""
+
+
+def write_mzml(path: Path, levels: list[int], indexed: bool = True) -> Path:
+    spectra = "".join(
+        SPECTRUM.format(index=index, level=level, rt=index * 0.5)
+        for index, level in enumerate(levels)
+    )
+    run = (
+        '<mzML xmlns="http://psi.hupo.org/ms/mzml" version="1.1.0">\n'
+        f'    <run id="run">\n      <spectrumList count="{len(levels)}">'
+        f"{spectra}\n      </spectrumList>\n    </run>\n</mzML>\n"
+    )
+    content = '<?xml version="1.0" encoding="utf-8"?>\n'
+
+    if indexed:
+        content += '<indexedmzML xmlns="http://psi.hupo.org/ms/mzml">\n' + run
+        offset = len(content.encode())
+        content += (
+            '<indexList count="0"></indexList>\n'
+            f"<indexListOffset>{offset}</indexListOffset>\n</indexedmzML>\n"
+        )
+    else:
+        content += run
+
+    os.makedirs(path.parent, exist_ok=True)
+    path.write_text(content)
+
+    return path
+
+
+@with_directory
+def test_inspect_mzml():
+    summary = inspect_mzml(write_mzml(PERSISTENT_PATH / "1.mzML", [1, 2, 2]))
+
+    assert summary["scan_count"] == 3
+    assert summary["declared_scan_count"] == 3
+    assert summary["ms_levels"] == {"1": 1, "2": 2}
+    assert summary["rt_range"] == [0.0, 60.0]
+    assert summary["indexed"]
+    assert summary["complete"]
+    assert check_mzml_summary(summary) == ([], [])
+
+
+@with_directory
+def test_inspect_truncated_mzml():
+    path = write_mzml(PERSISTENT_PATH / "1.mzML", [1, 2, 2])
+    path.write_bytes(path.read_bytes()[:-400])
+
+    summary = inspect_mzml(path)
+    errors, _ = check_mzml_summary(summary)
+
+    assert not summary["complete"]
+    assert not summary["indexed"]
+    assert errors
+
+
+@with_directory
+def test_inspect_ms1_only_mzml():
+    summary = inspect_mzml(write_mzml(PERSISTENT_PATH / "1.mzML", [1, 1], False))
+
+    assert check_mzml_summary(summary) == (
+        ["No MS2 spectra found."],
+        ["File is not indexed."],
+    )
+
+
+@with_directory
+def test_inspect_mzml_files_cached():
+    store = InMemoryStore("MZmine3", PERSISTENT_PATH, WORKING_DIRECTORY)
+    paths = [
+        write_mzml(PERSISTENT_PATH / "1.mzML", [1, 2]),
+        write_mzml(PERSISTENT_PATH / "2.mzML", [1, 2, 2]),
+    ]
+
+    summaries = inspect_mzml_files(paths, store, max_workers=2)
+
+    assert [summaries[path]["scan_count"] for path in paths] == [2, 3]
+    assert sorted(store.list()) == sorted(
+        f"mzml_inspection_{value_hash(path)}" for path in paths
+    )
+
+    # Cached summaries are used as long as the file does not change.
+    store.put(f"mzml_inspection_{value_hash(paths[0])}", {"cached": True})
+    assert inspect_mzml_files(paths, store)[paths[0]] == {"cached": True}
+
+    write_mzml(paths[0], [1, 2, 2, 2])
+    assert inspect_mzml_files(paths, store)[paths[0]]["scan_count"] == 4
+
+
+@with_directory
+def test_preflight_rejects_mzmine3():
+    store = InMemoryStore("MZmine3", PERSISTENT_PATH, WORKING_DIRECTORY)
+    logger = CliLogger(LogLevel.ERROR, write_logfile=False, path=None)
+    path = write_mzml(PERSISTENT_PATH / "1.mzML", [1])
+
+    with pytest.raises(ValueError):
+        MZmine3().run([path], PERSISTENT_PATH, store, store, logger)
@@ -0,0 +1,39 @@
+import os
+import pickle
+from pathlib import Path
+
+from expectmine.io.io.dict_io import DictIo
+from expectmine.steps.steps.shrink_mgf import ShrinkMgf
+from expectmine.storage.pipeline_stores.sqlite3_pipeline_store import (
+    Sqlite3PipelineStore,
+)
+from .utils import PERSISTENT_PATH, with_directory
+
+
+@with_directory
+def test_sqlite3_pipeline_store_round_trip():
+    os.makedirs(PERSISTENT_PATH)
+    store = Sqlite3PipelineStore(PERSISTENT_PATH)
+    source = PERSISTENT_PATH / "spectra.mgf"
+    source.write_text("BEGIN IONS\nEND IONS\n")
+    answers = {"compounds_per_file": 10, "output": Path("out")}
+
+    store.store_pipeline("Shrink", [ShrinkMgf()], [DictIo(answers)], [source])
+
+    assert store.list_pipelines() == ["Shrink"]
+
+    steps, input_filetypes = store.load_pipeline("Shrink")  # type: ignore
+
+    assert [name for name, _ in steps] == ["ShrinkMgf"]
+    assert steps[0][1].all_answers() == answers
+    assert input_filetypes == [".mgf"]
+    assert store.load_pipeline("Missing") is None
+
+    # Answers stored before the encoding was recorded are pickled.
+    store.conn.execute(
+        "UPDATE pipeline_step SET encoding = NULL, blob_value = ?;",
+        (pickle.dumps({"compounds_per_file": 5}),),
+    )
+    steps, _ = store.load_pipeline("Shrink")  # type: ignore
+
+    assert steps[0][1].all_answers() == {"compounds_per_file": 5}
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 import pytest
@@ -5,8 +6,14 @@ from expectmine.logger.adapters.cli_logger_adapter import CliLoggerAdapter
 from expectmine.logger.base_logger import LogLevel
 from expectmine.pipeline.pipeline import Pipeline
 from expectmine.pipeline.utils import get_quickstart_config
+from expectmine.steps.steps.shrink_mgf import ShrinkMgf
+from expectmine.steps.steps.sirius_fingerprint import SiriusFingerprint
 from expectmine.storage.adapters.in_memory_adapter import InMemoryStoreAdapter
+from expectmine.storage.adapters.instrumented_adapter import InstrumentedStoreAdapter
 from expectmine.storage.adapters.sqlite3_adapter import Sqlite3StoreAdapter
+from expectmine.storage.pipeline_stores.sqlite3_pipeline_store import (
+    Sqlite3PipelineStore,
+)
 
 from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
 
@@ -42,3 +49,148 @@ def test_pipeline_custom_adapters_2():
 def test_pipeline_no_adapter():
     with pytest.raises(TypeError):
         pipeline = Pipeline()
+
+
+@with_directory
+def test_pipeline_profile():
+    os.makedirs(PERSISTENT_PATH)
+    volatile_adapter = InstrumentedStoreAdapter(
+        InMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+    )
+    pipeline = Pipeline(
+        persistent_adapter=InMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY),
+        volatile_adapter=volatile_adapter,
+        logger_adapter=CliLoggerAdapter(LogLevel.ALL, False),
+        output_directory=PERSISTENT_PATH,
+    )
+    source = PERSISTENT_PATH / "spectra.mgf"
+    source.write_text("BEGIN IONS\nPEPMASS=301.1\n100.5 20\nEND IONS\n" * 3)
+
+    pipeline.set_input([source])
+    pipeline.add_step(ShrinkMgf, {"compounds_per_file": 1})
+    pipeline.run()
+
+    profile = pipeline.profile()
+
+    assert list(profile["steps"]) == ["0_ShrinkMgf"]  # type: ignore
+    assert profile["persistent"] is None
+    assert profile["volatile"]["ShrinkMgf"]["operations"]["put"]["count"] == 1  # type: ignore
+    assert profile["volatile"]["ShrinkMgf"]["operations"]["get"]["count"] >= 1  # type: ignore
+
+
+@with_directory
+def test_pipeline_from_store():
+    os.makedirs(PERSISTENT_PATH)
+    pipeline_store = Sqlite3PipelineStore(PERSISTENT_PATH)
+    adapters = [
+        Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY),
+        InMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY),
+        CliLoggerAdapter(LogLevel.ALL, False),
+    ]
+    source = PERSISTENT_PATH / "spectra.mgf"
+    source.write_text("BEGIN IONS\nPEPMASS=301.1\n100.5 20\nEND IONS\n" * 3)
+
+    pipeline = Pipeline(*adapters, output_directory=PERSISTENT_PATH / "first")
+
+    with pytest.raises(ValueError):
+        pipeline.save("Empty", pipeline_store)
+
+    pipeline.set_input([source])
+    pipeline.add_step(ShrinkMgf, {"compounds_per_file": 2})
+    pipeline.save("Shrink", pipeline_store)
+
+    loaded = Pipeline.from_store(
+        "Shrink",
+        pipeline_store,
+        *adapters,
+        output_directory=PERSISTENT_PATH / "second",
+        input_files=[source],
+    )
+
+    assert [file.name for file in loaded.run()] == [
+        file.name for file in pipeline.run()
+    ]
+    assert loaded.get_possible_steps() == pipeline.get_possible_steps()
+
+    other = PERSISTENT_PATH / "spectra.txt"
+    other.write_text("")
+
+    with pytest.raises(ValueError):
+        loaded.set_input([other])
+
+    with pytest.raises(ValueError):
+        Pipeline.from_store("Missing", pipeline_store, *adapters, PERSISTENT_PATH)
+
+    with pytest.raises(ValueError):
+        Pipeline._resolve_step("Missing")
+
+
+@with_directory
+def test_pipeline_from_store_skips_install():
+    os.makedirs(PERSISTENT_PATH / "other")
+    pipeline_store = Sqlite3PipelineStore(PERSISTENT_PATH)
+    adapters = [
+        InMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY),
+        CliLoggerAdapter(LogLevel.ALL, False),
+    ]
+    source = PERSISTENT_PATH / "spectra.mgf"
+    source.write_text("BEGIN IONS\nEND IONS\n")
+    install = SiriusFingerprint.install
+    installs = []
+
+    def count_install(self, *args):
+        installs.append(self)
+        install(self, *args)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(SiriusFingerprint, "install", count_install)
+
+        pipeline = Pipeline(
+            Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY),
+            *adapters,
+            PERSISTENT_PATH / "first",
+        )
+        pipeline.set_input([source])
+        pipeline.add_step(
+            SiriusFingerprint,
+            {
+                "sirius_path": Path("/opt/sirius/bin/sirius"),
+                "set_max_mz": False,
+                "instrument": "orbitrap",
+            },
+        )
+        pipeline.save("Sirius", pipeline_store)
+
+        # The sirius path is already in the persistent store.
+        Pipeline.from_store(
+            "Sirius",
+            pipeline_store,
+            Sqlite3StoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY),
+            *adapters,
+            PERSISTENT_PATH / "second",
+        )
+
+        assert len(installs) == 1
+
+        Pipeline.from_store(
+            "Sirius",
+            pipeline_store,
+            Sqlite3StoreAdapter(PERSISTENT_PATH / "other", WORKING_DIRECTORY),
+            *adapters,
+            PERSISTENT_PATH / "third",
+        )
+
+        assert len(installs) == 2
+
+
+@with_directory
+def test_step_is_installed():
+    adapter = InMemoryStoreAdapter(PERSISTENT_PATH, WORKING_DIRECTORY)
+    store = adapter.get_instance(SiriusFingerprint.step_name())
+
+    assert not SiriusFingerprint().is_installed(store)
+
+    store.put("sirius_path", "/opt/sirius/bin/sirius")
+
+    assert SiriusFingerprint().is_installed(store)
+    assert ShrinkMgf().is_installed(store)
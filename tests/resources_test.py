@@ -0,0 +1,44 @@
+import pytest
+from expectmine.storage.stores.in_memory_store import InMemoryStore
+from expectmine.utils.resources import (
+    available_cores,
+    jvm_environment,
+    plan_resources,
+    resolve_resources,
+)
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY
+
+
+def test_plan_resources_divides_host():
+    cores, memory = plan_resources(1)
+    shared_cores, shared_memory = plan_resources(2)
+
+    assert cores == available_cores()
+    assert shared_cores == max(1, cores // 2)
+    assert shared_memory <= memory
+
+
+def test_plan_resources_invalid_jobs():
+    with pytest.raises(ValueError):
+        plan_resources(0)
+
+
+def test_plan_resources_concurrent_jobs_env(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("EXPECTMINE_CONCURRENT_JOBS", "abc")
+
+    with pytest.raises(ValueError):
+        plan_resources()
+
+
+def test_resolve_resources_prefers_store():
+    store = InMemoryStore("Tool", PERSISTENT_PATH, WORKING_DIRECTORY)
+    store.put("cores", 3)
+    store.put("memory", 1024)
+
+    assert resolve_resources(store) == (3, 1024)
+
+
+def test_jvm_environment(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("JAVA_TOOL_OPTIONS", "-Dfoo=bar")
+
+    assert jvm_environment(2048) == {"JAVA_TOOL_OPTIONS": "-Dfoo=bar -Xmx2048m"}
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from expectmine.utils.scheduler import JobScheduler, parse_capacities
+from .utils import PERSISTENT_PATH, with_directory
+
+
+def test_parse_capacities():
+    assert parse_capacities("cpu=4, sirius-license=1") == {
+        "cpu": 4,
+        "sirius-license": 1,
+    }
+
+    with pytest.raises(ValueError):
+        parse_capacities("cpu")
+
+
+@with_directory
+def test_scheduler_limits_slots():
+    scheduler = JobScheduler(PERSISTENT_PATH, {"license": 1}, poll_interval=0.01)
+
+    slot = scheduler.acquire({"license": 1})
+
+    assert scheduler.status()["usage"] == {"license": 1}
+    with pytest.raises(TimeoutError):
+        scheduler.acquire({"license": 1}, timeout=0.1)
+    assert scheduler.status()["waiting"] == 0
+
+    scheduler.release(slot)
+
+    assert scheduler.available({"license": 1})
+
+
+@with_directory
+def test_scheduler_clamps_large_requests():
+    scheduler = JobScheduler(PERSISTENT_PATH, {"cpu": 2}, poll_interval=0.01)
+
+    with scheduler.slots({"cpu": 8, "unlimited": 100}):
+        assert scheduler.status()["usage"] == {"cpu": 2, "unlimited": 100}
+
+
+@with_directory
+def test_scheduler_priority_order():
+    scheduler = JobScheduler(PERSISTENT_PATH, {"cpu": 1}, poll_interval=0.01)
+    order = []
+
+    def job(name: str, priority: int):
+        with scheduler.slots({"cpu": 1}, priority=priority):
+            order.append(name)
+
+    slot = scheduler.acquire({"cpu": 1})
+    threads = [
+        threading.Thread(target=job, args=("low", 0)),
+        threading.Thread(target=job, args=("high", 10)),
+    ]
+
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+
+    scheduler.release(slot)
+
+    for thread in threads:
+        thread.join()
+
+    assert order == ["high", "low"]
+
+
+@with_directory
+def test_scheduler_cancel():
+    scheduler = JobScheduler(PERSISTENT_PATH, {"cpu": 1}, poll_interval=0.01)
+    event = threading.Event()
+    event.set()
+
+    with scheduler.slots({"cpu": 1}):
+        with pytest.raises(InterruptedError):
+            scheduler.acquire({"cpu": 1}, cancel_event=event)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="Requires uids.")
+def test_scheduler_default_directory(tmp_path):
+    with pytest.MonkeyPatch.context() as m:
+        m.delenv("EXPECTMINE_SCHEDULER_DIRECTORY", raising=False)
+        m.setattr(tempfile, "tempdir", str(tmp_path / "user"))
+        os.makedirs(tmp_path / "user")
+
+        scheduler = JobScheduler(capacities={"cpu": 1})
+
+        assert scheduler.directory.name == f"expectmine_scheduler_{os.getuid()}"
+        assert scheduler.directory.stat().st_mode & 0o777 == 0o700
+        with scheduler.slots({"cpu": 1}):
+            assert scheduler.status()["usage"] == {"cpu": 1}
+
+        # A symlink planted by another user is not followed.
+        m.setattr(tempfile, "tempdir", str(tmp_path / "planted"))
+        os.makedirs(tmp_path / "planted")
+        os.symlink(tmp_path, tmp_path / "planted" / scheduler.directory.name)
+
+        with pytest.raises(PermissionError):
+            JobScheduler(capacities={"cpu": 1})
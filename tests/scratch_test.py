@@ -0,0 +1,44 @@
+import os
+
+import pytest
+from expectmine.utils.scratch import ScratchDirectory, scratch_root
+from .utils import PERSISTENT_PATH, with_directory
+
+
+@with_directory
+def test_scratch_directory_cleanup():
+    with ScratchDirectory(PERSISTENT_PATH, "tool") as scratch:
+        assert scratch.path is not None
+        (scratch.path / "data").write_bytes(b"0" * 1024)
+
+    assert scratch.usage()["size"] == 1024
+    assert not scratch.usage()["kept"]
+    assert not scratch.path.exists()
+
+
+@with_directory
+def test_scratch_directory_kept_on_failure():
+    with ScratchDirectory(PERSISTENT_PATH, "tool") as scratch:
+        scratch.failed = True
+
+    assert scratch.usage()["kept"]
+    assert scratch.path is not None and scratch.path.is_dir()
+
+
+@with_directory
+def test_scratch_directory_free_space():
+    with pytest.raises(OSError):
+        with ScratchDirectory(PERSISTENT_PATH, "tool", 2**62):
+            pass
+
+
+def test_scratch_root_env(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("EXPECTMINE_SCRATCH_DIRECTORY", raising=False)
+    assert scratch_root(PERSISTENT_PATH) == PERSISTENT_PATH
+
+    monkeypatch.setenv("EXPECTMINE_SCRATCH_DIRECTORY", os.getcwd())
+    assert str(scratch_root(PERSISTENT_PATH)) == os.getcwd()
+
+    monkeypatch.setenv("EXPECTMINE_SCRATCH_DIRECTORY", "/does/not/exist")
+    with pytest.raises(ValueError):
+        scratch_root(PERSISTENT_PATH)
@@ -0,0 +1,69 @@
+import os
+from pathlib import Path
+
+from expectmine.io.io.dict_io import DictIo
+from expectmine.logger.base_logger import LogLevel
+from expectmine.logger.loggers.cli_logger import CliLogger
+from expectmine.steps.steps.sirius_results.sirius_results import SiriusResults
+from expectmine.steps.steps.sirius_results.utils import (
+    ingest_sirius_output,
+    top_candidates,
+)
+from expectmine.storage.stores.in_memory_store import InMemoryStore
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+STRUCTURE_HEADER = (
+    "rank\tCSI:FingerIDScore\tmolecularFormula\tadduct\tInChIkey2D\tname\tsmiles\n"
+)
+
+
+def create_sirius_output(path: Path) -> Path:
+    sirius_output = path / "output"
+
+    for compound, scores in [("1_output_1", [-10.5, -20.0]), ("2_output_2", [-5.0])]:
+        os.makedirs(sirius_output / compound, exist_ok=True)
+        with open(sirius_output / compound / "structure_candidates.tsv", "w") as f:
+            f.write(STRUCTURE_HEADER)
+            for rank, score in enumerate(scores, start=1):
+                f.write(f"{rank}\t{score}\tC6H12O6\t[M+H]+\tKEY{rank}\tname\tC\n")
+
+    return sirius_output
+
+
+@with_directory
+def test_ingest_sirius_output():
+    sirius_output = create_sirius_output(PERSISTENT_PATH)
+    database = PERSISTENT_PATH / "results.db"
+
+    counts = ingest_sirius_output([sirius_output], database)
+
+    assert counts == {"structure": 3, "formula": 0}
+
+    best = top_candidates(database, 1)
+    assert best[0]["compound_id"] == "2_output_2"
+    assert best[0]["summary"]["InChIkey2D"] == "KEY1"
+
+    compound = top_candidates(database, 5, compound_id="1_output_1")
+    assert [c["score"] for c in compound] == [-10.5, -20.0]
+
+
+@with_directory
+def test_run_sirius_results():
+    sirius_output = create_sirius_output(PERSISTENT_PATH)
+    store = InMemoryStore("SiriusResults", PERSISTENT_PATH, WORKING_DIRECTORY)
+    logger = CliLogger(LogLevel.ERROR, write_logfile=False, path=None)
+
+    step = SiriusResults()
+    step.setup(store, DictIo({"top_k": 1}), logger)
+    database, export = step.run([sirius_output], PERSISTENT_PATH, store, store, logger)
+
+    assert database.is_file()
+    assert len(export.read_text().splitlines()) == 3
+    assert step.metadata(store, store) == {
+        "candidate_counts": {"structure": 3, "formula": 0}
+    }
+
+
+def test_can_run_sirius_results():
+    assert SiriusResults.can_run(["*/*.tsv"])
+    assert not SiriusResults.can_run([".mgf"])
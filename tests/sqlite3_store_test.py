@@ -0,0 +1,284 @@
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from expectmine.storage import sqlite3_connection
+from expectmine.storage.sqlite3_connection import CHUNK_SIZE, close_connections
+from expectmine.storage.stores.sqlite3_store import Sqlite3Store
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+
+@with_directory
+def test_sqlite3_store_put_get():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    store.put("int", 42)
+    store.put("string", "value")
+    store.put("object", {"a": [1, 2]})
+
+    assert store.get("int", int) == 42
+    assert store.get("string", str) == "value"
+    assert store.get("object", dict) == {"a": [1, 2]}
+    assert sorted(store.list()) == ["int", "object", "string"]
+
+    store.delete("int")
+
+    assert not store.exists("int")
+    assert store.get("int", int) is None
+
+
+@with_directory
+def test_sqlite3_store_shared_connection():
+    first = Sqlite3Store("First", PERSISTENT_PATH, WORKING_DIRECTORY)
+    second = Sqlite3Store("Second", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    assert first.conn is second.conn
+    assert first.conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+
+    # Namespaces stay separated on the shared connection.
+    first.put("key", 1)
+    second.put("key", 2)
+
+    assert first.get("key", int) == 1
+    assert second.get("key", int) == 2
+
+    # Every thread uses its own connection.
+    connections: list = []
+    thread = threading.Thread(target=lambda: connections.append(first.conn))
+    thread.start()
+    thread.join()
+
+    assert connections[0] is not first.conn
+
+
+@with_directory
+def test_sqlite3_store_reopen():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    store.put("key", 1)
+
+    close_connections()
+
+    assert Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY).get("key", int) == 1
+
+
+@with_directory
+def test_sqlite3_store_recreated_database():
+    Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY).put("key", 1)
+
+    shutil.rmtree(PERSISTENT_PATH)
+
+    # Connections to the removed database are not reused.
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    assert store.get("key", int) is None
+    assert (PERSISTENT_PATH / "sqlite.db").is_file()
+
+
+@with_directory
+def test_sqlite3_store_recreated_database_other_thread():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    in_transaction = threading.Event()
+    replaced = threading.Event()
+    results: list = []
+
+    def reader():
+        conn = store.conn
+
+        with sqlite3_connection.transaction(conn):
+            in_transaction.set()
+            replaced.wait()
+            # The connection of the thread stays usable until it asks again.
+            results.append(conn.execute("SELECT count(*) FROM kv_table;").fetchone())
+
+        results.append(store.conn is not conn)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    in_transaction.wait()
+
+    os.remove(PERSISTENT_PATH / "sqlite.db")
+    Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    replaced.set()
+    thread.join()
+
+    assert results == [(0,), True]
+
+
+@with_directory
+def test_sqlite3_store_put_get_many():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    values = {f"key{i}": i for i in range(1200)}
+
+    store.put_many(values)
+
+    assert store.get_many(list(values), int) == values
+    assert store.get_many(["key1", "unknown"]) == {"key1": 1, "unknown": None}
+
+    store.delete_many([f"key{i}" for i in range(1000)])
+
+    assert sorted(store.list()) == sorted(f"key{i}" for i in range(1000, 1200))
+
+
+@with_directory
+def test_sqlite3_store_put_many_atomic():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    with pytest.raises(ValueError):
+        store.put_many({"valid": 1, "": 2})
+
+    assert not store.exists("valid")
+
+    store.put_many({"valid": 1, "string": "value"})
+
+    with pytest.raises(ValueError):
+        store.get_many(["valid", "string"], int)
+
+
+@with_directory
+def test_sqlite3_store_file_materialized_once():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    source = PERSISTENT_PATH / "source.bin"
+    content = os.urandom(CHUNK_SIZE * 2 + 123)
+    source.write_bytes(content)
+
+    store.put("file", source)
+    path = store.get("file", Path)
+
+    assert path is not None
+    assert path.read_bytes() == content
+
+    mtime = path.stat().st_mtime_ns
+
+    # Unchanged files are returned without writing them again, also by new
+    # instances of the store.
+    assert store.get("file", Path) == path
+    assert (
+        Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY).get("file", Path)
+        == path
+    )
+    assert path.stat().st_mtime_ns == mtime
+
+    # Modified files are restored.
+    path.write_bytes(b"modified" + content[8:])
+
+    assert store.get("file", Path).read_bytes() == content
+
+
+@with_directory
+def test_sqlite3_store_migrates_hash_column():
+    os.makedirs(PERSISTENT_PATH)
+    conn = sqlite3.connect(PERSISTENT_PATH / "sqlite.db")
+    conn.executescript("""
+        CREATE TABLE step_table (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE);
+        CREATE TABLE kv_table (
+            stepid INTEGER, key TEXT NOT NULL, type TEXT NOT NULL, int_value INTEGER,
+            float_value REAL, string_value TEXT, boolean_value BOOLEAN, blob_value BLOB,
+            PRIMARY KEY (stepid, key)
+        );
+        INSERT INTO step_table (name) VALUES ('Step');
+        INSERT INTO kv_table (stepid, key, type, string_value, blob_value)
+        VALUES (1, 'file', 'file', '.txt', X'68656C6C6F');
+        """)
+    conn.close()
+
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    assert store.get("file", Path).read_text() == "hello"
+
+
+@with_directory
+def test_sqlite3_store_file_without_blob_io():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+    source = PERSISTENT_PATH / "source.bin"
+    content = os.urandom(CHUNK_SIZE + 1)
+    source.write_bytes(content)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(sqlite3_connection, "BLOB_IO", False)
+        store.put("file", source)
+
+        assert store.get("file", Path).read_bytes() == content
+
+
+@with_directory
+def test_sqlite3_store_compression():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY, compression="zlib")
+    spectrum = {"mz": [100.5] * 2000, "title": "Feature 1"}
+    source = PERSISTENT_PATH / "spectra.mgf"
+    source.write_text("BEGIN IONS\nPEPMASS=301.1\n100.5 20\nEND IONS\n" * 2000)
+
+    store.put("spectrum", spectrum)
+    store.put("small", {"cores": 8})
+    store.put("file", source)
+
+    rows = dict(
+        store.conn.execute(
+            "SELECT key, codec FROM kv_table WHERE key IN ('spectrum', 'small', 'file');"
+        ).fetchall()
+    )
+
+    assert rows == {"spectrum": "zlib", "small": None, "file": "zlib"}
+    assert store.get("spectrum", dict) == spectrum
+    assert store.get("file", Path).read_bytes() == source.read_bytes()
+
+    # Values stay readable without compression.
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    assert store.get("spectrum", dict) == spectrum
+    assert store.get_many(["spectrum", "small"]) == {
+        "spectrum": spectrum,
+        "small": {"cores": 8},
+    }
+
+    # Incompressible values are stored raw.
+    source.write_bytes(os.urandom(8192))
+    Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY, compression="lzma").put(
+        "file", source
+    )
+
+    assert store.conn.execute(
+        "SELECT codec FROM kv_table WHERE key = 'file';"
+    ).fetchone() == (None,)
+    assert store.get("file", Path).read_bytes() == source.read_bytes()
+
+    with pytest.raises(ValueError):
+        Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY, compression="zstd")
+
+
+@with_directory
+def test_sqlite3_store_value_codecs():
+    store = Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY)
+
+    store.put("config", {"cores": 8, "files": [Path("a.mzML")]})
+    store.put("step", Sqlite3Store)
+
+    rows = dict(store.conn.execute("SELECT key, encoding FROM kv_table;").fetchall())
+
+    assert rows == {"config": "typed", "step": "pickle"}
+    assert store.get("config", dict) == {"cores": 8, "files": [Path("a.mzML")]}
+    assert store.get("step", type) is Sqlite3Store
+
+    # Objects stored before the encoding was recorded are pickled.
+    store.conn.execute(
+        "UPDATE kv_table SET encoding = NULL, blob_value = ? WHERE key = 'config';",
+        (pickle.dumps({"cores": 4}),),
+    )
+
+    assert store.get("config", dict) == {"cores": 4}
+
+    store = Sqlite3Store(
+        "Step", PERSISTENT_PATH, WORKING_DIRECTORY, value_codecs=["pickle"]
+    )
+    store.put("config", {"cores": 8})
+
+    assert store.conn.execute(
+        "SELECT encoding FROM kv_table WHERE key = 'config';"
+    ).fetchone() == ("pickle",)
+
+    with pytest.raises(ValueError):
+        Sqlite3Store("Step", PERSISTENT_PATH, WORKING_DIRECTORY, value_codecs=["json"])
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pytest
+
+from expectmine.storage.serialization import decode_value
+from expectmine.storage.utils import validate_value
+
+
+def test_validate_value_encodes_once():
+    value = {"batchfile": "batch.xml", "cores": 8}
+
+    encoded = validate_value(value)
+
+    assert encoded is not None
+    assert decode_value(*encoded) == value
+    assert validate_value(value, ["pickle"])[1] == "pickle"  # type: ignore
+
+    for native in [True, 1, 1.0, "string", Path("utils.py")]:
+        assert validate_value(native) is None
+
+
+def test_validate_value_measures_encoded_size():
+    # The list itself is small, its items are not.
+    value = [bytes(1024**2) for _ in range(30)]
+
+    with pytest.raises(ValueError):
+        validate_value(value)
+
+    with pytest.raises(ValueError):
+        validate_value(lambda: None)
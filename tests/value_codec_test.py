@@ -0,0 +1,138 @@
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+from expectmine.storage.serialization import (
+    decode_value,
+    encode_value,
+    validate_value_codecs,
+)
+from expectmine.storage.value_codecs import typed_codec
+from expectmine.storage.value_codecs.typed_codec import TypedCodec
+
+VALUES = [
+    None,
+    True,
+    0,
+    -1,
+    2**63 - 1,
+    -(2**63),
+    2**64 - 1,
+    1.5,
+    "",
+    "x" * 40,
+    "x" * 300,
+    "x" * 70000,
+    "\udc80",
+    b"\x00" * 300,
+    [],
+    list(range(20)),
+    (1, "a"),
+    {1, 2},
+    frozenset(["a"]),
+    {"batchfile": Path("batch.xml"), "cores": 8, "nested": {1: [None, 0.5]}},
+    [Path("a.mzML"), Path("b.mzML")],
+    {f"key{i}": i for i in range(20)},
+]
+
+
+def implementations():
+    # Both implementations write the same format, the values are decoded by
+    # the other implementation too.
+    return [True, False] if typed_codec.msgpack is not None else [False]
+
+
+@pytest.mark.parametrize("native", implementations())
+@pytest.mark.parametrize("value", VALUES)
+def test_typed_codec_round_trip(value, native: bool):
+    codec = TypedCodec()
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        if not native:
+            monkeypatch.setattr(typed_codec, "msgpack", None)
+
+        encoded = codec.encode(value)
+        decoded = codec.decode(encoded)
+
+    assert decoded == value
+    assert type(decoded) is type(value)
+    assert codec.decode(encoded) == value
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_typed_codec_same_bytes(value):
+    pytest.importorskip("msgpack")
+    codec = TypedCodec()
+    encoded = codec.encode(value)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(typed_codec, "msgpack", None)
+
+        assert codec.encode(value) == encoded
+        assert codec.decode(encoded) == value
+
+
+@pytest.mark.parametrize("native", implementations())
+def test_typed_codec_unsupported(native: bool):
+    codec = TypedCodec()
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        if not native:
+            monkeypatch.setattr(typed_codec, "msgpack", None)
+
+        for value in [OrderedDict(a=1), 2**64, lambda: None, [object()]]:
+            with pytest.raises(TypeError):
+                codec.encode(value)
+
+        encoded = codec.encode({"cores": 8})
+
+        for data in [encoded[:-1], encoded + b"\x00", b"\xc1"]:
+            with pytest.raises(ValueError):
+                codec.decode(data)
+
+
+def test_typed_codec_numpy():
+    np = pytest.importorskip("numpy")
+    codec = TypedCodec()
+
+    for value in [
+        np.arange(12, dtype=np.float32).reshape(3, 4),
+        np.array([True, False]),
+        np.array(["a", "bc"]),
+        np.zeros((0, 2), dtype=np.int64),
+    ]:
+        decoded = codec.decode(codec.encode(value))
+
+        assert decoded.dtype == value.dtype
+        assert decoded.shape == value.shape
+        assert (decoded == value).all()
+
+    with pytest.raises(TypeError):
+        codec.encode(np.array([object()]))
+
+
+def test_encode_value_falls_back():
+    assert encode_value({"cores": 8})[1] == "typed"
+    assert encode_value(OrderedDict(a=1))[1] == "pickle"
+    assert encode_value({"cores": 8}, ["pickle"])[1] == "pickle"
+    assert decode_value(*encode_value(OrderedDict(a=1))) == OrderedDict(a=1)
+
+    # Values stored before the codec was recorded are pickled.
+    assert decode_value(pickle.dumps({"cores": 8}), None) == {"cores": 8}
+
+    with pytest.raises(ValueError):
+        encode_value(lambda: None)
+
+    with pytest.raises(ValueError):
+        encode_value(OrderedDict(a=1), ["typed"])
+
+    with pytest.raises(ValueError):
+        decode_value(b"", "json")
+
+    with pytest.raises(ValueError):
+        validate_value_codecs([])
+
+    with pytest.raises(ValueError):
+        validate_value_codecs(["typed", "json"])
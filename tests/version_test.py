@@ -0,0 +1,43 @@
+import os
+import stat
+
+from expectmine.storage.stores.in_memory_store import InMemoryStore
+from expectmine.utils.version import executable_fingerprint, probe_version
+from .utils import PERSISTENT_PATH, WORKING_DIRECTORY, with_directory
+
+
+def create_executable() -> str:
+    os.makedirs(PERSISTENT_PATH, exist_ok=True)
+    executable = PERSISTENT_PATH / "tool"
+    executable.write_text(
+        f'#!/bin/sh\necho called >> "{PERSISTENT_PATH.absolute()}/calls"\necho "Tool 1.0"\n'
+    )
+    executable.chmod(executable.stat().st_mode | stat.S_IEXEC)
+    return str(executable.absolute())
+
+
+@with_directory
+def test_probe_version_is_cached():
+    store = InMemoryStore("Tool", PERSISTENT_PATH, WORKING_DIRECTORY)
+    executable = create_executable()
+
+    assert probe_version(store, executable) == (0, "Tool 1.0\n", "")
+    assert probe_version(store, executable) == (0, "Tool 1.0\n", "")
+    assert len((PERSISTENT_PATH / "calls").read_text().splitlines()) == 1
+
+
+@with_directory
+def test_probe_version_reprobes_changed_executable():
+    store = InMemoryStore("Tool", PERSISTENT_PATH, WORKING_DIRECTORY)
+    executable = create_executable()
+
+    probe_version(store, executable)
+    with open(executable, "a") as f:
+        f.write("echo changed\n")
+    probe_version(store, executable)
+
+    assert len((PERSISTENT_PATH / "calls").read_text().splitlines()) == 2
+
+
+def test_fingerprint_unknown_executable():
+    assert executable_fingerprint("/unknown/executable") is None